@@ -0,0 +1,127 @@
+from functools import lru_cache
+from typing import Dict
+from typing import FrozenSet
+from typing import Iterable
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+from airport.kube.api import LabelSelector
+from airport.kube.api import NodeSelectorOperator
+from airport.kube.selector import LabelsMatcher
+from airport.kube.selector import RequirementKey
+from airport.kube.selector import compile_requirement
+from airport.kube.selector import requirement_key
+
+
+# (sorted match labels, sorted match expressions)
+LabelSelectorKey = Tuple[Tuple[Tuple[str, str], ...], Tuple[RequirementKey, ...]]
+
+
+def label_selector_key(selector: LabelSelector) -> LabelSelectorKey:
+    """
+    :return: the canonical form of the selector, the same for selectors which
+        only differ by the order or the duplicates of their requirements and
+        values.
+    """
+
+    return (
+        tuple(sorted(selector.matchLabels.items())),
+        tuple(sorted({requirement_key(req) for req in selector.matchExpressions})),
+    )
+
+
+def selectivity(key: RequirementKey) -> Tuple[int, int]:
+    """
+    :return: the rank of a requirement, the requirements which usually reject
+        most labels come first so that a mismatch exits early.
+    """
+
+    _, operator, values = key
+    if operator == NodeSelectorOperator.In:
+        return 0, len(values)
+    if operator == NodeSelectorOperator.Exists:
+        return 1, 0
+    if operator == NodeSelectorOperator.NotIn:
+        return 2, -len(values)
+    return 3, 0
+
+
+class CompiledLabelSelector:
+    """
+    A label selector compiled by `compile_label_selector`: the match labels
+    become one subset test of the label items, the match expressions closures
+    over frozensets ordered by selectivity. It is hashable and comparable by
+    its canonical form, so it can key the indexes of the selected objects.
+    """
+
+    __slots__ = ("key", "match_labels", "expressions", "nil")
+
+    def __init__(self, key: Optional[LabelSelectorKey]):
+        self.key = key
+        self.match_labels: FrozenSet[Tuple[str, str]] = frozenset()
+        self.expressions: Tuple[LabelsMatcher, ...] = ()
+        # a nil selector matches nothing, an empty one everything
+        self.nil = key is None
+        if key is None:
+            return
+
+        match_labels, expressions = key
+        self.match_labels = frozenset(match_labels)
+        self.expressions = tuple(
+            compile_requirement(req) for req in sorted(expressions, key=selectivity)
+        )
+
+    def __hash__(self) -> int:
+        return hash(self.key)
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, CompiledLabelSelector):
+            return NotImplemented
+        return self.key == other.key
+
+    def matches(self, labels: Dict[str, str]) -> bool:
+        if self.nil:
+            return False
+        if self.match_labels and not labels.items() >= self.match_labels:
+            return False
+
+        for matcher in self.expressions:
+            if not matcher(labels):
+                return False
+        return True
+
+    __call__ = matches
+
+    def match_many(self, labels_list: Iterable[Dict[str, str]]) -> List[bool]:
+        """
+        :return: whether each of the label sets matches, in order.
+        """
+
+        return [self.matches(labels) for labels in labels_list]
+
+    def select(self, labels_list: Iterable[Dict[str, str]]) -> List[int]:
+        """
+        :return: the indexes of the matching label sets.
+        """
+
+        return [
+            index for index, labels in enumerate(labels_list) if self.matches(labels)
+        ]
+
+
+@lru_cache(maxsize=4096)
+def _compile_label_selector(key: Optional[LabelSelectorKey]) -> CompiledLabelSelector:
+    return CompiledLabelSelector(key)
+
+
+def compile_label_selector(selector: Optional[LabelSelector]) -> CompiledLabelSelector:
+    """
+    :return: the compiled selector, shared by all the selectors with the same
+        canonical form. A None selector matches no labels and an empty selector
+        matches all of them, like in kubernetes.
+    """
+
+    return _compile_label_selector(
+        None if selector is None else label_selector_key(selector)
+    )
@@ -0,0 +1,183 @@
+from functools import lru_cache
+from typing import Dict
+from typing import Iterable
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+from airport.kube.api import Node
+from airport.kube.api import NodeAffinity
+from airport.kube.api import NodeSelector
+from airport.kube.api import NodeSelectorOperator
+from airport.kube.api import NodeSelectorTerm
+from airport.kube.api import Pod
+from airport.kube.selector import LabelsMatcher
+from airport.kube.selector import NodeFieldName
+from airport.kube.selector import RequirementKey
+from airport.kube.selector import compile_requirement
+from airport.kube.selector import never
+from airport.kube.selector import requirement_key
+
+
+# (match expressions, match fields), both sorted
+TermKey = Tuple[Tuple[RequirementKey, ...], Tuple[RequirementKey, ...]]
+# (required terms, None if there is no required selector, (weight, term) pairs)
+NodeAffinityKey = Tuple[Optional[Tuple[TermKey, ...]], Tuple[Tuple[int, TermKey], ...]]
+
+
+def term_key(term: NodeSelectorTerm) -> TermKey:
+    return (
+        tuple(sorted({requirement_key(req) for req in term.matchExpressions})),
+        tuple(sorted({requirement_key(req) for req in term.matchFields})),
+    )
+
+
+def node_selector_key(selector: NodeSelector) -> Tuple[TermKey, ...]:
+    return tuple(sorted({term_key(term) for term in selector.nodeSelectorTerms}))
+
+
+def node_affinity_key(affinity: Optional[NodeAffinity]) -> NodeAffinityKey:
+    """
+    :return: the canonical form of the affinity, the same for affinities which
+        only differ by the order or the duplicates of their requirements and
+        values.
+    """
+
+    if affinity is None:
+        return None, ()
+
+    required = affinity.requiredDuringSchedulingIgnoredDuringExecution
+    return (
+        None if required is None else node_selector_key(required),
+        tuple(
+            (preferred.weight, term_key(preferred.preference))
+            for preferred in affinity.preferredDuringSchedulingIgnoredDuringExecution
+        ),
+    )
+
+
+def compile_field_requirement(key: RequirementKey) -> LabelsMatcher:
+    """
+    Only `metadata.name` with `In` or `NotIn` is supported, like in kubernetes,
+    any other field requirement matches nothing.
+    """
+
+    field, operator, _ = key
+    if field != NodeFieldName or operator not in (
+        NodeSelectorOperator.In,
+        NodeSelectorOperator.NotIn,
+    ):
+        return never
+    return compile_requirement(key)
+
+
+class CompiledTerm:
+    __slots__ = ("expressions", "fields")
+
+    def __init__(self, key: TermKey):
+        expressions, fields = key
+        self.expressions = tuple(compile_requirement(req) for req in expressions)
+        self.fields = tuple(compile_field_requirement(req) for req in fields)
+        if not self.expressions and not self.fields:
+            # an empty term matches no node
+            self.expressions = (never,)
+
+    def matches(self, labels: Dict[str, str], name: str) -> bool:
+        for matcher in self.expressions:
+            if not matcher(labels):
+                return False
+
+        if self.fields:
+            fields = {NodeFieldName: name}
+            for matcher in self.fields:
+                if not matcher(fields):
+                    return False
+
+        return True
+
+
+class CompiledNodeAffinity:
+    """
+    A node affinity turned into closures over frozensets, built once per
+    canonical form by `compile_node_affinity`. All the replicas of a job share
+    the same instance, which is hashable and comparable by its canonical form.
+    """
+
+    __slots__ = ("key", "required", "preferred")
+
+    def __init__(self, key: NodeAffinityKey):
+        required, preferred = key
+        self.key = key
+        self.required: Optional[Tuple[CompiledTerm, ...]] = (
+            None if required is None else tuple(CompiledTerm(t) for t in required)
+        )
+        self.preferred: Tuple[Tuple[int, CompiledTerm], ...] = tuple(
+            (weight, CompiledTerm(term)) for weight, term in preferred
+        )
+
+    def __hash__(self) -> int:
+        return hash(self.key)
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, CompiledNodeAffinity):
+            return NotImplemented
+        return self.key == other.key
+
+    def matches(self, labels: Dict[str, str], name: str = "") -> bool:
+        """
+        :return: True if the node labels and name match any of the required
+            terms, or if there is no required node selector.
+        """
+
+        if self.required is None:
+            return True
+
+        for term in self.required:
+            if term.matches(labels, name):
+                return True
+        return False
+
+    def score(self, labels: Dict[str, str], name: str = "") -> int:
+        """
+        :return: the sum of the weights of the preferred terms the node matches.
+        """
+
+        total = 0
+        for weight, term in self.preferred:
+            if term.matches(labels, name):
+                total += weight
+        return total
+
+    def __call__(self, node: Node) -> bool:
+        return self.matches(node.metadata.labels, node.metadata.name)
+
+    def node_score(self, node: Node) -> int:
+        return self.score(node.metadata.labels, node.metadata.name)
+
+    def filter(self, nodes: Iterable[Node]) -> List[Node]:
+        if self.required is None:
+            return list(nodes)
+        return [
+            node
+            for node in nodes
+            if self.matches(node.metadata.labels, node.metadata.name)
+        ]
+
+
+@lru_cache(maxsize=4096)
+def _compile_node_affinity(key: NodeAffinityKey) -> CompiledNodeAffinity:
+    return CompiledNodeAffinity(key)
+
+
+def compile_node_affinity(affinity: Optional[NodeAffinity]) -> CompiledNodeAffinity:
+    """
+    :return: the compiled affinity, shared by all the affinities with the same
+        canonical form.
+    """
+
+    return _compile_node_affinity(node_affinity_key(affinity))
+
+
+def pod_node_affinity(pod: Pod) -> CompiledNodeAffinity:
+    affinity = pod.spec.affinity
+    return compile_node_affinity(None if affinity is None else affinity.nodeAffinity)
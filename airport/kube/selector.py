@@ -0,0 +1,89 @@
+from typing import Callable
+from typing import Dict
+from typing import Optional
+from typing import Tuple
+from typing import Union
+
+from airport.kube.api import LabelSelectorRequirement
+from airport.kube.api import NodeSelectorOperator
+from airport.kube.api import NodeSelectorRequirement
+
+
+# the only node field a node selector can match, like in kubernetes
+NodeFieldName = "metadata.name"
+
+# (key, operator, sorted values), the operator is a `NodeSelectorOperator` for
+# the label selector requirements too
+RequirementKey = Tuple[str, str, Tuple[str, ...]]
+
+LabelsMatcher = Callable[[Dict[str, str]], bool]
+
+
+def requirement_key(
+    requirement: Union[LabelSelectorRequirement, NodeSelectorRequirement],
+) -> RequirementKey:
+    """
+    :return: the canonical form of the requirement. The label selector
+        operators become the node selector ones of the same name, which only
+        differ by the spelling of `NotIn`.
+    """
+
+    return (
+        requirement.key,
+        NodeSelectorOperator[requirement.operator.name].value,
+        tuple(sorted(set(requirement.values))),
+    )
+
+
+def never(_: Dict[str, str]) -> bool:
+    return False
+
+
+def int_or_none(value: Optional[str]) -> Optional[int]:
+    """
+    :return: the integer value of a label, None if it is missing or not an
+        integer, for the `Gt` and `Lt` requirements.
+    """
+
+    if value is None:
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        return None
+
+
+def compile_requirement(key: RequirementKey) -> LabelsMatcher:
+    """
+    :return: a function telling whether labels match the requirement. A
+        `Gt`/`Lt` requirement without exactly one integer value matches nothing.
+    """
+
+    label, operator, values = key
+    if operator == NodeSelectorOperator.In:
+        allowed = frozenset(values)
+        return lambda labels: labels.get(label) in allowed
+    if operator == NodeSelectorOperator.NotIn:
+        denied = frozenset(values)
+        return lambda labels: labels.get(label) not in denied
+    if operator == NodeSelectorOperator.Exists:
+        return lambda labels: label in labels
+    if operator == NodeSelectorOperator.DoesNotExist:
+        return lambda labels: label not in labels
+
+    if len(values) != 1 or (bound := int_or_none(values[0])) is None:
+        return never
+
+    if operator == NodeSelectorOperator.Gt:
+
+        def greater(labels: Dict[str, str]) -> bool:
+            value = int_or_none(labels.get(label))
+            return value is not None and value > bound
+
+        return greater
+
+    def less(labels: Dict[str, str]) -> bool:
+        value = int_or_none(labels.get(label))
+        return value is not None and value < bound
+
+    return less
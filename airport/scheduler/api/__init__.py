@@ -1,8 +1,14 @@
 from .enums import TaskStatus
+from .host_port_info import HostPortInfo
 from .job_info import JobInfo
 from .job_info import TaskInfo
 from .namespace_info import NamespaceCollection
 from .namespace_info import NamespaceInfo
+from .namespace_info import NamespaceRegistry
 from .node_info import NodeInfo
 from .pod_group_info import PodGroup
+from .queue_info import QueueInfo
+from .quota_info import QuotaAdmission
 from .resource_info import Resource
+from .spec_store import PodSpecStore
+from .volume_info import VolumeInfo
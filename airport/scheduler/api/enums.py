@@ -25,6 +25,9 @@ class TaskStatus(StrEnum):
             TaskStatus.Allocated,
         ]
 
+    def is_finished(self):
+        return self in [TaskStatus.Succeeded, TaskStatus.Failed]
+
 
 class NodePhase(StrEnum):
     Ready = "Ready"
@@ -0,0 +1,92 @@
+from typing import Dict
+from typing import Iterable
+from typing import List
+from typing import Set
+from typing import Tuple
+
+from pydantic import BaseModel
+
+from airport.kube.api import Pod
+from airport.kube.api import Protocol
+from airport.utils.counts import decrease_nested
+
+
+DefaultHostIP = "0.0.0.0"
+
+# (protocol, host ip, host port)
+HostPort = Tuple[str, str, int]
+
+
+def pod_host_ports(pod: Pod) -> List[HostPort]:
+    """
+    :return: the host ports the containers of the pod listen on. With the host
+        network, the container ports are host ports too.
+    """
+
+    ports: List[HostPort] = []
+    for container in pod.spec.containers:
+        for port in container.ports:
+            host_port = port.hostPort
+            if host_port is None and pod.spec.hostNetwork:
+                host_port = port.containerPort
+            if not host_port:
+                continue
+
+            ports.append(
+                (
+                    Protocol(port.protocol).value,
+                    port.hostIP or DefaultHostIP,
+                    host_port,
+                )
+            )
+    return ports
+
+
+class HostPortInfo(BaseModel):
+    """
+    The host ports used by the tasks of a node. Two ports conflict if they
+    have the same protocol and number, and the same host ip or one of them
+    listens on all the ips, `0.0.0.0`.
+    """
+
+    # (protocol, port) -> host ip -> number of the tasks using it
+    ports: Dict[Tuple[str, int], Dict[str, int]] = {}
+    # task key -> host ports of the task
+    tasks: Dict[str, List[HostPort]] = {}
+
+    @property
+    def used(self) -> Set[HostPort]:
+        return {
+            (protocol, ip, port)
+            for (protocol, port), ips in self.ports.items()
+            for ip in ips
+        }
+
+    def add(self, key: str, ports: List[HostPort]):
+        self.remove(key)
+        if not ports:
+            return
+
+        self.tasks[key] = ports
+        for protocol, ip, port in ports:
+            ips = self.ports.setdefault((protocol, port), {})
+            ips[ip] = ips.get(ip, 0) + 1
+
+    def remove(self, key: str) -> List[HostPort]:
+        ports = self.tasks.pop(key, [])
+        for protocol, ip, port in ports:
+            decrease_nested(self.ports, (protocol, port), ip)
+        return ports
+
+    def conflicts(self, host_port: HostPort) -> bool:
+        protocol, ip, port = host_port
+        if not (ips := self.ports.get((protocol, port))):
+            return False
+        return ip == DefaultHostIP or ip in ips or DefaultHostIP in ips
+
+    def fits(self, ports: Iterable[HostPort]) -> bool:
+        """
+        :return: True if none of the ports conflicts with the used ones.
+        """
+
+        return not any(self.conflicts(port) for port in ports)
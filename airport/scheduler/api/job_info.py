@@ -1,19 +1,28 @@
+import pickle
+import zlib
+
 from collections import defaultdict
+from copy import deepcopy
 from datetime import datetime
+from typing import Any
 from typing import Dict
 from typing import Optional
 from typing import Union
 
 from pydantic import BaseModel
+from pydantic import PrivateAttr
 
 from airport.api.scheduling import KubeGroupNameAnnotationKey
 from airport.kube.api import DefaultDatetime
+from airport.kube.api import ObjectMeta
 from airport.kube.api import Pod
 from airport.kube.api import PodPhase
 
 from .enums import TaskStatus
 from .pod_group_info import PodGroup
 from .resource_info import Resource
+from .spec_store import PodSpecPerPodFields
+from .spec_store import PodSpecStore
 
 
 class FailedToFindTask(Exception):
@@ -37,15 +46,22 @@ class TaskInfo(BaseModel):
     priority: int = 0
     volume_ready: bool = False
     pod: Pod = Pod()
+    # the compressed pod dropped by `compact`, not part of the model
+    _pod_blob: Optional[bytes] = PrivateAttr(None)
+    _spec_store: Optional[PodSpecStore] = PrivateAttr(None)
 
     @classmethod
-    def new(cls, pod: Pod) -> "TaskInfo":
+    def new(cls, pod: Pod, spec_store: Optional[PodSpecStore] = None) -> "TaskInfo":
+        if spec_store is not None:
+            spec = spec_store.intern(pod.spec, pod.metadata.uid)
+            pod = pod.copy(update={"spec": spec})
+
         request = get_pod_resource_without_init_container(pod)
         init_request = get_pod_resource_request(pod)
         job_id = get_job_id(pod)
         status = get_task_status(pod)
 
-        return cls(
+        task = cls(
             uid=pod.metadata.uid,
             job=job_id,
             name=pod.metadata.name,
@@ -57,6 +73,112 @@ class TaskInfo(BaseModel):
             resource_requests=request,
             init_resource_requests=init_request,
         )
+        task._spec_store = spec_store
+        return task
+
+    def clone(self) -> "TaskInfo":
+        """
+        :return: a deep copy of the task, except for the nested parts of its
+            spec when they are shared by a `PodSpecStore`, which are read-only.
+        """
+
+        if self._spec_store is None:
+            return self.copy(deep=True)
+
+        memo: Dict[int, Any] = {
+            id(value): value for value in self.pod.spec.__dict__.values()
+        }
+        return deepcopy(self, memo)
+
+    def release_spec(self):
+        """
+        Drops the reference of the task to its shared spec, once the task is
+        deleted.
+        """
+
+        if self._spec_store is not None:
+            self._spec_store.release(self.uid)
+            self._spec_store = None
+
+    def detach_spec(self) -> Pod:
+        """
+        :return: the pod of the task, with a private spec which is safe to mutate.
+        """
+
+        if self._spec_store is not None:
+            spec = self._spec_store.detach(self.uid, self.pod.spec)
+            self.pod = self.pod.copy(update={"spec": spec})
+            self._spec_store = None
+
+        return self.pod
+
+    @property
+    def pod_blob(self) -> Optional[bytes]:
+        return self._pod_blob
+
+    @property
+    def compacted(self) -> bool:
+        return self._pod_blob is not None
+
+    def compact(self):
+        """
+        Replaces the pod with a tombstone which only keeps its identity, the
+        original pod is kept as a compressed blob until `rehydrate` is called.
+        A spec shared by a `PodSpecStore` is kept as its digest, with the
+        per-pod fields only.
+        """
+
+        if self.compacted:
+            return
+
+        digest = None
+        if self._spec_store is not None:
+            digest = self._spec_store.lookup(self.uid)
+
+        if digest is None:
+            data = self.pod.dict(by_alias=True, exclude_unset=True)
+        else:
+            data = self.pod.dict(by_alias=True, exclude_unset=True, exclude={"spec"})
+            data["spec"] = {
+                name: getattr(self.pod.spec, name) for name in PodSpecPerPodFields
+            }
+
+        blob = pickle.dumps((digest, data), pickle.HIGHEST_PROTOCOL)
+        self._pod_blob = zlib.compress(blob)
+        self.pod = Pod(
+            metadata=ObjectMeta(
+                uid=self.pod.metadata.uid,
+                name=self.pod.metadata.name,
+                namespace=self.pod.metadata.namespace,
+            )
+        )
+
+    def rehydrate(self) -> Pod:
+        """
+        Restores the pod dropped by `compact`, interning its spec again.
+
+        :raises KeyError: if the shared spec of the pod was released since
+        """
+
+        if self._pod_blob is not None:
+            digest, data = pickle.loads(zlib.decompress(self._pod_blob))
+            if digest is not None:
+                if self._spec_store is None:
+                    raise KeyError(digest)
+                data["spec"] = self._spec_store.restore(self.uid, digest, data["spec"])
+
+            self.pod = Pod.parse_obj(data)
+            self._pod_blob = None
+
+        return self.pod
+
+    def compact_like(self, task: "TaskInfo"):
+        """
+        Compacts a copy of `task` which was compacted, sharing its blob.
+        """
+
+        self.pod = task.pod.copy(deep=True)
+        self._pod_blob = task._pod_blob
 
 
 class JobInfo(BaseModel):
@@ -75,6 +197,7 @@ class JobInfo(BaseModel):
     total_request: Resource = Resource()
     create_timestamp: datetime = DefaultDatetime
     pod_group: Optional[PodGroup]
+    compact_finished_tasks: bool = False
 
     @classmethod
     def new(cls, uid: str, *tasks: TaskInfo) -> "JobInfo":
@@ -86,6 +209,9 @@ class JobInfo(BaseModel):
         return job
 
     def add_task_info(self, task: TaskInfo):
+        if self.compact_finished_tasks and task.status.is_finished():
+            task.compact()
+
         self.tasks[task.uid] = task
         self.add_task_index(task)
 
@@ -115,12 +241,26 @@ class JobInfo(BaseModel):
 
     def update_task_status(self, task: TaskInfo, status: TaskStatus):
         if task.uid in self.tasks:
-            self.delete_task_info(task)
+            self.remove_task_info(task)
 
         task.status = status
         self.add_task_info(task)
 
     def delete_task_info(self, task: TaskInfo):
+        """
+        Removes the task from the job and releases its shared spec.
+
+        :raises FailedToFindTask
+        """
+
+        self.remove_task_info(task).release_spec()
+
+    def remove_task_info(self, task: TaskInfo) -> TaskInfo:
+        """
+        :raises FailedToFindTask
+        :return: the task of the job, which keeps its shared spec
+        """
+
         try:
             job_task = self.tasks[task.uid]
         except KeyError:
@@ -133,6 +273,15 @@ class JobInfo(BaseModel):
 
         self.tasks.pop(job_task.uid)
         self.delete_task_index(job_task)
+        return job_task
+
+    def release_specs(self):
+        """
+        Releases the shared specs of all the tasks, once the job is deleted.
+        """
+
+        for task in self.tasks.values():
+            task.release_spec()
 
     def delete_task_index(self, task: TaskInfo):
         try:
@@ -145,6 +294,31 @@ class JobInfo(BaseModel):
         if not job_tasks:
             self.task_status_index.pop(task.status)
 
+    def compact(self) -> int:
+        """
+        Compacts all the finished tasks of the job, the copies held by the
+        nodes are compacted by `NodeInfo.compact_task`.
+
+        :return: the number of newly compacted tasks
+        """
+
+        compacted = 0
+        for status in [TaskStatus.Succeeded, TaskStatus.Failed]:
+            for task in self.task_status_index.get(status, {}).values():
+                if not task.compacted:
+                    task.compact()
+                    compacted += 1
+
+        return compacted
+
+    def rehydrate_task(self, uid: str) -> Pod:
+        """
+        :raises KeyError
+        :return: the original pod of a (possibly compacted) task
+        """
+
+        return self.tasks[uid].rehydrate()
+
     def fit_error(self) -> FitError:
         reasons: Dict[Union[str, TaskStatus], int] = defaultdict(int)
         for status, task_map in self.task_status_index.items():
@@ -1,13 +1,17 @@
+from collections import defaultdict
 from dataclasses import dataclass
 from dataclasses import field
+from threading import Lock
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Set
 from typing import TypeVar
 
 from pydantic import BaseModel
 
 from airport.kube.api import ResourceQuota
-from airport.logger import logger
 from airport.utils.cache import Heap
-from airport.utils.cache import HeapError
 from airport.utils.cache import HeapObjectNotFound
 
 
@@ -68,6 +72,11 @@ class NamespaceCollection:
     def update(self, quota: ResourceQuota):
         self.update_weight(QuotaItem.new_from_resource_quota(quota))
 
+    def bulk_update(self, quotas: List[ResourceQuota]):
+        self.quota_weight.bulk_update(
+            [QuotaItem.new_from_resource_quota(quota) for quota in quotas]
+        )
+
     def delete(self, quota: ResourceQuota):
         try:
             self.delete_weight(QuotaItem.new_from_resource_quota(quota))
@@ -76,14 +85,78 @@ class NamespaceCollection:
             pass
 
     def snapshot(self) -> "NamespaceInfo":
-        try:
-            quota_item: QuotaItem = self.quota_weight.pop()
-            weight = quota_item.weight
-            self.quota_weight.add(quota_item)
-        except HeapError as e:
-            logger.warning(
-                f"namespace {self.name}, quota weight meets error {e} when pop"
-            )
+        quota_item: Optional[QuotaItem] = self.quota_weight.peek()
+        if quota_item is None:
             weight = DefaultNamespaceWeight
+        else:
+            weight = quota_item.weight
 
         return NamespaceInfo(name=self.name, weight=weight)
+
+
+@dataclass
+class NamespaceRegistry:
+    """
+    Owns the `NamespaceCollection` of every namespace and routes the
+    `ResourceQuota` events to them by `metadata.namespace`.
+
+    The namespaces changed since the last `snapshot` are tracked, so a
+    snapshot only rebuilds their `NamespaceInfo` and reuses the others.
+    """
+
+    collections: Dict[str, NamespaceCollection] = field(default_factory=dict)
+    dirty: Set[str] = field(default_factory=set)
+    snapshots: Dict[str, NamespaceInfo] = field(default_factory=dict)
+    lock: Lock = field(default_factory=Lock)
+
+    def _collection(self, namespace: str) -> NamespaceCollection:
+        if (collection := self.collections.get(namespace)) is None:
+            collection = NamespaceCollection(namespace)
+            self.collections[namespace] = collection
+        return collection
+
+    def update(self, quota: ResourceQuota):
+        self.bulk_update([quota])
+
+    def bulk_update(self, quotas: List[ResourceQuota]):
+        by_namespace: Dict[str, List[ResourceQuota]] = defaultdict(list)
+        for quota in quotas:
+            by_namespace[quota.metadata.namespace].append(quota)
+
+        with self.lock:
+            for namespace, namespace_quotas in by_namespace.items():
+                self._collection(namespace).bulk_update(namespace_quotas)
+                self.dirty.add(namespace)
+
+    def delete(self, quota: ResourceQuota):
+        self.bulk_delete([quota])
+
+    def bulk_delete(self, quotas: List[ResourceQuota]):
+        with self.lock:
+            for quota in quotas:
+                namespace = quota.metadata.namespace
+                if (collection := self.collections.get(namespace)) is not None:
+                    collection.delete(quota)
+                    self.dirty.add(namespace)
+
+    def delete_namespace(self, namespace: str):
+        with self.lock:
+            if self.collections.pop(namespace, None) is not None:
+                self.dirty.add(namespace)
+
+    def snapshot(self) -> Dict[str, NamespaceInfo]:
+        """
+        :return: the `NamespaceInfo` of every namespace by name, the infos of
+            the namespaces unchanged since the last snapshot are the same
+            objects.
+        """
+
+        with self.lock:
+            for namespace in self.dirty:
+                if (collection := self.collections.get(namespace)) is not None:
+                    self.snapshots[namespace] = collection.snapshot()
+                else:
+                    self.snapshots.pop(namespace, None)
+            self.dirty.clear()
+
+            return dict(self.snapshots)
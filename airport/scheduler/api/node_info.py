@@ -13,8 +13,15 @@ from airport.logger import logger
 
 from .enums import NodePhase
 from .enums import TaskStatus
+from .host_port_info import HostPortInfo
+from .host_port_info import pod_host_ports
 from .job_info import TaskInfo
 from .resource_info import Resource
+from .volume_info import ClaimResolver
+from .volume_info import VolumeInfo
+from .volume_info import attached_volumes
+from .volume_info import pod_volumes
+from .volume_info import volume_limits
 
 
 class NodeState(BaseModel):
@@ -49,6 +56,8 @@ class NodeInfo(BaseModel):
     allocatable: Resource = Resource()
     capability: Resource = Resource()
     tasks: Dict[str, TaskInfo] = {}
+    host_ports: HostPortInfo = HostPortInfo()
+    volumes: VolumeInfo = VolumeInfo()
     others: Dict[str, Any] = {}
 
     @property
@@ -70,6 +79,10 @@ class NodeInfo(BaseModel):
                 idle=Resource.new(node.status.allocatable),
                 allocatable=Resource.new(node.status.allocatable),
                 capability=Resource.new(node.status.capacity),
+                volumes=VolumeInfo(
+                    limits=volume_limits(node.status.allocatable),
+                    attached=attached_volumes(node.status),
+                ),
             )
 
         node_info.set_node_state(node)
@@ -108,6 +121,8 @@ class NodeInfo(BaseModel):
 
         self.allocatable = Resource.new(node.status.allocatable)
         self.capability = Resource.new(node.status.capacity)
+        self.volumes.limits = volume_limits(node.status.allocatable)
+        self.volumes.attached = attached_volumes(node.status)
         self.releasing = Resource()
         self.pipelined = Resource()
         self.idle = Resource.new(node.status.allocatable)
@@ -134,8 +149,9 @@ class NodeInfo(BaseModel):
         else:
             raise NodeNotReady(f"selected node <{self.name}> NotReady")
 
-    def add_task(self, task: TaskInfo):
+    def add_task(self, task: TaskInfo, resolve: Optional[ClaimResolver] = None):
         """
+        :param resolve: finds the volumes bound to the claims of the task
         :except AddTaskFailed
         :except NodeNotReady
         """
@@ -163,10 +179,13 @@ class NodeInfo(BaseModel):
                 self.used += task.resource_requests
 
         # Node will hold a copy of task to make sure the status
-        # change will not impact resource in node.
-        task_copy: TaskInfo = task.copy(deep=True)
+        # change will not impact resource in node. Specs shared by
+        # `PodSpecStore` are read-only and stay shared.
+        task_copy: TaskInfo = task.clone()
         task.node_name = task_copy.node_name = self.name
         self.tasks[key] = task_copy
+        self.host_ports.add(key, pod_host_ports(task.pod))
+        self.volumes.add(key, pod_volumes(task.pod, resolve))
 
     def remove_task(self, task: TaskInfo):
         """
@@ -191,20 +210,34 @@ class NodeInfo(BaseModel):
                 self.used -= task.resource_requests
 
         self.tasks.pop(key)
+        self.host_ports.remove(key)
+        self.volumes.remove(key)
 
-    def update_task(self, task: TaskInfo):
+    def update_task(self, task: TaskInfo, resolve: Optional[ClaimResolver] = None):
         """
         :except RemoveTaskFailed
         """
         self.remove_task(task)
 
         try:
-            self.add_task(task)
+            self.add_task(task, resolve)
         except NodeException as e:
             logger.fatal(
                 f"failed to add task <{task.namespace}/{task.name}> to node <{self.name}> during task update: {e}"
             )
 
+    def compact_task(self, task: TaskInfo):
+        """
+        Compacts the copy of a task compacted by its job, sharing its blob.
+        """
+
+        if not task.compacted:
+            return
+        if (task_copy := self.tasks.get(gen_pod_key(task.pod))) is None:
+            return
+
+        task_copy.compact_like(task)
+
     def __str__(self):
         if self.node:
             return f"Node ({self.name}): idle <{self.idle}>, used <{self.used}>, releasing <{self.releasing}>, state <phase {self.state.phase}, reason '{self.state.reason}'>, taints <{self.node.spec.taint}>"
@@ -0,0 +1,157 @@
+from typing import Dict
+from typing import Optional
+from typing import Set
+
+from pydantic import BaseModel
+
+from airport.api.scheduling import PodGroupPhase
+from airport.api.scheduling import Queue
+from airport.kube.api import ResourceQuantity
+
+from .enums import TaskStatus
+from .job_info import JobInfo
+from .job_info import TaskInfo
+from .resource_info import Resource
+
+
+def job_inqueue_resource(job: JobInfo) -> Optional[Resource]:
+    """
+    :return: the min resources of the job if its pod group is inqueue.
+    """
+
+    pod_group = job.pod_group
+    if pod_group is None or pod_group.status.phase != PodGroupPhase.Inqueue:
+        return None
+    return Resource.new(pod_group.spec.minResources)
+
+
+class QueueInfo(BaseModel):
+    """
+    The sums of `allocated`, `total_request` and inqueue min resources of the
+    jobs of a queue. They are updated by every job and task change going
+    through the queue, so checking the queue never walks its jobs.
+    """
+
+    uid: str = ""
+    name: str = ""
+    weight: int = 1
+    # the limited resources only, in the units of `Resource`
+    capability: Dict[str, ResourceQuantity] = {}
+    queue: Optional[Queue]
+    jobs: Set[str] = set()
+    allocated: Resource = Resource()
+    request: Resource = Resource()
+    inqueue: Resource = Resource()
+
+    @classmethod
+    def new(cls, queue: Queue) -> "QueueInfo":
+        capability = Resource.new(queue.spec.capability)
+        return cls(
+            uid=queue.metadata.name,
+            name=queue.metadata.name,
+            weight=queue.spec.weight,
+            capability={
+                resource_name: capability.get(resource_name, ResourceQuantity(0))
+                for resource_name in queue.spec.capability
+                if resource_name != "pods"
+            },
+            queue=queue,
+        )
+
+    def add_job(self, job: JobInfo):
+        self.jobs.add(job.uid)
+        self.allocated += job.allocated
+        self.request += job.total_request
+        if (inqueue := job_inqueue_resource(job)) is not None:
+            self.inqueue += inqueue
+
+    def delete_job(self, job: JobInfo):
+        if job.uid not in self.jobs:
+            return
+
+        self.jobs.remove(job.uid)
+        self.allocated -= job.allocated
+        self.request -= job.total_request
+        if (inqueue := job_inqueue_resource(job)) is not None:
+            self.inqueue -= inqueue
+
+    def add_task(self, job: JobInfo, task: TaskInfo):
+        job.add_task_info(task)
+        self.request += task.resource_requests
+        if task.status.is_allocated():
+            self.allocated += task.resource_requests
+
+    def delete_task(self, job: JobInfo, task: TaskInfo):
+        """
+        :raises FailedToFindTask
+        """
+
+        job_task = job.tasks.get(task.uid, task)
+        job.delete_task_info(task)
+        self.request -= job_task.resource_requests
+        if job_task.status.is_allocated():
+            self.allocated -= job_task.resource_requests
+
+    def update_task_status(self, job: JobInfo, task: TaskInfo, status: TaskStatus):
+        job_task = job.tasks.get(task.uid)
+        was_allocated = job_task is not None and job_task.status.is_allocated()
+        job.update_task_status(task, status)
+
+        if job_task is None:
+            # the task was added to the job
+            self.request += task.resource_requests
+
+        if was_allocated and not status.is_allocated():
+            self.allocated -= task.resource_requests
+        elif not was_allocated and status.is_allocated():
+            self.allocated += task.resource_requests
+
+    def update_job_inqueue(self, job: JobInfo, old_job: JobInfo):
+        """
+        Moves the inqueue resources of a job whose pod group changed.
+        """
+
+        if (inqueue := job_inqueue_resource(old_job)) is not None:
+            self.inqueue -= inqueue
+        if (inqueue := job_inqueue_resource(job)) is not None:
+            self.inqueue += inqueue
+
+    def fits(self, resreq: Resource) -> bool:
+        """
+        :return: true if allocating `resreq` keeps the queue within its
+            capability.
+        """
+
+        for resource_name, limit in self.capability.items():
+            used = self.allocated.get(resource_name, ResourceQuantity(0))
+            if used + resreq.get(resource_name, ResourceQuantity(0)) > limit:
+                return False
+        return True
+
+    def overused(self, deserved: Optional[Resource] = None) -> bool:
+        """
+        :return: true if the queue reached its `deserved` resources, or its
+            capability when not given.
+        """
+
+        if deserved is not None:
+            return deserved <= self.allocated
+
+        return any(
+            self.allocated.get(resource_name, ResourceQuantity(0)) >= limit
+            for resource_name, limit in self.capability.items()
+        )
+
+    def remaining_capability(self) -> Dict[str, ResourceQuantity]:
+        """
+        :return: what is left of the capability by limited resource, never
+            negative.
+        """
+
+        return {
+            resource_name: max(
+                limit - self.allocated.get(resource_name, ResourceQuantity(0)),
+                ResourceQuantity(0),
+            )
+            for resource_name, limit in self.capability.items()
+        }
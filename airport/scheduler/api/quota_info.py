@@ -0,0 +1,286 @@
+from dataclasses import dataclass
+from dataclasses import field
+from typing import Callable
+from typing import Dict
+from typing import List
+from typing import NamedTuple
+
+from airport.kube.api import Pod
+from airport.kube.api import ResourceQuantity
+from airport.kube.api import ResourceQuota
+from airport.kube.api import ResourceQuotaScope
+from airport.kube.api import ResourceQuotaSpec
+from airport.kube.api import ScopedResourceSelectorRequirement
+from airport.kube.api import ScopeSelectorOperator
+
+from .job_info import TaskInfo
+
+
+class PodScope(NamedTuple):
+    """
+    The fields of a pod the quota scopes depend on.
+    """
+
+    priority_class: str
+    terminating: bool
+    best_effort: bool
+
+
+ScopePredicate = Callable[[PodScope], bool]
+
+# the quota resource names which are aliases of tracked usage names
+QuotaResourceAliases = {
+    "cpu": "requests.cpu",
+    "memory": "requests.memory",
+    "count/pods": "pods",
+}
+
+
+class InvalidScopeSelector(Exception):
+    ...
+
+
+def is_terminating(pod: Pod) -> bool:
+    deadline = pod.spec.activeDeadlineSeconds
+    return deadline is not None and deadline >= 0
+
+
+def is_best_effort(pod: Pod) -> bool:
+    for container in [*pod.spec.initContainers, *pod.spec.containers]:
+        for resources in [container.resources.requests, container.resources.limits]:
+            if "cpu" in resources or "memory" in resources:
+                return False
+    return True
+
+
+def pod_scope(pod: Pod) -> PodScope:
+    return PodScope(
+        priority_class=pod.spec.priorityClassName,
+        terminating=is_terminating(pod),
+        best_effort=is_best_effort(pod),
+    )
+
+
+def compile_scope_requirement(
+    requirement: ScopedResourceSelectorRequirement,
+) -> ScopePredicate:
+    """
+    :raises InvalidScopeSelector
+    """
+
+    scope, operator = requirement.scopeName, requirement.operator
+    if scope == ResourceQuotaScope.PriorityClass:
+        values = frozenset(requirement.values)
+        if operator == ScopeSelectorOperator.In:
+            return lambda scope: scope.priority_class in values
+        if operator == ScopeSelectorOperator.NotIn:
+            return lambda scope: scope.priority_class not in values
+        if operator == ScopeSelectorOperator.Exists:
+            return lambda scope: scope.priority_class != ""
+        return lambda scope: scope.priority_class == ""
+
+    if operator != ScopeSelectorOperator.Exists:
+        raise InvalidScopeSelector(
+            f"operator {operator} is not supported for scope {scope}"
+        )
+
+    if scope == ResourceQuotaScope.Terminating:
+        return lambda scope: scope.terminating
+    if scope == ResourceQuotaScope.NotTerminating:
+        return lambda scope: not scope.terminating
+    if scope == ResourceQuotaScope.BestEffort:
+        return lambda scope: scope.best_effort
+    if scope == ResourceQuotaScope.NotBestEffort:
+        return lambda scope: not scope.best_effort
+
+    raise InvalidScopeSelector(f"unsupported scope {scope}")
+
+
+def compile_scope_selector(spec: ResourceQuotaSpec) -> ScopePredicate:
+    """
+    Turns `scopes` and `scopeSelector` of a quota into a single predicate of
+    the `PodScope` of a pod, true if the quota applies to it. Every scope must
+    match.
+
+    :raises InvalidScopeSelector
+    """
+
+    requirements = [
+        ScopedResourceSelectorRequirement(
+            scopeName=scope, operator=ScopeSelectorOperator.Exists
+        )
+        for scope in spec.scopes
+    ]
+    if spec.scopeSelector is not None:
+        requirements.extend(spec.scopeSelector.matchExpressions)
+
+    predicates = [
+        compile_scope_requirement(requirement) for requirement in requirements
+    ]
+    if not predicates:
+        return lambda scope: True
+    if len(predicates) == 1:
+        return predicates[0]
+    return lambda scope: all(predicate(scope) for predicate in predicates)
+
+
+def task_quota_usage(task: TaskInfo) -> Dict[str, ResourceQuantity]:
+    """
+    :return: what a task counts against a quota, by quota resource name in
+        the units of the quota (cores, bytes ...).
+    """
+
+    requests = task.resource_requests
+    usage = {
+        "pods": ResourceQuantity(1),
+        "requests.cpu": requests.milli_cpu / 1000,
+        "requests.memory": requests.memory,
+    }
+    for resource_name, quant in requests.scalar_resources.items():
+        usage[f"requests.{resource_name}"] = quant / 1000
+
+    for container in task.pod.spec.containers:
+        for resource_name, value in container.resources.limits.items():
+            name = f"limits.{resource_name}"
+            usage[name] = usage.get(name, ResourceQuantity(0)) + ResourceQuantity(value)
+
+    return usage
+
+
+def normalize_quota_resource_name(resource_name: str) -> str:
+    return QuotaResourceAliases.get(resource_name, resource_name)
+
+
+@dataclass
+class QuotaTracker:
+    """
+    The usage of one `ResourceQuota` by the allocated tasks it applies to.
+    Only the pod requests and limits, and the pod count are tracked, the
+    other hard limits are ignored.
+    """
+
+    name: str
+    matches: ScopePredicate
+    hard: Dict[str, ResourceQuantity] = field(default_factory=dict)
+    used: Dict[str, ResourceQuantity] = field(default_factory=dict)
+
+    @classmethod
+    def new(cls, quota: ResourceQuota) -> "QuotaTracker":
+        """
+        :raises InvalidScopeSelector
+        """
+
+        return cls(
+            name=quota.metadata.name,
+            matches=compile_scope_selector(quota.spec),
+            hard={
+                normalize_quota_resource_name(resource_name): ResourceQuantity(value)
+                for resource_name, value in quota.spec.hard.items()
+            },
+        )
+
+    def fits(self, usage: Dict[str, ResourceQuantity]) -> bool:
+        for resource_name, limit in self.hard.items():
+            if (quant := usage.get(resource_name)) is None:
+                continue
+            if self.used.get(resource_name, 0) + quant > limit:
+                return False
+        return True
+
+    def add(self, usage: Dict[str, ResourceQuantity], sign: int = 1):
+        for resource_name in self.hard:
+            if (quant := usage.get(resource_name)) is not None:
+                used = self.used.get(resource_name, ResourceQuantity(0))
+                self.used[resource_name] = used + sign * quant
+
+
+@dataclass
+class TaskUsage:
+    scope: PodScope
+    usage: Dict[str, ResourceQuantity]
+
+
+@dataclass
+class NamespaceQuota:
+    trackers: Dict[str, QuotaTracker] = field(default_factory=dict)
+    # the allocated tasks, kept to account a new quota and to release them
+    # even after they were compacted
+    tasks: Dict[str, TaskUsage] = field(default_factory=dict)
+
+
+class QuotaAdmission:
+    """
+    Admits tasks against the `ResourceQuota`s of their namespace. Each quota
+    keeps per-resource counters which allocating and releasing a task update,
+    so checking a task only costs its usage against the quotas it is in scope
+    of, whatever the number of pods in the namespace.
+    """
+
+    def __init__(self):
+        self.namespaces: Dict[str, NamespaceQuota] = {}
+
+    def _namespace(self, namespace: str) -> NamespaceQuota:
+        if (namespace_quota := self.namespaces.get(namespace)) is None:
+            namespace_quota = self.namespaces[namespace] = NamespaceQuota()
+        return namespace_quota
+
+    def set_quota(self, quota: ResourceQuota):
+        """
+        Adds or replaces a quota, its usage is recounted from the allocated
+        tasks of the namespace.
+
+        :raises InvalidScopeSelector
+        """
+
+        namespace_quota = self._namespace(quota.metadata.namespace)
+        tracker = QuotaTracker.new(quota)
+        for task_usage in namespace_quota.tasks.values():
+            if tracker.matches(task_usage.scope):
+                tracker.add(task_usage.usage)
+        namespace_quota.trackers[tracker.name] = tracker
+
+    def delete_quota(self, quota: ResourceQuota):
+        namespace = quota.metadata.namespace
+        if (namespace_quota := self.namespaces.get(namespace)) is not None:
+            namespace_quota.trackers.pop(quota.metadata.name, None)
+
+    def _trackers(self, namespace: str, scope: PodScope) -> List[QuotaTracker]:
+        if (namespace_quota := self.namespaces.get(namespace)) is None:
+            return []
+        return [
+            tracker
+            for tracker in namespace_quota.trackers.values()
+            if tracker.matches(scope)
+        ]
+
+    def fits(self, task: TaskInfo) -> bool:
+        """
+        :return: true if allocating the task keeps every quota of its
+            namespace within its hard limits.
+        """
+
+        if not (trackers := self._trackers(task.namespace, pod_scope(task.pod))):
+            return True
+
+        usage = task_quota_usage(task)
+        return all(tracker.fits(usage) for tracker in trackers)
+
+    def allocate(self, task: TaskInfo):
+        namespace_quota = self._namespace(task.namespace)
+        if task.uid in namespace_quota.tasks:
+            return
+
+        scope = pod_scope(task.pod)
+        usage = task_quota_usage(task)
+        namespace_quota.tasks[task.uid] = TaskUsage(scope=scope, usage=usage)
+        for tracker in self._trackers(task.namespace, scope):
+            tracker.add(usage)
+
+    def release(self, task: TaskInfo):
+        if (namespace_quota := self.namespaces.get(task.namespace)) is None:
+            return
+        if (task_usage := namespace_quota.tasks.pop(task.uid, None)) is None:
+            return
+
+        for tracker in self._trackers(task.namespace, task_usage.scope):
+            tracker.add(task_usage.usage, sign=-1)
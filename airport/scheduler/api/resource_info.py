@@ -49,7 +49,13 @@ class Resource(BaseModel):
 
         return resource
 
-    def get(self, resource_name: str) -> ResourceQuantity:
+    def get(
+        self, resource_name: str, default: Optional[ResourceQuantity] = None
+    ) -> ResourceQuantity:
+        """
+        :raises ValueError: if the resource is unknown and no default is given
+        """
+
         if resource_name == "cpu":
             return self.milli_cpu
         elif resource_name == "memory":
@@ -58,6 +64,8 @@ class Resource(BaseModel):
             try:
                 return self.scalar_resources[resource_name]
             except KeyError:
+                if default is not None:
+                    return default
                 raise ValueError(f"Unknown resource {resource_name}")
 
     def set_scalar_resource(
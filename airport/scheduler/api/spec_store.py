@@ -0,0 +1,224 @@
+import hashlib
+
+from threading import Lock
+from typing import Any
+from typing import Dict
+from typing import Optional
+from typing import Set
+from typing import Type
+
+from pydantic import BaseModel
+
+from airport.kube.api import PodSpec
+
+
+# Fields which differ between pods stamped from the same template, they are
+# excluded from the digest and every pod keeps its own value.
+PodSpecPerPodFields: Set[str] = {"nodeName", "hostname", "subdomain"}
+
+
+def _read_only(self, *args, **kwargs):
+    raise TypeError("shared pod spec is read-only, detach it before mutating")
+
+
+class FrozenList(list):
+    append = extend = insert = remove = pop = clear = sort = reverse = _read_only
+    __setitem__ = __delitem__ = __iadd__ = __imul__ = _read_only
+
+    def __reduce__(self):
+        return FrozenList, (list(self),)
+
+
+class FrozenDict(dict):
+    clear = pop = popitem = setdefault = update = _read_only
+    __setitem__ = __delitem__ = __ior__ = _read_only
+
+    def __reduce__(self):
+        return FrozenDict, (dict(self),)
+
+
+# model class -> its read-only subclass, and back
+_frozen_models: Dict[Type[BaseModel], Type[BaseModel]] = {}
+_thawed_models: Dict[Type[BaseModel], Type[BaseModel]] = {}
+
+
+def _frozen_model(cls: Type[BaseModel]) -> Type[BaseModel]:
+    if cls in _thawed_models:
+        return cls
+
+    if (frozen := _frozen_models.get(cls)) is None:
+
+        class Config:
+            allow_mutation = False
+
+        frozen = type(
+            cls.__name__,
+            (cls,),
+            {
+                "__module__": cls.__module__,
+                "__qualname__": cls.__qualname__,
+                "Config": Config,
+            },
+        )
+        _frozen_models[cls] = frozen
+        _thawed_models[frozen] = cls
+    return frozen
+
+
+def freeze(value: Any) -> Any:
+    """
+    :return: a read-only copy of `value`, the models, lists and dicts nested in
+        it raise `TypeError` on writes.
+    """
+
+    if isinstance(value, BaseModel):
+        return _frozen_model(type(value)).construct(
+            _fields_set=value.__fields_set__,
+            **{name: freeze(field) for name, field in value.__dict__.items()},
+        )
+    if isinstance(value, list):
+        return FrozenList(freeze(item) for item in value)
+    if isinstance(value, dict):
+        return FrozenDict((key, freeze(item)) for key, item in value.items())
+    return value
+
+
+def thaw(value: Any) -> Any:
+    """
+    :return: a mutable deep copy of `value`, undoing `freeze`.
+    """
+
+    if isinstance(value, BaseModel):
+        return _thawed_models.get(type(value), type(value)).construct(
+            _fields_set=value.__fields_set__,
+            **{name: thaw(field) for name, field in value.__dict__.items()},
+        )
+    if isinstance(value, list):
+        return [thaw(item) for item in value]
+    if isinstance(value, dict):
+        return {key: thaw(item) for key, item in value.items()}
+    return value
+
+
+class PodSpecStore:
+    """
+    Shares one `PodSpec` instance across all pods stamped from the same
+    template, e.g. the pods of a `TaskSpec`.
+
+    Every interned spec is a shallow copy of the shared spec, so top-level
+    fields like `nodeName` are private to the pod, while the nested parts
+    (containers, volumes, affinity ...) are shared and read-only, writing them
+    raises `TypeError`. Call `detach` to get a private copy before mutating
+    them.
+
+    The references are kept by pod uid, with the digest computed at intern
+    time, so that a pod is released whatever happened to its spec since.
+    """
+
+    def __init__(self):
+        self._specs: Dict[str, PodSpec] = {}
+        self._refs: Dict[str, int] = {}
+        # pod uid -> digest of its interned spec
+        self._owners: Dict[str, str] = {}
+        self._lock = Lock()
+
+    def __len__(self) -> int:
+        return len(self._specs)
+
+    def __deepcopy__(self, memo) -> "PodSpecStore":
+        # the copies of a task keep referring to the store of the cluster
+        return self
+
+    @staticmethod
+    def digest(spec: PodSpec) -> str:
+        data = spec.json(exclude=PodSpecPerPodFields, sort_keys=True, encoder=str)
+        return hashlib.blake2b(data.encode(), digest_size=16).hexdigest()
+
+    def intern(self, spec: PodSpec, uid: str) -> PodSpec:
+        """
+        :param uid: the uid of the pod, which holds one reference to the shared
+            spec until `release` is called, interning it again replaces it
+        :return: a spec equal to `spec` whose nested parts are shared with every
+            other spec interned from the same template.
+        """
+
+        key = self.digest(spec)
+        with self._lock:
+            if (shared := self._specs.get(key)) is None:
+                shared = type(spec).construct(
+                    _fields_set=spec.__fields_set__,
+                    **{name: freeze(value) for name, value in spec.__dict__.items()},
+                )
+                self._specs[key] = shared
+                self._refs[key] = 0
+
+            if self._owners.get(uid) != key:
+                self._release(uid)
+                self._owners[uid] = key
+                self._refs[key] += 1
+
+        return shared.copy(
+            update={name: getattr(spec, name) for name in PodSpecPerPodFields}
+        )
+
+    def lookup(self, uid: str) -> Optional[str]:
+        """
+        :return: the digest of the shared spec of the pod, if it holds one.
+        """
+
+        with self._lock:
+            return self._owners.get(uid)
+
+    def restore(self, uid: str, digest: str, fields: Dict[str, Any]) -> PodSpec:
+        """
+        Interns the pod again from the digest of its spec, e.g. when it is
+        rehydrated.
+
+        :param fields: the per-pod fields of the spec
+        :raises KeyError: if no pod refers to the shared spec anymore
+        """
+
+        with self._lock:
+            shared = self._specs[digest]
+            if self._owners.get(uid) != digest:
+                self._release(uid)
+                self._owners[uid] = digest
+                self._refs[digest] += 1
+
+        return shared.copy(update=fields)
+
+    def is_shared(self, uid: str) -> bool:
+        """
+        :return: true if the pod holds a reference to a shared spec.
+        """
+
+        with self._lock:
+            return uid in self._owners
+
+    def release(self, uid: str):
+        """
+        Drops the reference taken by `intern` for the pod, the shared spec is
+        forgotten once no pod refers to it anymore.
+        """
+
+        with self._lock:
+            self._release(uid)
+
+    def _release(self, uid: str):
+        if (key := self._owners.pop(uid, None)) is None:
+            return
+
+        self._refs[key] -= 1
+        if self._refs[key] <= 0:
+            self._refs.pop(key)
+            self._specs.pop(key)
+
+    def detach(self, uid: str, spec: PodSpec) -> PodSpec:
+        """
+        Copy-on-write: returns a private deep copy of `spec` which is safe to
+        mutate, and releases the shared one.
+        """
+
+        private: PodSpec = thaw(spec)
+        self.release(uid)
+        return private
@@ -0,0 +1,206 @@
+from typing import Callable
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Set
+from typing import Tuple
+
+from pydantic import BaseModel
+
+from airport.kube.api import NodeStatus
+from airport.kube.api import Pod
+from airport.kube.api import ResourceList
+from airport.kube.helper import ResourceAttachableVolumesPrefix
+from airport.kube.helper import is_attachable_volume_resource_name
+from airport.utils.counts import decrease
+from airport.utils.counts import decrease_nested
+
+
+CSIVolumeLimitPrefix = "csi-"
+
+# the prefixes of the unique volume names reported by the nodes, e.g.
+# `kubernetes.io/csi/<driver>^<handle>` or `kubernetes.io/aws-ebs/<volume>`
+CSIUniqueVolumePrefix = "kubernetes.io/csi/"
+PluginUniqueVolumePrefix = "kubernetes.io/"
+
+# (driver, unique volume name)
+AttachableVolume = Tuple[str, str]
+
+# claim key -> the volume bound to the claim, None if it is unknown
+ClaimResolver = Callable[[str], Optional[AttachableVolume]]
+
+# the volume of a claim bound to a volume which is not attached to the nodes,
+# e.g. a nfs or a local volume
+NotAttachable: AttachableVolume = ("", "")
+
+
+def claim_key(namespace: str, claim_name: str) -> str:
+    return f"{namespace}/{claim_name}"
+
+
+class TaskVolumes(BaseModel):
+    # the keys of the persistent volume claims
+    claims: List[str] = []
+    attachable: List[AttachableVolume] = []
+    # the keys of the claims whose volume is unknown
+    unresolved: List[str] = []
+
+
+def pod_volumes(pod: Pod, resolve: Optional[ClaimResolver] = None) -> TaskVolumes:
+    """
+    :param resolve: finds the volume bound to a claim, the claims it does not
+        resolve are kept as unresolved, the ones it resolves to `NotAttachable`
+        are not counted
+    :return: the claims and the attachable volumes of the pod, the inline csi
+        volumes and the volumes of the resolved claims.
+    """
+
+    namespace = pod.metadata.namespace
+    volumes = TaskVolumes()
+    for volume in pod.spec.volumes:
+        if volume.persistentVolumeClaim is not None:
+            claim = claim_key(namespace, volume.persistentVolumeClaim.claimName)
+            volumes.claims.append(claim)
+            if resolve is None or (attachable := resolve(claim)) is None:
+                volumes.unresolved.append(claim)
+            elif attachable != NotAttachable:
+                volumes.attachable.append(attachable)
+        elif volume.csi is not None and volume.csi.driver:
+            name = f"{namespace}/{pod.metadata.name}/{volume.name}"
+            volumes.attachable.append((volume.csi.driver, name))
+    return volumes
+
+
+def volume_limits(allocatable: ResourceList) -> Dict[str, int]:
+    """
+    :return: the maximum number of attachable volumes per driver, from the
+        `attachable-volumes-<driver>` and `attachable-volumes-csi-<driver>`
+        allocatable resources.
+    """
+
+    limits: Dict[str, int] = {}
+    for name, quantity in allocatable.items():
+        if not is_attachable_volume_resource_name(name):
+            continue
+
+        driver = name[len(ResourceAttachableVolumesPrefix) :]
+        if driver.startswith(CSIVolumeLimitPrefix):
+            driver = driver[len(CSIVolumeLimitPrefix) :]
+        limits[driver] = int(quantity)
+    return limits
+
+
+def volume_driver(name: str) -> Optional[str]:
+    """
+    :return: the driver of a unique volume name reported by a node, named like
+        in `volume_limits`, None if the name has no known form.
+    """
+
+    if name.startswith(CSIUniqueVolumePrefix):
+        driver, sep, _ = name[len(CSIUniqueVolumePrefix) :].partition("^")
+        return driver if sep and driver else None
+    if name.startswith(PluginUniqueVolumePrefix):
+        plugin, sep, _ = name[len(PluginUniqueVolumePrefix) :].partition("/")
+        return plugin if sep and plugin else None
+    return None
+
+
+def attached_volumes(status: NodeStatus) -> Dict[str, Set[str]]:
+    """
+    :return: the unique names of the volumes attached to or in use on the node
+        per driver, as reported by its status.
+    """
+
+    attached: Dict[str, Set[str]] = {}
+    names = [volume.name for volume in status.volumesAttached]
+    for name in [*names, *status.volumesInUse]:
+        if (driver := volume_driver(name)) is not None:
+            attached.setdefault(driver, set()).add(name)
+    return attached
+
+
+class VolumeInfo(BaseModel):
+    """
+    The volumes used by the tasks of a node: the claims, and the attachable
+    volumes counted per driver. A volume shared by several tasks is counted
+    once, like by the attach limits of the nodes.
+
+    The counts start from the volumes the node status reports, which are the
+    same as the ones of the tasks when the claims are resolved to their unique
+    volume name. A claim of unknown volume may be of any driver, it is counted
+    towards all of them, unless the reported volumes no task is known to use
+    already cover it.
+    """
+
+    # claim key -> number of the tasks using it
+    claims: Dict[str, int] = {}
+    # unresolved claim key -> number of the tasks using it
+    unresolved: Dict[str, int] = {}
+    # driver -> volume name -> number of the tasks using it
+    drivers: Dict[str, Dict[str, int]] = {}
+    # task key -> volumes of the task
+    tasks: Dict[str, TaskVolumes] = {}
+    # driver -> maximum number of volumes
+    limits: Dict[str, int] = {}
+    # driver -> unique names of the volumes reported by the node status
+    attached: Dict[str, Set[str]] = {}
+
+    def add(self, key: str, volumes: TaskVolumes):
+        self.remove(key)
+        if not volumes.claims and not volumes.attachable:
+            return
+
+        self.tasks[key] = volumes
+        for claim in volumes.claims:
+            self.claims[claim] = self.claims.get(claim, 0) + 1
+        for claim in volumes.unresolved:
+            self.unresolved[claim] = self.unresolved.get(claim, 0) + 1
+        for driver, name in volumes.attachable:
+            names = self.drivers.setdefault(driver, {})
+            names[name] = names.get(name, 0) + 1
+
+    def remove(self, key: str):
+        if (volumes := self.tasks.pop(key, None)) is None:
+            return
+
+        for claim in volumes.claims:
+            decrease(self.claims, claim)
+        for claim in volumes.unresolved:
+            decrease(self.unresolved, claim)
+        for driver, name in volumes.attachable:
+            decrease_nested(self.drivers, driver, name)
+
+    def count(self, driver: str) -> int:
+        names = self.drivers.get(driver, {})
+        attached = self.attached.get(driver, set())
+        # the volumes of the unresolved claims of running tasks are likely
+        # among the reported ones which no resolved volume accounts for
+        uncovered = len(self.unresolved) - len(attached.difference(names))
+        return len(attached.union(names)) + max(uncovered, 0)
+
+    def uses_claim(self, claim: str) -> bool:
+        return claim in self.claims
+
+    def uses(self, driver: str, name: str) -> bool:
+        if name in self.drivers.get(driver, {}):
+            return True
+        return name in self.attached.get(driver, ())
+
+    def fits(self, volumes: TaskVolumes) -> bool:
+        """
+        :return: True if attaching the new volumes keeps every driver within
+            its limit, the volumes and the claims already used on the node are
+            free.
+        """
+
+        new: Dict[str, Set[str]] = {}
+        for driver, name in volumes.attachable:
+            if not self.uses(driver, name):
+                new.setdefault(driver, set()).add(name)
+        unresolved = {claim for claim in volumes.unresolved if claim not in self.claims}
+
+        for driver, limit in self.limits.items():
+            added = len(new.get(driver, ())) + len(unresolved)
+            if added and self.count(driver) + added > limit:
+                return False
+        return True
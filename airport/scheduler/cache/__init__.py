@@ -0,0 +1,5 @@
+from .cache import SchedulerCache
+from .label_index import LabelIndex
+from .pod_affinity import PodAffinityIndex
+from .taint_index import TaintIndex
+from .topology_spread import TopologySpreadIndex
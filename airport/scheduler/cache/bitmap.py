@@ -0,0 +1,73 @@
+from typing import Dict
+from typing import Iterator
+from typing import List
+from typing import Optional
+
+
+def iter_bits(bitmap: int) -> Iterator[int]:
+    """
+    Yields the indexes of the set bits, in O(set bits).
+    """
+
+    while bitmap:
+        low = bitmap & -bitmap
+        yield low.bit_length() - 1
+        bitmap ^= low
+
+
+class NodeIds:
+    """
+    Gives every node a small integer id, the bit of the node in the bitmaps
+    of the cache indices. Ids of removed nodes are reused.
+    """
+
+    def __init__(self):
+        self.ids: Dict[str, int] = {}
+        self.names: List[Optional[str]] = []
+        self.free: List[int] = []
+        # the bitmap of all the nodes
+        self.all = 0
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.ids
+
+    def get(self, name: str) -> Optional[int]:
+        return self.ids.get(name)
+
+    def add(self, name: str) -> int:
+        if (node_id := self.ids.get(name)) is not None:
+            return node_id
+
+        if self.free:
+            node_id = self.free.pop()
+            self.names[node_id] = name
+        else:
+            node_id = len(self.names)
+            self.names.append(name)
+
+        self.ids[name] = node_id
+        self.all |= 1 << node_id
+        return node_id
+
+    def remove(self, name: str) -> Optional[int]:
+        if (node_id := self.ids.pop(name, None)) is None:
+            return None
+
+        self.names[node_id] = None
+        self.free.append(node_id)
+        self.all &= ~(1 << node_id)
+        return node_id
+
+    def bitmap(self, names) -> int:
+        bitmap = 0
+        for name in names:
+            if (node_id := self.ids.get(name)) is not None:
+                bitmap |= 1 << node_id
+        return bitmap
+
+    def names_of(self, bitmap: int) -> List[str]:
+        names = self.names
+        return [names[node_id] for node_id in iter_bits(bitmap)]  # type: ignore
@@ -0,0 +1,181 @@
+from dataclasses import dataclass
+from dataclasses import field
+from threading import RLock
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Set
+
+from airport.kube.api import Node
+from airport.kube.api import NodeSelector
+from airport.kube.api import Toleration
+from airport.scheduler.api import JobInfo
+from airport.scheduler.api import NodeInfo
+from airport.scheduler.api import TaskInfo
+from airport.scheduler.api.host_port_info import HostPort
+from airport.scheduler.api.node_info import gen_pod_key
+from airport.scheduler.api.volume_info import ClaimResolver
+
+from .bitmap import NodeIds
+from .host_port_index import HostPortIndex
+from .label_index import LabelIndex
+from .label_index import NodeLabels
+from .pod_affinity import PodAffinityIndex
+from .taint_index import TaintIndex
+from .topology_spread import TopologySpreadIndex
+
+
+@dataclass
+class SchedulerCache:
+    """
+    Owns the `NodeInfo` of every node and the indices built over them. The
+    indices are updated with the nodes in `set_node`, and with the tasks in
+    `add_task` and `remove_task`. It also owns the `JobInfo` of every job, the
+    shared specs of their tasks are released once they are deleted.
+
+    `resolve_claim` is set by the owner of the persistent volume and claim
+    cache, it finds the volumes bound to the claims of the tasks.
+    """
+
+    nodes: Dict[str, NodeInfo] = field(default_factory=dict)
+    # the labels of the nodes, read by the indices
+    node_labels: NodeLabels = field(default_factory=dict)
+    jobs: Dict[str, JobInfo] = field(default_factory=dict)
+    node_ids: NodeIds = field(default_factory=NodeIds)
+    label_index: LabelIndex = field(init=False)
+    taint_index: TaintIndex = field(init=False)
+    pod_affinity: PodAffinityIndex = field(init=False)
+    topology_spread: TopologySpreadIndex = field(init=False)
+    host_ports: HostPortIndex = field(default_factory=HostPortIndex)
+    lock: RLock = field(default_factory=RLock)
+    resolve_claim: Optional[ClaimResolver] = None
+
+    def __post_init__(self):
+        self.label_index = LabelIndex(self.node_ids, self.node_labels)
+        self.taint_index = TaintIndex(self.node_ids)
+        self.pod_affinity = PodAffinityIndex(self.node_labels)
+        self.topology_spread = TopologySpreadIndex(self.node_labels)
+
+    def set_node(self, node_info: NodeInfo, node: Node):
+        node_info.set_node(node)
+        name, labels = node.metadata.name, node.metadata.labels
+        self.taint_index.set_node(name, node.spec.taint)
+        if (old := self.node_labels.get(name)) != labels:
+            self.node_labels[name] = dict(labels)
+            self.relabel_node(name, old)
+
+    def relabel_node(self, name: str, old: Optional[Dict[str, str]]):
+        self.label_index.relabel_node(name, old)
+        self.pod_affinity.relabel_node(name, old)
+        self.topology_spread.relabel_node(name, old)
+
+    def add_node(self, node: Node):
+        with self.lock:
+            name = node.metadata.name
+            if (node_info := self.nodes.get(name)) is None:
+                node_info = self.nodes[name] = NodeInfo.new(node)
+            self.set_node(node_info, node)
+
+    def update_node(self, node: Node):
+        self.add_node(node)
+
+    def delete_node(self, node: Node):
+        with self.lock:
+            name = node.metadata.name
+            if (node_info := self.nodes.pop(name, None)) is not None:
+                for ports in node_info.host_ports.tasks.values():
+                    self.host_ports.remove(name, ports)
+                self.taint_index.remove_node(name, release_id=False)
+                self.relabel_node(name, self.node_labels.pop(name, None))
+                self.node_ids.remove(name)
+
+    def add_job(self, job: JobInfo):
+        with self.lock:
+            self.jobs[job.uid] = job
+
+    def delete_job(self, job: JobInfo):
+        with self.lock:
+            if self.jobs.pop(job.uid, None) is not None:
+                job.release_specs()
+
+    def add_task(self, task: TaskInfo):
+        """
+        Adds a task bound to a node, the node is created not ready if it is
+        not known yet.
+
+        :raises AddTaskFailed
+        :raises NodeNotReady
+        """
+
+        if not task.node_name:
+            return
+
+        with self.lock:
+            if (node_info := self.nodes.get(task.node_name)) is None:
+                node_info = self.nodes[task.node_name] = NodeInfo.new()
+                node_info.name = task.node_name
+
+            node_info.add_task(task, self.resolve_claim)
+            key = gen_pod_key(task.pod)
+            self.host_ports.add(node_info.name, node_info.host_ports.tasks.get(key, []))
+            self.pod_affinity.add_pod(task.pod, node_info.name)
+            self.topology_spread.add_pod(task.pod, node_info.name)
+
+    def remove_task(self, task: TaskInfo):
+        """
+        :raises RemoveTaskFailed
+        """
+
+        with self.lock:
+            if (node_info := self.nodes.get(task.node_name)) is None:
+                return
+
+            ports = node_info.host_ports.tasks.get(gen_pod_key(task.pod), [])
+            node_info.remove_task(task)
+            self.host_ports.remove(node_info.name, ports)
+            self.pod_affinity.remove_pod(task.pod)
+            self.topology_spread.remove_pod(task.pod)
+
+    def conflicting_nodes(self, ports: List[HostPort]) -> Set[str]:
+        """
+        :return: the nodes where any of the host ports is already used.
+        """
+
+        with self.lock:
+            return {
+                name
+                for name in self.host_ports.candidates(ports)
+                if not self.nodes[name].host_ports.fits(ports)
+            }
+
+    def node_infos(self, bitmap: int) -> List[NodeInfo]:
+        return [self.nodes[name] for name in self.node_ids.names_of(bitmap)]
+
+    def select_nodes(
+        self,
+        node_selector: Optional[Dict[str, str]] = None,
+        required: Optional[NodeSelector] = None,
+        tolerations: Optional[List[Toleration]] = None,
+        host_ports: Optional[List[HostPort]] = None,
+    ) -> List[NodeInfo]:
+        """
+        :param node_selector: the labels the nodes must all carry
+        :param required: the required node affinity of a pod
+        :param tolerations: the tolerations of a pod, the taints are not
+            checked if None
+        :param host_ports: the host ports of a pod
+        :return: the nodes matching all of them, in time proportional to the matches.
+        """
+
+        with self.lock:
+            bitmap = self.node_ids.all
+            if node_selector:
+                bitmap &= self.label_index.match_labels(node_selector)
+            if required is not None:
+                bitmap &= self.label_index.match_node_selector(required)
+            if tolerations is not None:
+                bitmap &= self.taint_index.match_tolerations(tolerations)
+            if host_ports:
+                conflicting = self.conflicting_nodes(host_ports)
+                bitmap &= ~self.node_ids.bitmap(conflicting)
+            return self.node_infos(bitmap)
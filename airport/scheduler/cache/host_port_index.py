@@ -0,0 +1,42 @@
+from typing import Dict
+from typing import Iterable
+from typing import Set
+from typing import Tuple
+
+from airport.scheduler.api.host_port_info import HostPort
+from airport.utils.counts import decrease_nested
+
+
+class HostPortIndex:
+    """
+    Maps every (protocol, host port) used in the cluster to the nodes using
+    it, so that the nodes a pod with host ports may conflict with are found
+    without looking at the others.
+    """
+
+    def __init__(self):
+        # (protocol, port) -> node name -> number of its tasks using it
+        self.nodes: Dict[Tuple[str, int], Dict[str, int]] = {}
+
+    def add(self, node: str, ports: Iterable[HostPort]):
+        for protocol, _, port in ports:
+            nodes = self.nodes.setdefault((protocol, port), {})
+            nodes[node] = nodes.get(node, 0) + 1
+
+    def remove(self, node: str, ports: Iterable[HostPort]):
+        for protocol, _, port in ports:
+            decrease_nested(self.nodes, (protocol, port), node)
+
+    def using(self, protocol: str, port: int) -> Set[str]:
+        return set(self.nodes.get((protocol, port), ()))
+
+    def candidates(self, ports: Iterable[HostPort]) -> Set[str]:
+        """
+        :return: the nodes using any of the ports, whatever their host ip,
+            the only ones which may conflict with them.
+        """
+
+        names: Set[str] = set()
+        for protocol, _, port in ports:
+            names.update(self.nodes.get((protocol, port), ()))
+        return names
@@ -0,0 +1,167 @@
+from typing import Dict
+from typing import List
+from typing import Optional
+
+from airport.kube.api import NodeSelector
+from airport.kube.api import NodeSelectorOperator
+from airport.kube.api import NodeSelectorRequirement
+from airport.kube.api import NodeSelectorTerm
+from airport.kube.selector import NodeFieldName
+from airport.kube.selector import int_or_none
+
+from .bitmap import NodeIds
+
+
+# node name -> labels, shared by the indices of a `SchedulerCache`
+NodeLabels = Dict[str, Dict[str, str]]
+
+
+class LabelIndex:
+    """
+    An inverted index of the node labels: label key -> value -> bitmap of the
+    ids of the nodes carrying it. Node selector requirements become unions,
+    intersections and complements of bitmaps, so matching costs the number of
+    label values involved instead of the number of nodes.
+    """
+
+    def __init__(
+        self, ids: Optional[NodeIds] = None, node_labels: Optional[NodeLabels] = None
+    ):
+        self.ids = ids if ids is not None else NodeIds()
+        self.node_labels = node_labels if node_labels is not None else {}
+        self.values: Dict[str, Dict[str, int]] = {}
+        # key -> bitmap of the nodes having the key, whatever its value
+        self.keys: Dict[str, int] = {}
+
+    def set_node(self, name: str, labels: Dict[str, str]):
+        if (old := self.node_labels.get(name)) == labels:
+            return
+
+        self.node_labels[name] = dict(labels)
+        self.relabel_node(name, old)
+
+    def remove_node(self, name: str, release_id: bool = True):
+        self.relabel_node(name, self.node_labels.pop(name, None))
+        if release_id:
+            self.ids.remove(name)
+
+    def relabel_node(self, name: str, old: Optional[Dict[str, str]]):
+        """
+        Moves the node from its `old` labels to the ones `node_labels` holds
+        now, none if the node was removed from it.
+        """
+
+        if old is not None and (node_id := self.ids.get(name)) is not None:
+            mask = ~(1 << node_id)
+            for key, value in old.items():
+                values = self.values[key]
+                if bitmap := values[value] & mask:
+                    values[value] = bitmap
+                else:
+                    del values[value]
+                if bitmap := self.keys[key] & mask:
+                    self.keys[key] = bitmap
+                else:
+                    del self.keys[key]
+                    del self.values[key]
+
+        if (labels := self.node_labels.get(name)) is None:
+            return
+
+        bit = 1 << self.ids.add(name)
+        for key, value in labels.items():
+            values = self.values.setdefault(key, {})
+            values[value] = values.get(value, 0) | bit
+            self.keys[key] = self.keys.get(key, 0) | bit
+
+    def _compare_values(self, key: str, bound: int, greater: bool) -> int:
+        bitmap = 0
+        for value, nodes in self.values.get(key, {}).items():
+            if (number := int_or_none(value)) is None:
+                continue
+            if number > bound if greater else number < bound:
+                bitmap |= nodes
+        return bitmap
+
+    def lookup(self, requirement: NodeSelectorRequirement) -> int:
+        """
+        :return: the bitmap of the nodes whose labels match the requirement.
+        """
+
+        key, operator = requirement.key, requirement.operator
+        values = self.values.get(key, {})
+        if operator == NodeSelectorOperator.In:
+            bitmap = 0
+            for value in requirement.values:
+                bitmap |= values.get(value, 0)
+            return bitmap
+        if operator == NodeSelectorOperator.NotIn:
+            bitmap = 0
+            for value in requirement.values:
+                bitmap |= values.get(value, 0)
+            return self.ids.all & ~bitmap
+        if operator == NodeSelectorOperator.Exists:
+            return self.keys.get(key, 0)
+        if operator == NodeSelectorOperator.DoesNotExist:
+            return self.ids.all & ~self.keys.get(key, 0)
+
+        if len(requirement.values) != 1:
+            return 0
+        if (bound := int_or_none(requirement.values[0])) is None:
+            return 0
+        return self._compare_values(
+            key, bound, greater=operator == NodeSelectorOperator.Gt
+        )
+
+    def lookup_field(self, requirement: NodeSelectorRequirement) -> int:
+        if requirement.key != NodeFieldName:
+            return 0
+
+        names = self.ids.bitmap(requirement.values)
+        if requirement.operator == NodeSelectorOperator.In:
+            return names
+        if requirement.operator == NodeSelectorOperator.NotIn:
+            return self.ids.all & ~names
+        return 0
+
+    def match_term(self, term: NodeSelectorTerm) -> int:
+        """
+        :return: the nodes matching all the requirements of the term, none
+            for an empty term.
+        """
+
+        if not term.matchExpressions and not term.matchFields:
+            return 0
+
+        bitmap = self.ids.all
+        for requirement in term.matchExpressions:
+            if not (bitmap := bitmap & self.lookup(requirement)):
+                return 0
+        for requirement in term.matchFields:
+            if not (bitmap := bitmap & self.lookup_field(requirement)):
+                return 0
+        return bitmap
+
+    def match_node_selector(self, selector: NodeSelector) -> int:
+        """
+        :return: the nodes matching any of the terms.
+        """
+
+        bitmap = 0
+        for term in selector.nodeSelectorTerms:
+            bitmap |= self.match_term(term)
+        return bitmap
+
+    def match_labels(self, labels: Dict[str, str]) -> int:
+        """
+        :return: the nodes carrying all the labels, like a node selector.
+        """
+
+        bitmap = self.ids.all
+        for key, value in labels.items():
+            if not (bitmap := bitmap & self.values.get(key, {}).get(value, 0)):
+                return 0
+        return bitmap
+
+    def nodes(self, bitmap: int) -> List[str]:
+        return self.ids.names_of(bitmap)
@@ -0,0 +1,292 @@
+from typing import Dict
+from typing import FrozenSet
+from typing import List
+from typing import NamedTuple
+from typing import Optional
+from typing import Set
+from typing import Tuple
+
+from airport.kube.api import Pod
+from airport.kube.api import PodAffinityTerm
+from airport.kube.api import WeightedPodAffinityTerm
+from airport.kube.labels import CompiledLabelSelector
+from airport.kube.labels import compile_label_selector
+from airport.scheduler.api.node_info import gen_pod_key
+from airport.utils.counts import decrease
+from airport.utils.counts import decrease_nested
+
+from .label_index import NodeLabels
+
+
+class AffinityTermKey(NamedTuple):
+    selector: CompiledLabelSelector
+    namespaces: FrozenSet[str]
+    topology_key: str
+
+    def matches(self, namespace: str, labels: Dict[str, str]) -> bool:
+        return namespace in self.namespaces and self.selector.matches(labels)
+
+
+class PlacedPod(NamedTuple):
+    node: str
+    namespace: str
+    labels: Dict[str, str]
+    # the required anti-affinity terms of the pod
+    anti_affinity: Tuple[AffinityTermKey, ...]
+
+
+def affinity_term_key(term: PodAffinityTerm, namespace: str) -> AffinityTermKey:
+    """
+    :param namespace: the namespace of the pod carrying the term, the term
+        selects the pods of this namespace if it lists no namespace
+    """
+
+    return AffinityTermKey(
+        selector=compile_label_selector(term.labelSelector),
+        namespaces=frozenset(term.namespaces or (namespace,)),
+        topology_key=term.topologyKey,
+    )
+
+
+def pod_affinity_terms(
+    pod: Pod,
+) -> Tuple[List[PodAffinityTerm], List[PodAffinityTerm]]:
+    """
+    :return: the required affinity and anti-affinity terms of the pod.
+    """
+
+    affinity = pod.spec.affinity
+    if affinity is None:
+        return [], []
+
+    required = (
+        []
+        if affinity.podAffinity is None
+        else affinity.podAffinity.requiredDuringSchedulingIgnoredDuringExecution
+    )
+    anti_required = (
+        []
+        if affinity.podAntiAffinity is None
+        else affinity.podAntiAffinity.requiredDuringSchedulingIgnoredDuringExecution
+    )
+    return required, anti_required
+
+
+def pod_preferred_terms(
+    pod: Pod,
+) -> Tuple[List[WeightedPodAffinityTerm], List[WeightedPodAffinityTerm]]:
+    """
+    :return: the preferred affinity and anti-affinity terms of the pod.
+    """
+
+    affinity = pod.spec.affinity
+    if affinity is None:
+        return [], []
+
+    preferred = (
+        []
+        if affinity.podAffinity is None
+        else affinity.podAffinity.preferredDuringSchedulingIgnoredDuringExecution
+    )
+    anti_preferred = (
+        []
+        if affinity.podAntiAffinity is None
+        else affinity.podAntiAffinity.preferredDuringSchedulingIgnoredDuringExecution
+    )
+    return preferred, anti_preferred
+
+
+class PodAffinityIndex:
+    """
+    Counts the placed pods matching an affinity term per topology domain, the
+    value of the term topology key on the node of the pod. The counters are
+    keyed by (selector, namespaces, topology key), so the replicas of a job
+    share them, and are kept up to date as pods are added and removed, which
+    makes the affinity checks cost the number of terms instead of the number
+    of placed pods.
+
+    The required anti-affinity terms of the placed pods are counted per domain
+    too, for the symmetric check of an incoming pod against them.
+    """
+
+    def __init__(self, node_labels: Optional[NodeLabels] = None):
+        self.node_labels = node_labels if node_labels is not None else {}
+        self.node_pods: Dict[str, Set[str]] = {}
+        self.pods: Dict[str, PlacedPod] = {}
+        # term -> domain -> number of the placed pods matching the term
+        self.counters: Dict[AffinityTermKey, Dict[str, int]] = {}
+        # term -> domain -> number of the placed pods carrying the term
+        self.anti_affinity: Dict[AffinityTermKey, Dict[str, int]] = {}
+
+    def set_node(self, name: str, labels: Dict[str, str]):
+        if (old := self.node_labels.get(name)) == labels:
+            return
+
+        self.node_labels[name] = dict(labels)
+        self.relabel_node(name, old)
+
+    def remove_node(self, name: str):
+        self.relabel_node(name, self.node_labels.pop(name, None))
+
+    def relabel_node(self, name: str, old: Optional[Dict[str, str]]):
+        """
+        Moves the pods of the node from the domains of its `old` labels to the
+        ones of the labels `node_labels` holds now, the pods are dropped if the
+        node was removed from it.
+        """
+
+        pods = [(key, self.pods[key]) for key in self.node_pods.get(name, ())]
+        for key, _ in pods:
+            self._remove(key, old or {})
+
+        if name not in self.node_labels:
+            self.node_pods.pop(name, None)
+            return
+        for key, placed in pods:
+            self._add(key, placed)
+
+    def domain(self, node: str, topology_key: str) -> Optional[str]:
+        return self.node_labels.get(node, {}).get(topology_key)
+
+    def add_pod(self, pod: Pod, node: str):
+        namespace = pod.metadata.namespace
+        _, anti_required = pod_affinity_terms(pod)
+        placed = PlacedPod(
+            node=node,
+            namespace=namespace,
+            labels=dict(pod.metadata.labels),
+            anti_affinity=tuple(
+                affinity_term_key(term, namespace) for term in anti_required
+            ),
+        )
+
+        key = gen_pod_key(pod)
+        self._remove(key)
+        self._add(key, placed)
+
+    def remove_pod(self, pod: Pod):
+        self._remove(gen_pod_key(pod))
+
+    def _add(self, key: str, placed: PlacedPod):
+        self.pods[key] = placed
+        self.node_pods.setdefault(placed.node, set()).add(key)
+        labels = self.node_labels.get(placed.node, {})
+
+        for term, counts in self.counters.items():
+            if (domain := labels.get(term.topology_key)) is not None and term.matches(
+                placed.namespace, placed.labels
+            ):
+                counts[domain] = counts.get(domain, 0) + 1
+
+        for term in placed.anti_affinity:
+            if (domain := labels.get(term.topology_key)) is not None:
+                counts = self.anti_affinity.setdefault(term, {})
+                counts[domain] = counts.get(domain, 0) + 1
+
+    def _remove(self, key: str, labels: Optional[Dict[str, str]] = None):
+        """
+        :param labels: the labels the pod was counted with, the current ones of
+            its node if None
+        """
+
+        if (placed := self.pods.pop(key, None)) is None:
+            return
+
+        self.node_pods[placed.node].discard(key)
+        if labels is None:
+            labels = self.node_labels.get(placed.node, {})
+
+        for term, counts in self.counters.items():
+            if (domain := labels.get(term.topology_key)) is not None and term.matches(
+                placed.namespace, placed.labels
+            ):
+                decrease(counts, domain)
+
+        for term in placed.anti_affinity:
+            if (domain := labels.get(term.topology_key)) is not None:
+                decrease_nested(self.anti_affinity, term, domain)
+
+    def domain_counts(self, term: AffinityTermKey) -> Dict[str, int]:
+        """
+        :return: the number of the placed pods matching the term per domain.
+            The counter of a new term is built from the placed pods once, then
+            maintained incrementally until `forget` is called.
+        """
+
+        if (counts := self.counters.get(term)) is not None:
+            return counts
+
+        counts = self.counters[term] = {}
+        for placed in self.pods.values():
+            domain = self.domain(placed.node, term.topology_key)
+            if domain is not None and term.matches(placed.namespace, placed.labels):
+                counts[domain] = counts.get(domain, 0) + 1
+        return counts
+
+    def forget(self, term: AffinityTermKey):
+        self.counters.pop(term, None)
+
+    def satisfies_affinity(self, pod: Pod, node: str) -> bool:
+        """
+        :return: True if every required affinity term of the pod is matched by
+            a placed pod in the domain of the node. Like in kubernetes, a term
+            matched by no placed pod at all is satisfied by a pod matching it
+            itself, so that the first pod of a group can be placed.
+        """
+
+        namespace = pod.metadata.namespace
+        required, _ = pod_affinity_terms(pod)
+        for term in required:
+            key = affinity_term_key(term, namespace)
+            if (domain := self.domain(node, key.topology_key)) is None:
+                return False
+
+            counts = self.domain_counts(key)
+            if counts.get(domain, 0):
+                continue
+            if counts or not key.matches(namespace, pod.metadata.labels):
+                return False
+
+        return True
+
+    def satisfies_anti_affinity(self, pod: Pod, node: str) -> bool:
+        """
+        :return: True if no placed pod in the domain of the node matches a
+            required anti-affinity term of the pod, and if the pod matches no
+            required anti-affinity term of a placed pod in that domain.
+        """
+
+        namespace = pod.metadata.namespace
+        _, anti_required = pod_affinity_terms(pod)
+        for term in anti_required:
+            key = affinity_term_key(term, namespace)
+            domain = self.domain(node, key.topology_key)
+            if domain is not None and self.domain_counts(key).get(domain, 0):
+                return False
+
+        labels = pod.metadata.labels
+        for key, counts in self.anti_affinity.items():
+            domain = self.domain(node, key.topology_key)
+            if domain in counts and key.matches(namespace, labels):
+                return False
+
+        return True
+
+    def score(self, pod: Pod, node: str) -> int:
+        """
+        :return: the sum of the preferred affinity weights times the matching
+            pods in the domain of the node, minus the same for the preferred
+            anti-affinity terms.
+        """
+
+        namespace = pod.metadata.namespace
+        preferred, anti_preferred = pod_preferred_terms(pod)
+
+        score = 0
+        for terms, sign in ((preferred, 1), (anti_preferred, -1)):
+            for weighted in terms:
+                key = affinity_term_key(weighted.podAffinityTerm, namespace)
+                if (domain := self.domain(node, key.topology_key)) is not None:
+                    count = self.domain_counts(key).get(domain, 0)
+                    score += sign * weighted.weight * count
+        return score
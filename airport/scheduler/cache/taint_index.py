@@ -0,0 +1,144 @@
+from typing import Dict
+from typing import FrozenSet
+from typing import Iterable
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+from airport.kube.api import Taint
+from airport.kube.api import TaintEffect
+from airport.kube.api import Toleration
+from airport.kube.api import TolerationOperator
+
+from .bitmap import NodeIds
+
+
+# (key, value, effect)
+TaintKey = Tuple[str, str, str]
+# (key, operator, value, effect)
+TolerationKey = Tuple[str, str, str, str]
+
+# the effects keeping the pods which do not tolerate them off a node
+FilteredEffects = frozenset((TaintEffect.NoSchedule, TaintEffect.NoExecute))
+
+
+def taint_key(taint: Taint) -> TaintKey:
+    return taint.key, taint.value, TaintEffect(taint.effect).value
+
+
+def toleration_key(toleration: Toleration) -> TolerationKey:
+    return (
+        toleration.key,
+        TolerationOperator(toleration.operator).value,
+        toleration.value,
+        TaintEffect(toleration.effect).value,
+    )
+
+
+def tolerates(toleration: TolerationKey, taint: TaintKey) -> bool:
+    """
+    :return: True if the toleration tolerates the taint. An empty toleration
+        key with the `Exists` operator tolerates every key.
+    """
+
+    key, operator, value, effect = toleration
+    if effect and effect != taint[2]:
+        return False
+    if key and key != taint[0]:
+        return False
+    if operator == TolerationOperator.Exists:
+        return True
+    return value == taint[1]
+
+
+class TaintIndex:
+    """
+    Interns the `NoSchedule` and `NoExecute` taints of the nodes into a global
+    id space, so that the taints of a node are a bitmask. A set of tolerations
+    compiles once into the mask of the interned taints it tolerates, and a
+    node fits the pod when `node mask & ~tolerated mask == 0`.
+
+    Nodes are also grouped by mask, so `match_tolerations` tests every
+    distinct mask once instead of every node. The taint ids are never
+    released, clusters only use a handful of distinct taints.
+    """
+
+    def __init__(self, ids: Optional[NodeIds] = None):
+        self.ids = ids if ids is not None else NodeIds()
+        self.taint_ids: Dict[TaintKey, int] = {}
+        self.taints: List[TaintKey] = []
+        # node name -> taint mask
+        self.node_masks: Dict[str, int] = {}
+        # taint mask -> bitmap of the nodes with exactly these taints
+        self.mask_nodes: Dict[int, int] = {}
+        # toleration set -> (tolerated mask, number of taints it was built on)
+        self.tolerated: Dict[FrozenSet[TolerationKey], Tuple[int, int]] = {}
+
+    def intern(self, taint: TaintKey) -> int:
+        if (taint_id := self.taint_ids.get(taint)) is None:
+            taint_id = self.taint_ids[taint] = len(self.taints)
+            self.taints.append(taint)
+        return taint_id
+
+    def taint_mask(self, taints: Iterable[Taint]) -> int:
+        mask = 0
+        for taint in taints:
+            if taint.effect in FilteredEffects:
+                mask |= 1 << self.intern(taint_key(taint))
+        return mask
+
+    def set_node(self, name: str, taints: Iterable[Taint]):
+        mask = self.taint_mask(taints)
+        if self.node_masks.get(name) == mask:
+            return
+
+        self.remove_node(name, release_id=False)
+        bit = 1 << self.ids.add(name)
+        self.mask_nodes[mask] = self.mask_nodes.get(mask, 0) | bit
+        self.node_masks[name] = mask
+
+    def remove_node(self, name: str, release_id: bool = True):
+        mask = self.node_masks.pop(name, None)
+        if mask is not None and (node_id := self.ids.get(name)) is not None:
+            if nodes := self.mask_nodes.get(mask, 0) & ~(1 << node_id):
+                self.mask_nodes[mask] = nodes
+            else:
+                self.mask_nodes.pop(mask, None)
+
+        if release_id:
+            self.ids.remove(name)
+
+    def node_mask(self, name: str) -> int:
+        return self.node_masks.get(name, 0)
+
+    def tolerated_mask(self, tolerations: Iterable[Toleration]) -> int:
+        """
+        :return: the mask of the interned taints tolerated by the tolerations.
+            It is cached by toleration set and only extended with the taints
+            interned since the last call.
+        """
+
+        keys = frozenset(toleration_key(toleration) for toleration in tolerations)
+        mask, count = self.tolerated.get(keys, (0, 0))
+        if count < len(self.taints):
+            for taint_id in range(count, len(self.taints)):
+                taint = self.taints[taint_id]
+                if any(tolerates(toleration, taint) for toleration in keys):
+                    mask |= 1 << taint_id
+            self.tolerated[keys] = mask, len(self.taints)
+        return mask
+
+    def tolerates(self, name: str, tolerations: Iterable[Toleration]) -> bool:
+        return self.node_mask(name) & ~self.tolerated_mask(tolerations) == 0
+
+    def match_tolerations(self, tolerations: Iterable[Toleration]) -> int:
+        """
+        :return: the bitmap of the nodes whose taints are all tolerated.
+        """
+
+        untolerated = ~self.tolerated_mask(tolerations)
+        bitmap = 0
+        for mask, nodes in self.mask_nodes.items():
+            if mask & untolerated == 0:
+                bitmap |= nodes
+        return bitmap
@@ -0,0 +1,276 @@
+from typing import Dict
+from typing import List
+from typing import NamedTuple
+from typing import Optional
+from typing import Set
+from typing import Tuple
+
+from airport.kube.api import Pod
+from airport.kube.api import TopologySpreadConstraint
+from airport.kube.api import UnsatisfiableConstraintAction
+from airport.kube.labels import CompiledLabelSelector
+from airport.kube.labels import compile_label_selector
+from airport.scheduler.api.node_info import gen_pod_key
+
+from .label_index import NodeLabels
+
+
+class SpreadKey(NamedTuple):
+    selector: CompiledLabelSelector
+    namespace: str
+    topology_key: str
+
+    def matches(self, namespace: str, labels: Dict[str, str]) -> bool:
+        return namespace == self.namespace and self.selector.matches(labels)
+
+
+class SpreadPod(NamedTuple):
+    node: str
+    namespace: str
+    labels: Dict[str, str]
+
+
+def spread_key(constraint: TopologySpreadConstraint, namespace: str) -> SpreadKey:
+    """
+    :param namespace: the namespace of the pod carrying the constraint, only
+        the pods of this namespace are counted
+    """
+
+    return SpreadKey(
+        selector=compile_label_selector(constraint.labelSelector),
+        namespace=namespace,
+        topology_key=constraint.topologyKey,
+    )
+
+
+class SpreadCounter:
+    """
+    The number of matching pods per domain of one constraint, with the
+    minimum over all the domains, empty ones included. Domains are grouped by
+    count, so that the minimum moves in O(1) as pods are added and removed.
+    """
+
+    __slots__ = ("counts", "nodes", "domains_by_count", "min")
+
+    def __init__(self):
+        # domain -> number of the matching pods
+        self.counts: Dict[str, int] = {}
+        # domain -> number of the nodes in it
+        self.nodes: Dict[str, int] = {}
+        # count -> number of the domains with this count
+        self.domains_by_count: Dict[int, int] = {}
+        self.min = 0
+
+    def _move(self, old: Optional[int], new: Optional[int]):
+        by_count = self.domains_by_count
+        if old is not None:
+            if remaining := by_count[old] - 1:
+                by_count[old] = remaining
+            else:
+                del by_count[old]
+        if new is not None:
+            by_count[new] = by_count.get(new, 0) + 1
+
+        if new is not None and new < self.min:
+            self.min = new
+        elif old == self.min and old not in by_count:
+            # a pod was added to the last domain with the minimum, only a
+            # removed domain needs a scan of the counts
+            self.min = new if new is not None else min(by_count, default=0)
+
+    def add_node(self, domain: str):
+        if domain in self.nodes:
+            self.nodes[domain] += 1
+            return
+
+        self.nodes[domain] = 1
+        self.counts[domain] = 0
+        self._move(None, 0)
+
+    def remove_node(self, domain: str):
+        if remaining := self.nodes[domain] - 1:
+            self.nodes[domain] = remaining
+            return
+
+        del self.nodes[domain]
+        count = self.counts.pop(domain)
+        self._move(count, None)
+
+    def add_pod(self, domain: str):
+        count = self.counts[domain]
+        self.counts[domain] = count + 1
+        self._move(count, count + 1)
+
+    def remove_pod(self, domain: str):
+        count = self.counts[domain]
+        self.counts[domain] = count - 1
+        self._move(count, count - 1)
+
+    def skew(self, domain: str, self_match: bool) -> int:
+        """
+        :return: the skew of the domain if the pod was placed in it.
+        """
+
+        return self.counts.get(domain, 0) + self_match - self.min
+
+
+class TopologySpreadIndex:
+    """
+    Keeps a `SpreadCounter` per (selector, namespace, topology key) of the
+    topology spread constraints seen, shared by all the replicas carrying the
+    same constraint. Nodes and pods update every counter as they are added
+    and removed, so that checking a constraint for a candidate node is O(1).
+
+    Unlike kubernetes, the domains are not restricted to the nodes matching
+    the node affinity of the pod.
+    """
+
+    def __init__(self, node_labels: Optional[NodeLabels] = None):
+        self.node_labels = node_labels if node_labels is not None else {}
+        self.node_pods: Dict[str, Set[str]] = {}
+        self.pods: Dict[str, SpreadPod] = {}
+        self.counters: Dict[SpreadKey, SpreadCounter] = {}
+
+    def set_node(self, name: str, labels: Dict[str, str]):
+        if (old := self.node_labels.get(name)) == labels:
+            return
+
+        self.node_labels[name] = dict(labels)
+        self.relabel_node(name, old)
+
+    def remove_node(self, name: str):
+        self.relabel_node(name, self.node_labels.pop(name, None))
+
+    def relabel_node(self, name: str, old: Optional[Dict[str, str]]):
+        """
+        Moves the node and its pods from the domains of its `old` labels to the
+        ones of the labels `node_labels` holds now, the pods are dropped if the
+        node was removed from it.
+        """
+
+        old = old or {}
+        pods = [(key, self.pods[key]) for key in self.node_pods.get(name, ())]
+        for key, _ in pods:
+            self._remove(key, old)
+        for key, counter in self.counters.items():
+            if (domain := old.get(key.topology_key)) is not None:
+                counter.remove_node(domain)
+
+        if (labels := self.node_labels.get(name)) is None:
+            self.node_pods.pop(name, None)
+            return
+        for key, counter in self.counters.items():
+            if (domain := labels.get(key.topology_key)) is not None:
+                counter.add_node(domain)
+        for key, placed in pods:
+            self._add(key, placed)
+
+    def add_pod(self, pod: Pod, node: str):
+        key = gen_pod_key(pod)
+        self._remove(key)
+        self._add(
+            key,
+            SpreadPod(
+                node=node,
+                namespace=pod.metadata.namespace,
+                labels=dict(pod.metadata.labels),
+            ),
+        )
+
+    def remove_pod(self, pod: Pod):
+        self._remove(gen_pod_key(pod))
+
+    def _add(self, key: str, placed: SpreadPod):
+        self.pods[key] = placed
+        self.node_pods.setdefault(placed.node, set()).add(key)
+        labels = self.node_labels.get(placed.node, {})
+        for spread, counter in self.counters.items():
+            if (domain := labels.get(spread.topology_key)) is not None and (
+                spread.matches(placed.namespace, placed.labels)
+            ):
+                counter.add_pod(domain)
+
+    def _remove(self, key: str, labels: Optional[Dict[str, str]] = None):
+        """
+        :param labels: the labels the pod was counted with, the current ones of
+            its node if None
+        """
+
+        if (placed := self.pods.pop(key, None)) is None:
+            return
+
+        self.node_pods[placed.node].discard(key)
+        if labels is None:
+            labels = self.node_labels.get(placed.node, {})
+        for spread, counter in self.counters.items():
+            if (domain := labels.get(spread.topology_key)) is not None and (
+                spread.matches(placed.namespace, placed.labels)
+            ):
+                counter.remove_pod(domain)
+
+    def counter(self, key: SpreadKey) -> SpreadCounter:
+        """
+        :return: the counter of the constraint, built from the nodes and the
+            placed pods the first time and maintained until `forget` is called.
+        """
+
+        if (counter := self.counters.get(key)) is not None:
+            return counter
+
+        counter = self.counters[key] = SpreadCounter()
+        for labels in self.node_labels.values():
+            if (domain := labels.get(key.topology_key)) is not None:
+                counter.add_node(domain)
+        for placed in self.pods.values():
+            domain = self.node_labels.get(placed.node, {}).get(key.topology_key)
+            if domain is not None and key.matches(placed.namespace, placed.labels):
+                counter.add_pod(domain)
+        return counter
+
+    def forget(self, key: SpreadKey):
+        self.counters.pop(key, None)
+
+    def constraints(
+        self, pod: Pod, action: UnsatisfiableConstraintAction
+    ) -> List[Tuple[TopologySpreadConstraint, SpreadKey]]:
+        return [
+            (constraint, spread_key(constraint, pod.metadata.namespace))
+            for constraint in pod.spec.topologySpreadConstraints
+            if constraint.whenUnsatisfiable == action
+        ]
+
+    def satisfies(self, pod: Pod, node: str) -> bool:
+        """
+        :return: True if placing the pod on the node keeps the skew of every
+            `DoNotSchedule` constraint of the pod within its `maxSkew`. A node
+            without the topology key of a constraint does not satisfy it.
+        """
+
+        labels = self.node_labels.get(node, {})
+        for constraint, key in self.constraints(
+            pod, UnsatisfiableConstraintAction.DoNotSchedule
+        ):
+            if (domain := labels.get(key.topology_key)) is None:
+                return False
+
+            self_match = key.matches(pod.metadata.namespace, pod.metadata.labels)
+            if self.counter(key).skew(domain, self_match) > constraint.maxSkew:
+                return False
+
+        return True
+
+    def skew(self, pod: Pod, node: str) -> int:
+        """
+        :return: the sum of the skews of the `ScheduleAnyway` constraints of the
+            pod if it was placed on the node, the lower the better.
+        """
+
+        labels = self.node_labels.get(node, {})
+        total = 0
+        for _, key in self.constraints(
+            pod, UnsatisfiableConstraintAction.ScheduleAnyway
+        ):
+            if (domain := labels.get(key.topology_key)) is not None:
+                self_match = key.matches(pod.metadata.namespace, pod.metadata.labels)
+                total += self.counter(key).skew(domain, self_match)
+        return total
@@ -0,0 +1,267 @@
+from dataclasses import dataclass
+from dataclasses import field
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+from airport.scheduler.api import JobInfo
+from airport.scheduler.api import NamespaceInfo
+from airport.scheduler.api import Resource
+from airport.scheduler.api.namespace_info import DefaultNamespaceWeight
+from airport.utils.cache import Heap
+
+from .util import quantity
+from .util import resource_vector
+from .util import share
+
+
+def dominant_share(allocated: Resource, total: Resource) -> Tuple[float, str]:
+    """
+    :return: the largest share of `allocated` in `total` among the resources
+        of `total`, and the name of that resource.
+    """
+
+    result, dominant_resource = 0.0, ""
+    for resource_name in total.resource_names:
+        resource_share = share(
+            quantity(allocated, resource_name), quantity(total, resource_name)
+        )
+        if resource_share > result:
+            result, dominant_resource = resource_share, resource_name
+
+    return result, dominant_resource
+
+
+@dataclass
+class NamespaceShare:
+    name: str
+    weight: int = DefaultNamespaceWeight
+    allocated: Resource = field(default_factory=Resource)
+    share: float = 0.0
+    dominant_resource: str = ""
+
+    @property
+    def weighted_share(self) -> float:
+        return self.share / (self.weight or DefaultNamespaceWeight)
+
+
+def namespace_share_key_func(obj: NamespaceShare) -> str:
+    return obj.name
+
+
+def namespace_share_sort_key(obj: NamespaceShare) -> Tuple[float, str]:
+    return obj.weighted_share, obj.name
+
+
+class NamespaceFairShare:
+    """
+    Orders the namespaces by their dominant share of the cluster divided by
+    their weight, the most under-served namespace first.
+
+    Allocating or releasing a task only recomputes the share of its namespace
+    and moves it in a heap in O(log n), `first` is O(1).
+    """
+
+    def __init__(self, total: Resource):
+        self.total = total
+        self.shares: Dict[str, NamespaceShare] = {}
+        self.heap: Heap[NamespaceShare] = Heap.new_with_sort_key(
+            namespace_share_key_func, namespace_share_sort_key
+        )
+
+    def __len__(self) -> int:
+        return len(self.shares)
+
+    def _share(self, namespace: str) -> NamespaceShare:
+        if (ns_share := self.shares.get(namespace)) is None:
+            ns_share = NamespaceShare(name=namespace)
+            self.shares[namespace] = ns_share
+        return ns_share
+
+    def _update_share(self, ns_share: NamespaceShare):
+        ns_share.share, ns_share.dominant_resource = dominant_share(
+            ns_share.allocated, self.total
+        )
+
+    def set_namespace(self, info: NamespaceInfo):
+        ns_share = self._share(info.name)
+        ns_share.weight = info.weight
+        self.heap.update(ns_share)
+
+    def set_namespaces(self, infos: List[NamespaceInfo]):
+        for info in infos:
+            self._share(info.name).weight = info.weight
+        self.heap.bulk_update([self.shares[info.name] for info in infos])
+
+    def delete_namespace(self, namespace: str):
+        if (ns_share := self.shares.pop(namespace, None)) is not None:
+            self.heap.delete(ns_share)
+
+    def allocate(self, namespace: str, resreq: Resource):
+        ns_share = self._share(namespace)
+        ns_share.allocated += resreq
+        self._update_share(ns_share)
+        self.heap.update(ns_share)
+
+    def release(self, namespace: str, resreq: Resource):
+        ns_share = self._share(namespace)
+        ns_share.allocated -= resreq
+        self._update_share(ns_share)
+        self.heap.update(ns_share)
+
+    def set_total(self, total: Resource):
+        """
+        Recomputes every share against the new cluster total and reorders the
+        namespaces at once.
+        """
+
+        self.total = total
+        for ns_share in self.shares.values():
+            self._update_share(ns_share)
+        self.heap.bulk_update(list(self.shares.values()))
+
+    def first(self) -> Optional[str]:
+        """
+        :return: the most under-served namespace, None if there is none.
+        """
+
+        ns_share = self.heap.peek()
+        return None if ns_share is None else ns_share.name
+
+    def weighted_share(self, namespace: str) -> float:
+        if (ns_share := self.shares.get(namespace)) is None:
+            return 0.0
+        return ns_share.weighted_share
+
+    def less(self, namespace1: str, namespace2: str) -> bool:
+        """
+        The namespace order function, true if `namespace1` goes first.
+        """
+
+        return (self.weighted_share(namespace1), namespace1) < (
+            self.weighted_share(namespace2),
+            namespace2,
+        )
+
+    def ordered(self) -> List[str]:
+        return [ns_share.name for ns_share in self.heap.ordered()]
+
+
+@dataclass
+class JobShare:
+    uid: str
+    allocated: Dict[str, float] = field(default_factory=dict)
+    share: float = 0.0
+    dominant_resource: str = ""
+
+
+def job_share_key_func(obj: JobShare) -> str:
+    return obj.uid
+
+
+def job_share_sort_key(obj: JobShare) -> Tuple[float, str]:
+    return obj.share, obj.uid
+
+
+class JobDrf:
+    """
+    Dominant Resource Fairness of the jobs, the job with the lowest dominant
+    share first.
+
+    The allocations are kept as float vectors by resource name, so an
+    allocation or a release only updates the vector of its job and recomputes
+    its share. A change of cluster total recomputes all the shares from the
+    vectors with the inverse of each total, without going back to `Resource`.
+    """
+
+    def __init__(self, total: Resource):
+        self.shares: Dict[str, JobShare] = {}
+        self.heap: Heap[JobShare] = Heap.new_with_sort_key(
+            job_share_key_func, job_share_sort_key
+        )
+        self.inverses: Dict[str, Optional[float]] = {}
+        self.set_total(total)
+
+    def __len__(self) -> int:
+        return len(self.shares)
+
+    def _update_share(self, job_share: JobShare):
+        allocated = job_share.allocated
+        result, dominant_resource = 0.0, ""
+        for resource_name, inverse in self.inverses.items():
+            value = allocated.get(resource_name, 0.0)
+            if inverse is None:
+                resource_share = 1.0 if value else 0.0
+            else:
+                resource_share = value * inverse
+            if resource_share > result:
+                result, dominant_resource = resource_share, resource_name
+
+        job_share.share = result
+        job_share.dominant_resource = dominant_resource
+
+    def set_total(self, total: Resource):
+        """
+        Recomputes every share against the new cluster total and reorders the
+        jobs at once.
+        """
+
+        self.inverses = {
+            resource_name: None if value == 0 else 1 / value
+            for resource_name, value in resource_vector(total).items()
+        }
+        for job_share in self.shares.values():
+            self._update_share(job_share)
+        self.heap.bulk_update(list(self.shares.values()))
+
+    def add_job(self, job: JobInfo):
+        """
+        Adds or resets a job from its `allocated` resource.
+        """
+
+        job_share = JobShare(uid=job.uid, allocated=resource_vector(job.allocated))
+        self._update_share(job_share)
+        self.shares[job.uid] = job_share
+        self.heap.update(job_share)
+
+    def delete_job(self, uid: str):
+        if (job_share := self.shares.pop(uid, None)) is not None:
+            self.heap.delete(job_share)
+
+    def _add(self, uid: str, resreq: Resource, sign: float):
+        if (job_share := self.shares.get(uid)) is None:
+            job_share = self.shares[uid] = JobShare(uid=uid)
+
+        allocated = job_share.allocated
+        for resource_name, value in resource_vector(resreq).items():
+            allocated[resource_name] = allocated.get(resource_name, 0.0) + sign * value
+
+        self._update_share(job_share)
+        self.heap.update(job_share)
+
+    def allocate(self, uid: str, resreq: Resource):
+        self._add(uid, resreq, 1.0)
+
+    def deallocate(self, uid: str, resreq: Resource):
+        self._add(uid, resreq, -1.0)
+
+    def share(self, uid: str) -> float:
+        if (job_share := self.shares.get(uid)) is None:
+            return 0.0
+        return job_share.share
+
+    def first(self) -> Optional[str]:
+        job_share = self.heap.peek()
+        return None if job_share is None else job_share.uid
+
+    def ordered(self) -> List[str]:
+        return [job_share.uid for job_share in self.heap.ordered()]
+
+    def job_order_fn(self, job1: JobInfo, job2: JobInfo) -> bool:
+        """
+        The job order function, true if `job1` goes first. It can be the
+        `less_fn` of a job queue, which must be updated when shares change.
+        """
+
+        return (self.share(job1.uid), job1.uid) < (self.share(job2.uid), job2.uid)
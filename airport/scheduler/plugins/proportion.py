@@ -0,0 +1,192 @@
+from bisect import bisect_left
+from bisect import insort
+from dataclasses import dataclass
+from dataclasses import field
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+from airport.api.scheduling import Queue
+from airport.scheduler.api import Resource
+
+from .util import resource_vector
+from .util import vector_resource
+
+
+Infinity = float("inf")
+
+
+@dataclass
+class QueueAttr:
+    name: str
+    weight: int = 1
+    # only the resources limited by `spec.capability`
+    capability: Dict[str, float] = field(default_factory=dict)
+    request: Dict[str, float] = field(default_factory=dict)
+
+    def bound(self, resource_name: str) -> float:
+        return min(
+            self.request.get(resource_name, 0.0),
+            self.capability.get(resource_name, Infinity),
+        )
+
+
+def queue_capability(queue: Queue) -> Dict[str, float]:
+    capability = resource_vector(Resource.new(queue.spec.capability))
+    return {
+        resource_name: value
+        for resource_name, value in capability.items()
+        if resource_name in queue.spec.capability
+    }
+
+
+class WaterLevel:
+    """
+    Weighted water-filling of one resource. Every queue deserves
+    `min(bound, weight * level)`, where `bound` is the smaller of its request
+    and its capability, and `level` is the highest one the total can fill.
+
+    The queues are kept sorted by `bound / weight`, the order in which they
+    get capped while the level rises, so a change of one queue is a sorted
+    insert and the level is found by a single scan, without sorting.
+    """
+
+    def __init__(self, total: float):
+        self.total = total
+        self.weight = 0
+        # (bound / weight, name, bound, weight)
+        self.queues: List[Tuple[float, str, float, int]] = []
+        self._level: Optional[float] = None
+
+    def add(self, name: str, bound: float, weight: int):
+        insort(self.queues, (bound / weight, name, bound, weight))
+        self.weight += weight
+        self._level = None
+
+    def remove(self, name: str, bound: float, weight: int):
+        index = bisect_left(self.queues, (bound / weight, name))
+        del self.queues[index]
+        self.weight -= weight
+        self._level = None
+
+    @property
+    def level(self) -> float:
+        if self._level is None:
+            self._level = self._fill()
+        return self._level
+
+    def _fill(self) -> float:
+        available, weight = self.total, self.weight
+        for ratio, _, bound, queue_weight in self.queues:
+            if available <= ratio * weight:
+                return available / weight
+            available -= bound
+            weight -= queue_weight
+
+        return Infinity
+
+    def deserved(self, bound: float, weight: int) -> float:
+        return min(bound, weight * self.level)
+
+
+class QueueProportion:
+    """
+    Computes the deserved resources of the queues by weighted water-filling,
+    capped by the capability and the request of each queue, independently for
+    every resource of the cluster total.
+
+    Changing the request of one queue only re-sorts it in the resources whose
+    bound changed, the deserved resources are computed when asked for.
+    """
+
+    def __init__(self, total: Resource):
+        self.queues: Dict[str, QueueAttr] = {}
+        self.levels: Dict[str, WaterLevel] = {}
+        self.set_total(total)
+
+    def __len__(self) -> int:
+        return len(self.queues)
+
+    def _place(self, attr: QueueAttr):
+        if attr.weight > 0:
+            for resource_name, level in self.levels.items():
+                level.add(attr.name, attr.bound(resource_name), attr.weight)
+
+    def _unplace(self, attr: QueueAttr):
+        if attr.weight > 0:
+            for resource_name, level in self.levels.items():
+                level.remove(attr.name, attr.bound(resource_name), attr.weight)
+
+    def set_total(self, total: Resource):
+        self.levels = {
+            resource_name: WaterLevel(value)
+            for resource_name, value in resource_vector(total).items()
+        }
+        for attr in self.queues.values():
+            self._place(attr)
+
+    def set_queue(self, queue: Queue, request: Optional[Resource] = None):
+        """
+        Adds or updates a queue from its spec, with the total request of its
+        jobs, the previous request is kept if None.
+        """
+
+        name = queue.metadata.name
+        previous = self.queues.get(name)
+        attr = QueueAttr(
+            name=name, weight=queue.spec.weight, capability=queue_capability(queue)
+        )
+        if request is not None:
+            attr.request = resource_vector(request)
+        elif previous is not None:
+            attr.request = previous.request
+
+        if previous is not None:
+            self._unplace(previous)
+        self.queues[name] = attr
+        self._place(attr)
+
+    def set_request(self, name: str, request: Resource):
+        """
+        :raises KeyError: if the queue is unknown
+        """
+
+        attr = self.queues[name]
+        new_request = resource_vector(request)
+        if attr.weight > 0:
+            for resource_name, level in self.levels.items():
+                old_bound = attr.bound(resource_name)
+                new_bound = min(
+                    new_request.get(resource_name, 0.0),
+                    attr.capability.get(resource_name, Infinity),
+                )
+                if old_bound != new_bound:
+                    level.remove(name, old_bound, attr.weight)
+                    level.add(name, new_bound, attr.weight)
+        attr.request = new_request
+
+    def delete_queue(self, name: str):
+        if (attr := self.queues.pop(name, None)) is not None:
+            self._unplace(attr)
+
+    def deserved_vector(self, name: str) -> Dict[str, float]:
+        """
+        :raises KeyError: if the queue is unknown
+        """
+
+        attr = self.queues[name]
+        if attr.weight <= 0:
+            return {resource_name: 0.0 for resource_name in self.levels}
+
+        return {
+            resource_name: level.deserved(attr.bound(resource_name), attr.weight)
+            for resource_name, level in self.levels.items()
+        }
+
+    def deserved(self, name: str) -> Resource:
+        """
+        :raises KeyError: if the queue is unknown
+        """
+
+        return vector_resource(self.deserved_vector(name))
@@ -0,0 +1,41 @@
+from typing import Dict
+
+from airport.kube.api import ResourceQuantity
+from airport.scheduler.api import Resource
+
+
+def share(allocated: float, total: float) -> float:
+    if total == 0:
+        return 0.0 if allocated == 0 else 1.0
+    return allocated / total
+
+
+def quantity(resource: Resource, resource_name: str) -> float:
+    if resource_name == "cpu":
+        return float(resource.milli_cpu)
+    elif resource_name == "memory":
+        return float(resource.memory)
+    return float(resource.scalar_resources.get(resource_name, 0))
+
+
+def resource_vector(resource: Resource) -> Dict[str, float]:
+    """
+    :return: the quantities of a `Resource` as floats by resource name, in the
+        units of `Resource` (milli cpu, bytes ...).
+    """
+
+    vector = {"cpu": float(resource.milli_cpu), "memory": float(resource.memory)}
+    for resource_name, quant in resource.scalar_resources.items():
+        vector[resource_name] = float(quant)
+    return vector
+
+
+def vector_resource(vector: Dict[str, float]) -> Resource:
+    resource = Resource(
+        milli_cpu=ResourceQuantity(vector.get("cpu", 0.0)),
+        memory=ResourceQuantity(vector.get("memory", 0.0)),
+    )
+    for resource_name, value in vector.items():
+        if resource_name not in ("cpu", "memory"):
+            resource.set_scalar_resource(resource_name, value)
+    return resource
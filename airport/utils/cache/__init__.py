@@ -1,6 +1,10 @@
+from .async_heap import AsyncHeap
+from .backoff_queue import BackoffQueue
 from .heap import Heap
+from .heap import HeapBackend
 from .heap import HeapClosed
 from .heap import HeapError
 from .heap import HeapKeyFuncError
 from .heap import HeapLessFuncError
 from .heap import HeapObjectNotFound
+from .metrics import HeapMetrics
@@ -0,0 +1,244 @@
+import asyncio
+
+from dataclasses import dataclass
+from dataclasses import field
+from typing import Generic
+from typing import Iterator
+from typing import List
+from typing import Optional
+
+from .heap import HeapBackend
+from .heap import HeapClosed
+from .heap import HeapObjectAlreadyRemoved
+from .heap import KeyedHeapInterface
+from .heap import KeyFunc
+from .heap import LessFunc
+from .heap import SortKeyFunc
+from .heap import SortKeyHeapData
+from .heap import T
+from .heap import new_heap_data
+
+
+@dataclass
+class AsyncHeap(Generic[T]):
+    """
+    The asyncio counterpart of `Heap`, for producers and consumers running on
+    one event loop.
+
+    Adding and removing items never waits, so those methods are plain
+    functions, only `pop` and `pop_many` are coroutines. It is not thread
+    safe, every call must happen on the loop running the consumers.
+    """
+
+    data: KeyedHeapInterface[T]
+    closed: bool = False
+    waiters: List["asyncio.Future[None]"] = field(default_factory=list)
+
+    @classmethod
+    def new(
+        cls,
+        key_fn: KeyFunc,
+        less_fn: LessFunc,
+        backend: HeapBackend = HeapBackend.Binary,
+    ) -> "AsyncHeap":
+        return AsyncHeap(data=new_heap_data(key_fn, less_fn, backend))
+
+    @classmethod
+    def new_with_sort_key(
+        cls, key_fn: KeyFunc, sort_key_fn: SortKeyFunc
+    ) -> "AsyncHeap":
+        heap_data: SortKeyHeapData[T] = SortKeyHeapData(
+            key_func=key_fn, sort_key_func=sort_key_fn
+        )
+        return AsyncHeap(data=heap_data)
+
+    def notify_all(self):
+        for waiter in self.waiters:
+            if not waiter.done():
+                waiter.set_result(None)
+        self.waiters.clear()
+
+    async def wait(self, timeout: Optional[float] = None):
+        """
+        Waits until the heap changes or is closed.
+
+        :raises asyncio.TimeoutError
+        """
+
+        waiter: "asyncio.Future[None]" = asyncio.get_running_loop().create_future()
+        self.waiters.append(waiter)
+        try:
+            await asyncio.wait_for(waiter, timeout)
+        finally:
+            if waiter in self.waiters:
+                self.waiters.remove(waiter)
+
+    def close(self):
+        """
+        Close the Heap and wakes up the coroutines waiting to pop items.
+        """
+
+        self.closed = True
+        self.notify_all()
+
+    def add(self, obj: T):
+        """
+        Inserts an item, and puts it in the queue. The item is updated if it
+        already exists.
+
+        :raises HeapClosed
+        :raises HeapKeyFuncError
+        """
+
+        if self.closed:
+            raise HeapClosed
+
+        self.data.set(self.data.key_func(obj), obj)
+        self.notify_all()
+
+    def bulk_add(self, objs: List[T]):
+        """
+        Adds all the items in the list to the queue and then wakes up the
+        waiting consumers once.
+
+        :raises HeapClosed
+        :raises HeapKeyFuncError
+        """
+
+        if self.closed:
+            raise HeapClosed
+
+        self.data.bulk_set([(self.data.key_func(obj), obj) for obj in objs])
+        self.notify_all()
+
+    def bulk_update(self, objs: List[T]):
+        """
+        :raises HeapClosed
+        :raises HeapKeyFuncError
+        """
+
+        self.bulk_add(objs)
+
+    def add_if_not_present(self, obj: T):
+        """
+        Inserts an item if no item with the same key is present.
+
+        :raises HeapClosed
+        :raises HeapKeyFuncError
+        """
+
+        if self.closed:
+            raise HeapClosed
+
+        key = self.data.key_func(obj)
+        if key not in self.data:
+            self.data.set(key, obj)
+            self.notify_all()
+
+    def update(self, obj: T):
+        """
+        :raises HeapClosed
+        :raises HeapKeyFuncError
+        """
+
+        self.add(obj)
+
+    def delete(self, obj: T):
+        """
+        :raises HeapKeyFuncError
+        :raises HeapObjectNotFound
+        """
+
+        self.data.delete(self.data.key_func(obj))
+
+    def bulk_delete(self, objs: List[T]):
+        """
+        Removes all the items in the list. Nothing is removed if any of them
+        is not in the heap.
+
+        :raises HeapKeyFuncError
+        :raises HeapObjectNotFound
+        """
+
+        self.data.bulk_delete({self.data.key_func(obj) for obj in objs})
+
+    async def pop(self) -> T:
+        """
+        Waits until an item is ready and pops it.
+
+        :raises HeapClosed
+        :raises HeapObjectAlreadyRemoved
+        """
+
+        while len(self.data) == 0:
+            if self.closed:
+                raise HeapClosed
+            await self.wait()
+
+        obj: Optional[T] = self.data.pop_first()
+        if obj is None:
+            raise HeapObjectAlreadyRemoved
+
+        return obj
+
+    async def pop_many(self, n: int, timeout: Optional[float] = None) -> List[T]:
+        """
+        Waits until an item is ready, then pops up to `n` items in heap order.
+
+        :param timeout: seconds to wait for the first item, wait forever if None
+        :raises HeapClosed
+        :raises HeapObjectAlreadyRemoved
+        :return: the popped items, empty if the timeout expired.
+        """
+
+        loop = asyncio.get_running_loop()
+        deadline = None if timeout is None else loop.time() + timeout
+        while len(self.data) == 0:
+            if self.closed:
+                raise HeapClosed
+
+            remaining = None if deadline is None else deadline - loop.time()
+            if remaining is not None and remaining <= 0:
+                return []
+
+            try:
+                await self.wait(remaining)
+            except asyncio.TimeoutError:
+                return []
+
+        objs: List[T] = []
+        for _ in range(min(n, len(self.data))):
+            obj: Optional[T] = self.data.pop_first()
+            if obj is None:
+                raise HeapObjectAlreadyRemoved
+            objs.append(obj)
+
+        return objs
+
+    def peek(self) -> Optional[T]:
+        return self.data.first()
+
+    def top_k(self, k: int) -> List[T]:
+        return self.data.top_k(k)
+
+    def ordered(self) -> Iterator[T]:
+        return self.data.ordered()
+
+    def list(self) -> List[T]:
+        return self.data.values()
+
+    def list_keys(self) -> List[str]:
+        return self.data.keys()
+
+    def get(self, obj: T) -> Optional[T]:
+        """
+        :raises HeapKeyFuncError
+        """
+
+        return self.data.get(self.data.key_func(obj))
+
+    def get_by_key(self, key: str) -> Optional[T]:
+        return self.data.get(key)
+
+    def is_closed(self) -> bool:
+        return self.closed
@@ -0,0 +1,168 @@
+import time
+
+from dataclasses import dataclass
+from typing import Callable
+from typing import Dict
+from typing import Generic
+from typing import List
+from typing import Optional
+
+from .heap import Heap
+from .heap import HeapClosed
+from .heap import HeapObjectNotFound
+from .heap import KeyFunc
+from .heap import T
+from .metrics import HeapMetrics
+
+Clock = Callable[[], float]
+
+DefaultInitialBackoff = 1.0
+DefaultMaxBackoff = 10.0
+
+
+@dataclass
+class BackoffItem(Generic[T]):
+    key: str
+    obj: T
+    ready_at: float
+
+
+def backoff_item_key_func(item: BackoffItem) -> str:
+    return item.key
+
+
+def backoff_item_sort_key(item: BackoffItem) -> float:
+    return item.ready_at
+
+
+class BackoffQueue(Generic[T]):
+    """
+    Holds items which failed, e.g. tasks with a `FitError`, until their
+    backoff expires. Each failure of the same key doubles its delay, starting
+    from `initial_backoff` and capped by `max_backoff`.
+
+    The time comes from `clock`, which defaults to `time.monotonic` and can be
+    replaced to test or simulate the queue. With `metrics`, every backoff,
+    forget, pop and reset is recorded into it, like by the operations of a
+    `Heap`.
+    """
+
+    def __init__(
+        self,
+        key_fn: KeyFunc,
+        initial_backoff: float = DefaultInitialBackoff,
+        max_backoff: float = DefaultMaxBackoff,
+        clock: Clock = time.monotonic,
+        metrics: Optional[HeapMetrics] = None,
+    ):
+        self.key_fn = key_fn
+        self.initial_backoff = initial_backoff
+        self.max_backoff = max_backoff
+        self.clock = clock
+        self.attempts: Dict[str, int] = {}
+        self.heap: Heap[BackoffItem[T]] = Heap.new_with_sort_key(
+            backoff_item_key_func, backoff_item_sort_key, metrics
+        )
+
+    def __len__(self) -> int:
+        return len(self.heap.data)
+
+    def backoff_duration(self, attempts: int) -> float:
+        if attempts <= 0:
+            return 0.0
+        return min(self.initial_backoff * 2 ** (attempts - 1), self.max_backoff)
+
+    def backoff(self, obj: T) -> float:
+        """
+        Records a failure of `obj` and holds it until its backoff expires.
+
+        :raises HeapClosed
+        :return: the backoff duration
+        """
+
+        key = self.key_fn(obj)
+        with self.heap.lock:
+            if self.heap.closed:
+                raise HeapClosed
+
+            attempts = self.attempts.get(key, 0) + 1
+            self.attempts[key] = attempts
+            duration = self.backoff_duration(attempts)
+
+            item = BackoffItem(key=key, obj=obj, ready_at=self.clock() + duration)
+            self.heap.data.set(key, item)
+            if (metrics := self.heap.metrics) is not None:
+                metrics.on_set(key, len(self.heap.data))
+            self.heap.cond.notify_all()
+
+        return duration
+
+    def forget(self, obj: T):
+        """
+        Clears the failures of `obj`, e.g. after it was scheduled, and removes
+        it from the queue.
+        """
+
+        key = self.key_fn(obj)
+        with self.heap.lock:
+            self.attempts.pop(key, None)
+            try:
+                self.heap.data.delete(key)
+            except HeapObjectNotFound:
+                return
+
+            if (metrics := self.heap.metrics) is not None:
+                metrics.on_delete(key, len(self.heap.data))
+
+    def pop_ready(self, n: Optional[int] = None) -> List[T]:
+        """
+        :return: up to `n` (all if None) items whose backoff has expired, in
+            the order they became ready. It never waits.
+        """
+
+        now = self.clock()
+        start = self.heap.metrics.clock() if self.heap.metrics is not None else 0.0
+        items: List[BackoffItem[T]] = []
+        with self.heap.lock:
+            while n is None or len(items) < n:
+                item = self.heap.data.first()
+                if item is None or item.ready_at > now:
+                    break
+
+                self.heap.data.pop_first()
+                items.append(item)
+
+            if items and self.heap.metrics is not None:
+                self.heap.record_pops(items, start)
+
+        return [item.obj for item in items]
+
+    def next_ready_at(self) -> Optional[float]:
+        """
+        :return: the clock time when the next item becomes ready, None if the
+            queue is empty.
+        """
+
+        item = self.heap.peek()
+        return None if item is None else item.ready_at
+
+    def reset(self):
+        """
+        Makes all the items ready now and clears their failures, to be called
+        when the cluster capacity changes and the items may fit again.
+        """
+
+        now = self.clock()
+        with self.heap.lock:
+            self.attempts.clear()
+            items = [
+                (item.key, BackoffItem(key=item.key, obj=item.obj, ready_at=now))
+                for item in self.heap.data.values()
+            ]
+            self.heap.data.bulk_set(items)
+            if (metrics := self.heap.metrics) is not None:
+                for key, _ in items:
+                    metrics.on_set(key, len(self.heap.data))
+
+    def close(self):
+        self.heap.close()
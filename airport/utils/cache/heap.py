@@ -1,17 +1,29 @@
+import heapq
+import itertools
+import time
+
 from dataclasses import dataclass
 from dataclasses import field
+from enum import Enum
 from threading import Condition
-from threading import Lock
-from threading import RLock
+from typing import Any
 from typing import Callable
 from typing import Dict
 from typing import Generic
+from typing import Iterator
 from typing import List
 from typing import Optional
+from typing import Set
+from typing import Tuple
 from typing import TypeVar
 
 from typing_extensions import Protocol
 
+from airport.utils.rwlock import RWLock
+
+from .metrics import HeapMetrics
+from .metrics import InstrumentedRWLock
+
 
 class HeapError(Exception):
     message: str = ""
@@ -44,12 +56,6 @@ class HeapLessFuncError(HeapError):
 T = TypeVar("T")
 
 
-@dataclass
-class HeapItem(Generic[T]):
-    obj: T
-    index: int
-
-
 @dataclass
 class ItemKeyValue(Generic[T]):
     key: str
@@ -58,18 +64,35 @@ class ItemKeyValue(Generic[T]):
 
 KeyFunc = Callable[[T], str]
 LessFunc = Callable[[T, T], bool]
+SortKeyFunc = Callable[[T], Any]
+
+
+class HeapBackend(str, Enum):
+    Binary = "binary"
+    Quaternary = "4-ary"
+    Pairing = "pairing"
 
 
 @dataclass
 class HeapData(Generic[T]):
-    items: Dict[str, HeapItem[T]] = field(init=False)
+    """
+    Array backed heap storage. The keys and the objects are kept in parallel
+    lists in heap order, and `index` maps a key to its slot in those lists.
+    """
+
+    index: Dict[str, int] = field(init=False)
     queue: List[str] = field(init=False)
+    objs: List[T] = field(init=False)
+    # counts the swaps of `fix`, `up` and `down` when set
+    metrics: Optional[HeapMetrics] = field(init=False)
 
     def __init__(self, key_func: KeyFunc, less_func: LessFunc):
         self._key_func = key_func
         self._less_func = less_func
-        self.items = dict()
+        self.index = dict()
         self.queue = list()
+        self.objs = list()
+        self.metrics = None
 
     @property
     def key_func(self) -> KeyFunc:
@@ -84,44 +107,497 @@ class HeapData(Generic[T]):
         :raises HeapLessFuncError
         """
 
-        if i > len(self.queue) or j > len(self.queue):
-            return False
-
-        if (item_i := self.items.get(self.queue[i])) is None:
-            return False
-
-        if (item_j := self.items.get(self.queue[j])) is None:
-            return False
-
-        return self.less_func(item_i.obj, item_j.obj)
+        return self._less_func(self.objs[i], self.objs[j])
 
     def swap(self, i: int, j: int):
-        self.queue[i], self.queue[j] = self.queue[j], self.queue[i]
-        item = self.items[self.queue[i]]
-        item.index = i
-
-        item = self.items[self.queue[j]]
-        item.index = j
+        queue, objs = self.queue, self.objs
+        queue[i], queue[j] = queue[j], queue[i]
+        objs[i], objs[j] = objs[j], objs[i]
+        self.index[queue[i]] = i
+        self.index[queue[j]] = j
 
     def push(self, kv: ItemKeyValue[T]):
-        queue_count = len(self.queue)
-        self.items[kv.key] = HeapItem(obj=kv.obj, index=queue_count)
+        self.index[kv.key] = len(self.queue)
         self.queue.append(kv.key)
+        self.objs.append(kv.obj)
 
     def pop(self) -> Optional[T]:
-        key = self.queue[-1]
-        self.queue = self.queue[:-1]
+        key = self.queue.pop()
+        self.index.pop(key, None)
+        return self.objs.pop()
 
-        try:
-            item = self.items.pop(key)
-            return item.obj
-        except KeyError:
-            return None
+    def rebuild(self):
+        """
+        Rebuilds the index from the queue and restores the heap ordering in
+        O(n), used after a batch of changes which did not keep the ordering.
+        """
+
+        self.index = {key: i for i, key in enumerate(self.queue)}
+        self._init()
+
+    def _init(self):
+        init(self, self.metrics)
+
+    def _fix(self, index: int):
+        fix(self, index, self.metrics)
+
+    def _push(self, kv: ItemKeyValue[T]):
+        push(self, kv, self.metrics)
+
+    def _pop(self) -> Optional[T]:
+        return pop(self, self.metrics)
+
+    def _remove(self, index: int) -> T:
+        return remove(self, index, self.metrics)
+
+    def _ordered_indexes(self, objs: List[T]) -> Iterator[int]:
+        return ordered_indexes(objs, self._less_func)
+
+    def get(self, key: str) -> Optional[T]:
+        if (index := self.index.get(key)) is not None:
+            return self.objs[index]
+        return None
+
+    def set(self, key: str, obj: T):
+        if (index := self.index.get(key)) is not None:
+            self.objs[index] = obj
+            self._fix(index)
+        else:
+            self._push(ItemKeyValue(key=key, obj=obj))
+
+    def bulk_set(self, items: List[Tuple[str, T]]):
+        if not heapify_cheaper(len(items), len(self) + len(items)):
+            for key, obj in items:
+                self.set(key, obj)
+            return
+
+        for key, obj in items:
+            if (index := self.index.get(key)) is not None:
+                self.objs[index] = obj
+            else:
+                self.push(ItemKeyValue(key=key, obj=obj))
+        self._init()
+
+    def delete(self, key: str) -> T:
+        """
+        :raises HeapObjectNotFound
+        """
+
+        if (index := self.index.get(key)) is None:
+            raise HeapObjectNotFound
+        return self._remove(index)
+
+    def bulk_delete(self, keys: Set[str]):
+        """
+        :raises HeapObjectNotFound
+        """
+
+        if not keys.issubset(self.index):
+            raise HeapObjectNotFound
+
+        if not heapify_cheaper(len(keys), len(self)):
+            for key in keys:
+                self._remove(self.index[key])
+            return
+
+        kept = [i for i, key in enumerate(self.queue) if key not in keys]
+        self.queue = [self.queue[i] for i in kept]
+        self.objs = [self.objs[i] for i in kept]
+        self.rebuild()
+
+    def first(self) -> Optional[T]:
+        return self.objs[0] if self.objs else None
+
+    def pop_first(self) -> Optional[T]:
+        return self._pop() if self.objs else None
+
+    def top_k(self, k: int) -> List[T]:
+        indexes = self._ordered_indexes(self.objs)
+        return [self.objs[index] for _, index in zip(range(k), indexes)]
+
+    def ordered(self) -> Iterator[T]:
+        objs = list(self.objs)
+        return (objs[index] for index in self._ordered_indexes(objs))
+
+    def keys(self) -> List[str]:
+        return list(self.queue)
+
+    def values(self) -> List[T]:
+        return list(self.objs)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.index
 
     def __len__(self):
         return len(self.queue)
 
 
+class DaryHeapData(HeapData[T]):
+    """
+    `HeapData` with `arity` children per slot. The heap is shallower, so
+    pushing and updating to a smaller item take fewer swaps, while popping
+    compares more children per level.
+    """
+
+    arity: int = 4
+
+    def _init(self):
+        n = len(self)
+        for i in reversed(range((n - 2) // self.arity + 1)):
+            dary_down(self, i, n, self.arity, self.metrics)
+
+    def _fix(self, index: int):
+        dary_fix(self, index, self.arity, self.metrics)
+
+    def _push(self, kv: ItemKeyValue[T]):
+        self.push(kv)
+        dary_up(self, len(self) - 1, self.arity, self.metrics)
+
+    def _pop(self) -> Optional[T]:
+        n = len(self) - 1
+        self.swap(0, n)
+        dary_down(self, 0, n, self.arity, self.metrics)
+        return self.pop()
+
+    def _remove(self, index: int) -> T:
+        n = len(self) - 1
+        if n != index:
+            self.swap(index, n)
+            if not dary_down(self, index, n, self.arity, self.metrics):
+                dary_up(self, index, self.arity, self.metrics)
+        return self.pop()  # type: ignore
+
+    def _ordered_indexes(self, objs: List[T]) -> Iterator[int]:
+        return ordered_indexes(objs, self._less_func, self.arity)
+
+
+class _PairingNode(Generic[T]):
+    __slots__ = ("key", "obj", "child", "next", "prev")
+
+    def __init__(self, key: str, obj: T):
+        self.key = key
+        self.obj = obj
+        # the first child, the next sibling, and the previous sibling or the
+        # parent for a first child
+        self.child: Optional[_PairingNode[T]] = None
+        self.next: Optional[_PairingNode[T]] = None
+        self.prev: Optional[_PairingNode[T]] = None
+
+
+@dataclass
+class PairingHeapData(Generic[T]):
+    """
+    Pairing heap storage. Inserting and moving an item to the front are O(1)
+    melds, popping and other updates are amortized O(log n), which suits
+    queues with many more updates than pops.
+    """
+
+    nodes: Dict[str, _PairingNode[T]] = field(init=False)
+    root: Optional[_PairingNode[T]] = field(init=False)
+
+    def __init__(self, key_func: KeyFunc, less_func: LessFunc):
+        self._key_func = key_func
+        self._less_func = less_func
+        self.nodes = dict()
+        self.root = None
+
+    @property
+    def key_func(self) -> KeyFunc:
+        return self._key_func
+
+    @property
+    def less_func(self) -> LessFunc:
+        return self._less_func
+
+    def _meld(
+        self, a: Optional[_PairingNode[T]], b: Optional[_PairingNode[T]]
+    ) -> Optional[_PairingNode[T]]:
+        if a is None:
+            return b
+        if b is None:
+            return a
+        if self._less_func(b.obj, a.obj):
+            a, b = b, a
+
+        b.prev = a
+        b.next = a.child
+        if a.child is not None:
+            a.child.prev = b
+        a.child = b
+        return a
+
+    def _merge_pairs(
+        self, node: Optional[_PairingNode[T]]
+    ) -> Optional[_PairingNode[T]]:
+        pairs = []
+        while node is not None:
+            a, b = node, node.next
+            node = b.next if b is not None else None
+            a.next = a.prev = None
+            if b is not None:
+                b.next = b.prev = None
+            pairs.append(self._meld(a, b))
+
+        merged = None
+        for pair in reversed(pairs):
+            merged = self._meld(pair, merged)
+        return merged
+
+    def _cut(self, node: _PairingNode[T]):
+        prev = node.prev
+        if prev is not None:
+            if prev.child is node:
+                prev.child = node.next
+            else:
+                prev.next = node.next
+        if node.next is not None:
+            node.next.prev = prev
+        node.next = node.prev = None
+
+    def _unlink(self, node: _PairingNode[T]):
+        if node is self.root:
+            self.root = self._merge_pairs(node.child)
+        else:
+            self._cut(node)
+            self.root = self._meld(self.root, self._merge_pairs(node.child))
+        node.child = None
+
+    def get(self, key: str) -> Optional[T]:
+        if (node := self.nodes.get(key)) is not None:
+            return node.obj
+        return None
+
+    def set(self, key: str, obj: T):
+        if (node := self.nodes.get(key)) is None:
+            node = _PairingNode(key, obj)
+            self.nodes[key] = node
+            self.root = self._meld(self.root, node)
+            return
+
+        if self._less_func(obj, node.obj):
+            # the children still follow the item, move the whole subtree
+            node.obj = obj
+            if node is not self.root:
+                self._cut(node)
+                self.root = self._meld(self.root, node)
+            return
+
+        self._unlink(node)
+        node.obj = obj
+        self.root = self._meld(self.root, node)
+
+    def bulk_set(self, items: List[Tuple[str, T]]):
+        for key, obj in items:
+            self.set(key, obj)
+
+    def delete(self, key: str) -> T:
+        """
+        :raises HeapObjectNotFound
+        """
+
+        if (node := self.nodes.pop(key, None)) is None:
+            raise HeapObjectNotFound
+        self._unlink(node)
+        return node.obj
+
+    def bulk_delete(self, keys: Set[str]):
+        """
+        :raises HeapObjectNotFound
+        """
+
+        if not keys.issubset(self.nodes):
+            raise HeapObjectNotFound
+
+        for key in keys:
+            self._unlink(self.nodes.pop(key))
+
+    def first(self) -> Optional[T]:
+        return self.root.obj if self.root is not None else None
+
+    def pop_first(self) -> Optional[T]:
+        if (root := self.root) is None:
+            return None
+
+        self.nodes.pop(root.key)
+        self._unlink(root)
+        return root.obj
+
+    def _ordered_nodes(self) -> Iterator[_PairingNode[T]]:
+        if self.root is None:
+            return
+
+        nodes = [self.root]
+        frontier = [_Candidate(self.root.obj, 0, self._less_func)]
+        while frontier:
+            node = nodes[heapq.heappop(frontier).index]
+            yield node
+
+            child = node.child
+            while child is not None:
+                frontier_item = _Candidate(child.obj, len(nodes), self._less_func)
+                heapq.heappush(frontier, frontier_item)
+                nodes.append(child)
+                child = child.next
+
+    def top_k(self, k: int) -> List[T]:
+        return [node.obj for _, node in zip(range(k), self._ordered_nodes())]
+
+    def ordered(self) -> Iterator[T]:
+        return iter(self.top_k(len(self.nodes)))
+
+    def keys(self) -> List[str]:
+        return list(self.nodes)
+
+    def values(self) -> List[T]:
+        return [node.obj for node in self.nodes.values()]
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.nodes
+
+    def __len__(self):
+        return len(self.nodes)
+
+
+@dataclass
+class SortKeyHeapData(Generic[T]):
+    """
+    Heap storage ordered by a sort key extracted once per object, the heap is
+    kept by `heapq` so every comparison is a native one.
+
+    Entries are `[sort_key, seq, key, obj]` lists, `seq` is unique so objects
+    are never compared and equal sort keys pop in the order they were set. An
+    updated or deleted entry is invalidated in place by clearing its key and
+    dropped once it reaches the top, so the top entry is always valid and
+    reading it has no side effect. The heap is compacted when most of its
+    entries are stale.
+    """
+
+    entries: Dict[str, list] = field(init=False)
+    heap: List[list] = field(init=False)
+
+    def __init__(self, key_func: KeyFunc, sort_key_func: SortKeyFunc):
+        self._key_func = key_func
+        self._sort_key_func = sort_key_func
+        self._seq = itertools.count()
+        self._stale = 0
+        self.entries = dict()
+        self.heap = list()
+
+    @property
+    def key_func(self) -> KeyFunc:
+        return self._key_func
+
+    @property
+    def sort_key_func(self) -> SortKeyFunc:
+        return self._sort_key_func
+
+    def _new_entry(self, key: str, obj: T) -> list:
+        if (entry := self.entries.get(key)) is not None:
+            entry[2] = None
+            self._stale += 1
+
+        entry = [self._sort_key_func(obj), next(self._seq), key, obj]
+        self.entries[key] = entry
+        return entry
+
+    def _invalidate(self, key: str) -> T:
+        entry = self.entries.pop(key)
+        entry[2] = None
+        self._stale += 1
+        return entry[3]
+
+    def _compact(self):
+        if self._stale > len(self.entries):
+            self.heap = [entry for entry in self.heap if entry[2] is not None]
+            heapq.heapify(self.heap)
+            self._stale = 0
+
+    def _drop_stale_top(self):
+        heap = self.heap
+        while heap and heap[0][2] is None:
+            heapq.heappop(heap)
+            self._stale -= 1
+
+    def get(self, key: str) -> Optional[T]:
+        if (entry := self.entries.get(key)) is not None:
+            return entry[3]
+        return None
+
+    def set(self, key: str, obj: T):
+        heapq.heappush(self.heap, self._new_entry(key, obj))
+        self._compact()
+        self._drop_stale_top()
+
+    def bulk_set(self, items: List[Tuple[str, T]]):
+        if not heapify_cheaper(len(items), len(self.heap) + len(items)):
+            for key, obj in items:
+                self.set(key, obj)
+            return
+
+        self.heap.extend(self._new_entry(key, obj) for key, obj in items)
+        self.heap = [entry for entry in self.heap if entry[2] is not None]
+        heapq.heapify(self.heap)
+        self._stale = 0
+
+    def delete(self, key: str) -> T:
+        """
+        :raises HeapObjectNotFound
+        """
+
+        if key not in self.entries:
+            raise HeapObjectNotFound
+
+        obj = self._invalidate(key)
+        self._compact()
+        self._drop_stale_top()
+        return obj
+
+    def bulk_delete(self, keys: Set[str]):
+        """
+        :raises HeapObjectNotFound
+        """
+
+        if not keys.issubset(self.entries):
+            raise HeapObjectNotFound
+
+        for key in keys:
+            self._invalidate(key)
+        self._compact()
+        self._drop_stale_top()
+
+    def first(self) -> Optional[T]:
+        return self.heap[0][3] if self.heap else None
+
+    def pop_first(self) -> Optional[T]:
+        if not self.heap:
+            return None
+
+        entry = heapq.heappop(self.heap)
+        self.entries.pop(entry[2])
+        self._drop_stale_top()
+        return entry[3]
+
+    def top_k(self, k: int) -> List[T]:
+        return [entry[3] for entry in heapq.nsmallest(k, self.entries.values())]
+
+    def ordered(self) -> Iterator[T]:
+        snapshot = [(entry[0], entry[1], entry[3]) for entry in self.entries.values()]
+        heapq.heapify(snapshot)
+        return (heapq.heappop(snapshot)[2] for _ in range(len(snapshot)))
+
+    def keys(self) -> List[str]:
+        return list(self.entries)
+
+    def values(self) -> List[T]:
+        return [entry[3] for entry in self.entries.values()]
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.entries
+
+    def __len__(self):
+        return len(self.entries)
+
+
 class HeapInterface(Protocol[T]):
     def __len__(self) -> int:
         ...
@@ -139,19 +615,135 @@ class HeapInterface(Protocol[T]):
         ...
 
 
-def init(h: HeapInterface):
+class KeyedHeapInterface(Protocol[T]):
+    """
+    The storage behind `Heap`, items are addressed by the key given by
+    `key_func` and returned in heap order by `first` and `pop_first`.
+    """
+
+    @property
+    def key_func(self) -> KeyFunc:
+        ...
+
+    def get(self, key: str) -> Optional[T]:
+        ...
+
+    def set(self, key: str, obj: T):
+        ...
+
+    def bulk_set(self, items: List[Tuple[str, T]]):
+        ...
+
+    def delete(self, key: str) -> T:
+        ...
+
+    def bulk_delete(self, keys: Set[str]):
+        ...
+
+    def first(self) -> Optional[T]:
+        ...
+
+    def pop_first(self) -> Optional[T]:
+        ...
+
+    def top_k(self, k: int) -> List[T]:
+        ...
+
+    def ordered(self) -> Iterator[T]:
+        ...
+
+    def keys(self) -> List[str]:
+        ...
+
+    def values(self) -> List[T]:
+        ...
+
+    def __contains__(self, key: str) -> bool:
+        ...
+
+    def __len__(self) -> int:
+        ...
+
+
+def init(h: HeapInterface, metrics: Optional[HeapMetrics] = None):
     n = len(h)
 
-    for i in reversed(range(n // 2 - 1)):
-        down(h, i, n)
+    for i in reversed(range(n // 2)):
+        down(h, i, n, metrics)
+
 
+def heapify_cheaper(batch: int, size: int) -> bool:
+    """
+    Rebuilding a heap of `size` items takes about 2 * size comparisons, while
+    fixing the items of the batch one by one takes about log2(size) each.
 
-def fix(h: HeapInterface, index: int):
-    if not down(h, index, len(h)):
-        up(h, index)
+    :return: true if re-heapifying once is cheaper than fixing per item.
+    """
 
+    return batch * max(size, 1).bit_length() > 2 * size
 
-def down(h: HeapInterface, i0: int, n: int) -> bool:
+
+class _Candidate(Generic[T]):
+    __slots__ = ("obj", "index", "less_func")
+
+    def __init__(self, obj: T, index: int, less_func: LessFunc):
+        self.obj = obj
+        self.index = index
+        self.less_func = less_func
+
+    def __lt__(self, other: "_Candidate[T]") -> bool:
+        return self.less_func(self.obj, other.obj)
+
+
+def ordered_indexes(
+    objs: List[T], less_func: LessFunc, arity: int = 2
+) -> Iterator[int]:
+    """
+    Yields the slots of a list in heap order sorted by `less_func`, without
+    modifying it. Only the children of yielded slots are candidates for the
+    next one, so the first k slots cost O(k log k).
+    """
+
+    if not objs:
+        return
+
+    n = len(objs)
+    frontier = [_Candidate(objs[0], 0, less_func)]
+    while frontier:
+        index = heapq.heappop(frontier).index
+        yield index
+
+        for child in range(arity * index + 1, min(arity * index + arity + 1, n)):
+            heapq.heappush(frontier, _Candidate(objs[child], child, less_func))
+
+
+# The sifts below report their swaps into `metrics` when it is set, `fix`
+# counts the swaps of the updated items, `up` and `down` the other ones.
+
+
+def fix(h: HeapInterface, index: int, metrics: Optional[HeapMetrics] = None):
+    swaps = _sift_down(h, index, len(h)) or _sift_up(h, index)
+    if metrics is not None:
+        metrics.fix_swaps += swaps
+
+
+def down(
+    h: HeapInterface, i0: int, n: int, metrics: Optional[HeapMetrics] = None
+) -> bool:
+    swaps = _sift_down(h, i0, n)
+    if metrics is not None:
+        metrics.down_swaps += swaps
+    return swaps > 0
+
+
+def up(h: HeapInterface, j: int, metrics: Optional[HeapMetrics] = None):
+    swaps = _sift_up(h, j)
+    if metrics is not None:
+        metrics.up_swaps += swaps
+
+
+def _sift_down(h: HeapInterface, i0: int, n: int) -> int:
+    swaps = 0
     i = i0
     while True:
         j1 = 2 * i + 1
@@ -165,12 +757,14 @@ def down(h: HeapInterface, i0: int, n: int) -> bool:
             break
 
         h.swap(i, j)
+        swaps += 1
         i = j
 
-    return i > i0
+    return swaps
 
 
-def up(h: HeapInterface, j: int):
+def _sift_up(h: HeapInterface, j: int) -> int:
+    swaps = 0
     while True:
         i = (j - 1) // 2
         if i < 0:
@@ -179,50 +773,172 @@ def up(h: HeapInterface, j: int):
         if i == j or not h.less(j, i):
             break
         h.swap(i, j)
+        swaps += 1
         j = i
 
+    return swaps
 
-def push(h: HeapInterface, x: T):
+
+def dary_fix(
+    h: HeapInterface, index: int, arity: int, metrics: Optional[HeapMetrics] = None
+):
+    swaps = _dary_sift_down(h, index, len(h), arity) or _dary_sift_up(h, index, arity)
+    if metrics is not None:
+        metrics.fix_swaps += swaps
+
+
+def dary_down(
+    h: HeapInterface,
+    i0: int,
+    n: int,
+    arity: int,
+    metrics: Optional[HeapMetrics] = None,
+) -> bool:
+    swaps = _dary_sift_down(h, i0, n, arity)
+    if metrics is not None:
+        metrics.down_swaps += swaps
+    return swaps > 0
+
+
+def dary_up(
+    h: HeapInterface, j: int, arity: int, metrics: Optional[HeapMetrics] = None
+):
+    swaps = _dary_sift_up(h, j, arity)
+    if metrics is not None:
+        metrics.up_swaps += swaps
+
+
+def _dary_sift_down(h: HeapInterface, i0: int, n: int, arity: int) -> int:
+    swaps = 0
+    i = i0
+    while True:
+        j1 = arity * i + 1
+        if j1 >= n or j1 < 0:
+            break
+        j = j1
+        for j2 in range(j1 + 1, min(j1 + arity, n)):
+            if h.less(j2, j):
+                j = j2
+
+        if not h.less(j, i):
+            break
+
+        h.swap(i, j)
+        swaps += 1
+        i = j
+
+    return swaps
+
+
+def _dary_sift_up(h: HeapInterface, j: int, arity: int) -> int:
+    swaps = 0
+    while j > 0:
+        i = (j - 1) // arity
+        if not h.less(j, i):
+            break
+        h.swap(i, j)
+        swaps += 1
+        j = i
+
+    return swaps
+
+
+def push(h: HeapInterface, x: T, metrics: Optional[HeapMetrics] = None):
     h.push(x)
-    up(h, len(h) - 1)
+    up(h, len(h) - 1, metrics)
 
 
-def pop(h: HeapInterface) -> Optional[T]:
+def pop(h: HeapInterface, metrics: Optional[HeapMetrics] = None) -> Optional[T]:
     n = len(h) - 1
     h.swap(0, n)
-    down(h, 0, n)
+    down(h, 0, n, metrics)
     return h.pop()
 
 
-def remove(h: HeapInterface, i: int):
+def remove(h: HeapInterface, i: int, metrics: Optional[HeapMetrics] = None):
     n = len(h) - 1
     if n != i:
         h.swap(i, n)
-        if not down(h, i, n):
-            up(h, i)
+        if not down(h, i, n, metrics):
+            up(h, i, metrics)
     return h.pop()
 
 
+def new_heap_data(
+    key_fn: KeyFunc, less_fn: LessFunc, backend: HeapBackend = HeapBackend.Binary
+) -> KeyedHeapInterface:
+    if backend == HeapBackend.Binary:
+        return HeapData(key_func=key_fn, less_func=less_fn)
+    if backend == HeapBackend.Quaternary:
+        return DaryHeapData(key_func=key_fn, less_func=less_fn)
+    if backend == HeapBackend.Pairing:
+        return PairingHeapData(key_func=key_fn, less_func=less_fn)
+    raise ValueError(f"unknown heap backend {backend!r}")
+
+
 @dataclass
 class Heap(Generic[T]):
-    lock: Lock
-    rlock: RLock
+    """
+    Writers hold `lock` exclusively, while readers (`get`, `list`, `peek` ...)
+    share it and run concurrently with each other.
+
+    With `metrics`, the heap records its depth, operation counts and timings
+    into it, see `HeapMetrics`.
+    """
+
+    lock: RWLock
     cond: Condition
-    data: HeapData[T]
+    data: KeyedHeapInterface[T]
     closed: bool = False
+    metrics: Optional[HeapMetrics] = None
 
     def __post_init__(self):
-        self.lock = Lock()
-        self.rlock = RLock()
-        self.cond = Condition(self.lock)
+        if self.metrics is None:
+            self.lock = RWLock()
+        else:
+            self.lock = InstrumentedRWLock(self.metrics)
+            if isinstance(self.data, HeapData):
+                self.data.metrics = self.metrics
+        self.cond = self.lock.condition()
+
+    @classmethod
+    def new(
+        cls,
+        key_fn: KeyFunc,
+        less_fn: LessFunc,
+        backend: HeapBackend = HeapBackend.Binary,
+        metrics: Optional[HeapMetrics] = None,
+    ) -> "Heap":
+        """
+        :param backend: the heap implementation, a binary heap by default. A
+            4-ary heap suits large update heavy queues, a pairing heap suits
+            queues with far more inserts and updates than pops.
+        :param metrics: enables the instrumentation of the heap
+        """
+
+        heap_data = new_heap_data(key_fn, less_fn, backend)
+        lock = RWLock()
+        cond = lock.condition()
+        return Heap(lock=lock, cond=cond, data=heap_data, metrics=metrics)
 
     @classmethod
-    def new(cls, key_fn: KeyFunc, less_fn: LessFunc) -> "Heap":
-        heap_data: HeapData[T] = HeapData(key_func=key_fn, less_func=less_fn)
-        lock = Lock()
-        rlock = RLock()
-        cond = Condition(lock)
-        return Heap(lock=lock, rlock=rlock, cond=cond, data=heap_data)
+    def new_with_sort_key(
+        cls,
+        key_fn: KeyFunc,
+        sort_key_fn: SortKeyFunc,
+        metrics: Optional[HeapMetrics] = None,
+    ) -> "Heap":
+        """
+        Creates a Heap ordered by ascending `sort_key_fn(obj)` instead of a
+        `less_fn` callback, the sort keys are compared natively.
+        """
+
+        heap_data: SortKeyHeapData[T] = SortKeyHeapData(
+            key_func=key_fn, sort_key_func=sort_key_fn
+        )
+        lock = RWLock()
+        cond = lock.condition()
+        return Heap(lock=lock, cond=cond, data=heap_data, metrics=metrics)
 
     def close(self):
         """
@@ -248,11 +964,9 @@ class Heap(Generic[T]):
             if self.closed:
                 raise HeapClosed
 
-            if key in self.data.items:
-                self.data.items[key].obj = obj
-                fix(self.data, self.data.items[key].index)
-            else:
-                self.add_if_not_present_locked(key, obj)
+            self.data.set(key, obj)
+            if self.metrics is not None:
+                self.metrics.on_set(key, len(self.data))
             self.cond.notify_all()
 
     def bulk_add(self, objs: List[T]):
@@ -265,20 +979,27 @@ class Heap(Generic[T]):
         :raises HeapKeyFuncError
         """
 
+        keyed = [(self.data.key_func(obj), obj) for obj in objs]
         with self.lock:
             if self.closed:
                 raise HeapClosed
 
-            for obj in objs:
-                key = self.data.key_func(obj)
-                if key in self.data.items:
-                    self.data.items[key].obj = obj
-                    fix(self.data, self.data.items[key].index)
-                else:
-                    self.add_if_not_present_locked(key, obj)
-
+            self.data.bulk_set(keyed)
+            if self.metrics is not None:
+                for key, _ in keyed:
+                    self.metrics.on_set(key, len(self.data))
             self.cond.notify_all()
 
+    def bulk_update(self, objs: List[T]):
+        """
+        BulkUpdate is the same as BulkAdd in this implementation.
+
+        :raises HeapClosed
+        :raises HeapKeyFuncError
+        """
+
+        self.bulk_add(objs)
+
     def add_if_not_present(self, obj: T):
         """
         Inserts an item, and puts it in the queue. If an item with
@@ -305,10 +1026,12 @@ class Heap(Generic[T]):
         item to the queue if it does not already exist.
         """
 
-        if key in self.data.items:
+        if key in self.data:
             return
 
-        push(self.data, ItemKeyValue(key=key, obj=obj))
+        self.data.set(key, obj)
+        if self.metrics is not None:
+            self.metrics.on_set(key, len(self.data))
 
     def update(self, obj: T):
         """
@@ -330,46 +1053,137 @@ class Heap(Generic[T]):
         """
         key = self.data.key_func(obj)
         with self.lock:
-            if (item := self.data.items.get(key)) is None:
-                raise HeapObjectNotFound
-            remove(self.data, item.index)
+            self.data.delete(key)
+            if self.metrics is not None:
+                self.metrics.on_delete(key, len(self.data))
+
+    def bulk_delete(self, objs: List[T]):
+        """
+        Removes all the items in the list. Nothing is removed if any of them
+        is not in the heap.
+
+        :raises HeapKeyFuncError
+        :raises HeapObjectNotFound
+        """
+
+        keys = {self.data.key_func(obj) for obj in objs}
+        with self.lock:
+            self.data.bulk_delete(keys)
+            if self.metrics is not None:
+                for key in keys:
+                    self.metrics.on_delete(key, len(self.data))
 
     def pop(self) -> T:
         """
         Pop waits until an item is ready. If multiple items are
-        ready, they are returned in the order given by `Heap.data.less_func`.
+        ready, they are returned in heap order.
 
         :raises HeapClosed
         :raises HeapObjectAlreadyRemoved
         """
+        start = self.metrics.clock() if self.metrics is not None else 0.0
         with self.lock:
-            while len(self.data.queue) == 0:
+            while len(self.data) == 0:
                 if self.closed:
                     raise HeapClosed
                 self.cond.wait()
 
-            obj: Optional[T] = pop(self.data)
+            obj: Optional[T] = self.data.pop_first()
 
             if obj is None:
                 raise HeapObjectAlreadyRemoved
             else:
+                if self.metrics is not None:
+                    self.record_pops([obj], start)
                 return obj
 
+    def pop_many(self, n: int, timeout: Optional[float] = None) -> List[T]:
+        """
+        Waits until an item is ready, then pops up to `n` items in heap order,
+        so a consumer drains a batch with a single wakeup.
+
+        :param timeout: seconds to wait for the first item, wait forever if None
+        :raises HeapClosed
+        :raises HeapObjectAlreadyRemoved
+        :return: the popped items, empty if the timeout expired.
+        """
+
+        start = self.metrics.clock() if self.metrics is not None else 0.0
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self.lock:
+            while len(self.data) == 0:
+                if self.closed:
+                    raise HeapClosed
+
+                if deadline is None:
+                    self.cond.wait()
+                elif (remaining := deadline - time.monotonic()) <= 0:
+                    return []
+                else:
+                    self.cond.wait(remaining)
+
+            objs: List[T] = []
+            for _ in range(min(n, len(self.data))):
+                obj: Optional[T] = self.data.pop_first()
+                if obj is None:
+                    raise HeapObjectAlreadyRemoved
+                objs.append(obj)
+
+            if self.metrics is not None:
+                self.record_pops(objs, start)
+            return objs
+
+    def record_pops(self, objs: List[T], start: float):
+        """
+        Assumes the lock is already held and `metrics` is set.
+        """
+
+        metrics: HeapMetrics = self.metrics  # type: ignore
+        wait = metrics.clock() - start
+        for obj in objs:
+            metrics.on_pop(self.data.key_func(obj), len(self.data), wait)
+
+    def peek(self) -> Optional[T]:
+        """
+        :return: the item `pop` would return without removing it, None if the
+            heap is empty.
+        """
+
+        with self.lock.read():
+            return self.data.first()
+
+    def top_k(self, k: int) -> List[T]:
+        """
+        :return: the first `k` items in heap order, without removing them.
+        """
+
+        with self.lock.read():
+            return self.data.top_k(k)
+
+    def ordered(self) -> Iterator[T]:
+        """
+        :return: an iterator over a snapshot of the items in heap order. The
+            heap is not modified and later changes are not seen by the iterator.
+        """
+
+        with self.lock.read():
+            return self.data.ordered()
+
     def list(self) -> List[T]:
         """
         :return: a list of all the items.
         """
 
-        with self.rlock:
-            return [item.obj for item in self.data.items.values()]
+        with self.lock.read():
+            return self.data.values()
 
     def list_keys(self) -> List[str]:
         """
         :return: a list of all the keys of the objects currently in the Heap.
         """
 
-        with self.rlock:
-            return list(self.data.items.keys())
+        with self.lock.read():
+            return self.data.keys()
 
     def get(self, obj: T) -> Optional[T]:
         """
@@ -386,15 +1200,13 @@ class Heap(Generic[T]):
         :return: the requested item
         """
 
-        with self.rlock:
-            if (item := self.data.items.get(key)) is not None:
-                return item.obj
-            return None
+        with self.lock.read():
+            return self.data.get(key)
 
     def is_closed(self) -> bool:
         """
         :return:true if the queue is closed
         """
 
-        with self.rlock:
+        with self.lock.read():
             return self.closed
@@ -0,0 +1,205 @@
+import time
+
+from bisect import bisect_left
+from dataclasses import dataclass
+from threading import Lock
+from threading import get_ident
+from typing import Callable
+from typing import Dict
+from typing import List
+from typing import Sequence
+from typing import Tuple
+
+from airport.utils.rwlock import RWLock
+
+
+Clock = Callable[[], float]
+
+# seconds, from a microsecond to ten seconds
+DefaultBuckets = (1e-6, 1e-5, 1e-4, 1e-3, 1e-2, 0.1, 1.0, 10.0)
+
+
+@dataclass
+class HistogramSnapshot:
+    count: int
+    sum: float
+    max: float
+    # (upper bound, cumulative count) pairs, the last bound is infinity
+    buckets: List[Tuple[float, int]]
+
+
+class Histogram:
+    __slots__ = ("bounds", "counts", "count", "sum", "max")
+
+    def __init__(self, bounds: Sequence[float] = DefaultBuckets):
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+        if value > self.max:
+            self.max = value
+
+    def snapshot(self) -> HistogramSnapshot:
+        buckets = []
+        total = 0
+        for bound, count in zip((*self.bounds, float("inf")), self.counts):
+            total += count
+            buckets.append((bound, total))
+
+        return HistogramSnapshot(
+            count=self.count, sum=self.sum, max=self.max, buckets=buckets
+        )
+
+
+@dataclass
+class HeapMetricsSnapshot:
+    time: float
+    depth: int
+    max_depth: int
+    adds: int
+    updates: int
+    deletes: int
+    pops: int
+    fix_swaps: int
+    up_swaps: int
+    down_swaps: int
+    enqueued_time: HistogramSnapshot
+    pop_wait_time: HistogramSnapshot
+    lock_wait_time: HistogramSnapshot
+    lock_hold_time: HistogramSnapshot
+    read_lock_wait_time: HistogramSnapshot
+    read_lock_hold_time: HistogramSnapshot
+
+
+class HeapMetrics:
+    """
+    Counters and histograms of a `Heap`, enabled by passing an instance to
+    `Heap.new`. A heap without metrics only pays for `is None` checks.
+
+    The values are pulled with `snapshot`, the depth and the counters of
+    successive snapshots give their evolution over time. The times are in
+    seconds of `clock`.
+    """
+
+    def __init__(self, clock: Clock = time.perf_counter):
+        self.clock = clock
+        self._lock = Lock()
+        self._enqueued_at: Dict[str, float] = {}
+        self.depth = 0
+        self.max_depth = 0
+        self.adds = 0
+        self.updates = 0
+        self.deletes = 0
+        self.pops = 0
+        # the swaps of the array backends, while fixing the updated items and
+        # while sifting the other ones up or down, counted under the write
+        # lock of the heap
+        self.fix_swaps = 0
+        self.up_swaps = 0
+        self.down_swaps = 0
+        self.enqueued_time = Histogram()
+        self.pop_wait_time = Histogram()
+        self.lock_wait_time = Histogram()
+        self.lock_hold_time = Histogram()
+        self.read_lock_wait_time = Histogram()
+        self.read_lock_hold_time = Histogram()
+
+    def on_set(self, key: str, depth: int):
+        with self._lock:
+            if key in self._enqueued_at:
+                self.updates += 1
+            else:
+                self.adds += 1
+                self._enqueued_at[key] = self.clock()
+            self._set_depth(depth)
+
+    def on_delete(self, key: str, depth: int):
+        with self._lock:
+            self.deletes += 1
+            self._enqueued_at.pop(key, None)
+            self._set_depth(depth)
+
+    def on_pop(self, key: str, depth: int, wait: float):
+        with self._lock:
+            self.pops += 1
+            if (enqueued_at := self._enqueued_at.pop(key, None)) is not None:
+                self.enqueued_time.observe(self.clock() - enqueued_at)
+            self.pop_wait_time.observe(wait)
+            self._set_depth(depth)
+
+    def _set_depth(self, depth: int):
+        self.depth = depth
+        if depth > self.max_depth:
+            self.max_depth = depth
+
+    def observe(self, histogram: Histogram, value: float):
+        with self._lock:
+            histogram.observe(value)
+
+    def snapshot(self) -> HeapMetricsSnapshot:
+        with self._lock:
+            return HeapMetricsSnapshot(
+                time=self.clock(),
+                depth=self.depth,
+                max_depth=self.max_depth,
+                adds=self.adds,
+                updates=self.updates,
+                deletes=self.deletes,
+                pops=self.pops,
+                fix_swaps=self.fix_swaps,
+                up_swaps=self.up_swaps,
+                down_swaps=self.down_swaps,
+                enqueued_time=self.enqueued_time.snapshot(),
+                pop_wait_time=self.pop_wait_time.snapshot(),
+                lock_wait_time=self.lock_wait_time.snapshot(),
+                lock_hold_time=self.lock_hold_time.snapshot(),
+                read_lock_wait_time=self.read_lock_wait_time.snapshot(),
+                read_lock_hold_time=self.read_lock_hold_time.snapshot(),
+            )
+
+
+class InstrumentedRWLock(RWLock):
+    """
+    `RWLock` recording how long the lock is waited for and held.
+    """
+
+    def __init__(self, metrics: HeapMetrics):
+        super().__init__()
+        self._metrics = metrics
+        self._acquired_at = 0.0
+        self._read_acquired_at: Dict[int, float] = {}
+
+    def acquire(self, blocking: bool = True, timeout: float = -1) -> bool:
+        clock = self._metrics.clock
+        start = clock()
+        acquired = super().acquire(blocking, timeout)
+        if acquired:
+            self._acquired_at = clock()
+            self._metrics.observe(
+                self._metrics.lock_wait_time, self._acquired_at - start
+            )
+        return acquired
+
+    def release(self):
+        held = self._metrics.clock() - self._acquired_at
+        super().release()
+        self._metrics.observe(self._metrics.lock_hold_time, held)
+
+    def acquire_read(self):
+        clock = self._metrics.clock
+        start = clock()
+        super().acquire_read()
+        acquired_at = self._read_acquired_at[get_ident()] = clock()
+        self._metrics.observe(self._metrics.read_lock_wait_time, acquired_at - start)
+
+    def release_read(self):
+        acquired_at = self._read_acquired_at.pop(get_ident())
+        held = self._metrics.clock() - acquired_at
+        super().release_read()
+        self._metrics.observe(self._metrics.read_lock_hold_time, held)
@@ -0,0 +1,30 @@
+from typing import Dict
+from typing import Hashable
+from typing import TypeVar
+
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V", bound=Hashable)
+
+
+def decrease(counts: Dict[K, int], key: K):
+    """
+    Decrements the count of `key`, which is deleted once it drops to zero.
+    """
+
+    if (count := counts[key] - 1) > 0:
+        counts[key] = count
+    else:
+        del counts[key]
+
+
+def decrease_nested(counts: Dict[K, Dict[V, int]], outer: K, key: V):
+    """
+    Decrements the count of `key` in `counts[outer]`, which is deleted once it
+    holds no count anymore.
+    """
+
+    inner = counts[outer]
+    decrease(inner, key)
+    if not inner:
+        del counts[outer]
@@ -0,0 +1,120 @@
+from threading import Condition
+from threading import Lock
+from threading import get_ident
+from typing import Optional
+
+
+class _ReadLock:
+    __slots__ = ("_lock",)
+
+    def __init__(self, lock: "RWLock"):
+        self._lock = lock
+
+    def __enter__(self):
+        self._lock.acquire_read()
+
+    def __exit__(self, *args):
+        self._lock.release_read()
+
+
+class RWLock:
+    """
+    A writer preferring reader-writer lock.
+
+    Readers share the lock through `read()`. Writers own it exclusively
+    through `acquire`/`release` or the context manager, which makes it usable
+    as the lock of a `threading.Condition`. A waiting writer blocks new
+    readers, so the lock is not reentrant for readers.
+    """
+
+    def __init__(self):
+        self._cond = Condition(Lock())
+        self._readers = 0
+        self._writer: Optional[int] = None
+        self._waiting_readers = 0
+        self._waiting_writers = 0
+        self._read_lock = _ReadLock(self)
+
+    def acquire(self, blocking: bool = True, timeout: float = -1) -> bool:
+        with self._cond:
+            if self._writer is None and not self._readers:
+                self._writer = get_ident()
+                return True
+
+            if not blocking:
+                return False
+
+            self._waiting_writers += 1
+            try:
+                acquired = self._cond.wait_for(
+                    lambda: self._writer is None and not self._readers,
+                    None if timeout < 0 else timeout,
+                )
+            finally:
+                self._waiting_writers -= 1
+
+            if not acquired:
+                # readers may be waiting for this writer to give up
+                if self._waiting_readers:
+                    self._cond.notify_all()
+                return False
+
+            self._writer = get_ident()
+            return True
+
+    def release(self):
+        """
+        :raises RuntimeError: if the calling thread does not own the lock
+        """
+
+        with self._cond:
+            if self._writer != get_ident():
+                raise RuntimeError("cannot release un-acquired lock")
+
+            self._writer = None
+            if self._waiting_readers or self._waiting_writers:
+                self._cond.notify_all()
+
+    def __enter__(self) -> bool:
+        return self.acquire()
+
+    def __exit__(self, *args):
+        self.release()
+
+    def _is_owned(self) -> bool:
+        return self._writer == get_ident()
+
+    def condition(self) -> Condition:
+        """
+        :return: a condition variable bound to the write side of the lock.
+        """
+
+        return Condition(self)  # type: ignore
+
+    def acquire_read(self):
+        with self._cond:
+            if self._writer is None and not self._waiting_writers:
+                self._readers += 1
+                return
+
+            self._waiting_readers += 1
+            try:
+                self._cond.wait_for(
+                    lambda: self._writer is None and not self._waiting_writers
+                )
+            finally:
+                self._waiting_readers -= 1
+            self._readers += 1
+
+    def release_read(self):
+        with self._cond:
+            self._readers -= 1
+            if not self._readers and self._waiting_writers:
+                self._cond.notify_all()
+
+    def read(self) -> _ReadLock:
+        """
+        :return: a context manager holding the lock shared while in it.
+        """
+
+        return self._read_lock
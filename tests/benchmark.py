@@ -0,0 +1,46 @@
+"""
+Helpers for the benchmark modules (`bench_*.py`). They are not collected by
+pytest and are run directly, e.g. `python -m tests.utils.cache.bench_heap`.
+"""
+
+import time
+
+from typing import Callable
+from typing import Sequence
+from typing import TypeVar
+
+
+S = TypeVar("S")
+
+
+def measure(run: Callable[[S], int], setup: Callable[[], S], repeat: int = 1) -> float:
+    """
+    Calls `setup` outside of the timed section and `run` inside of it.
+
+    :param run: returns the number of operations it did
+    :return: the best throughput in ops/sec
+    """
+
+    best = 0.0
+    for _ in range(repeat):
+        state = setup()
+        start = time.perf_counter()
+        ops = run(state)
+        elapsed = time.perf_counter() - start
+        best = max(best, ops / elapsed if elapsed > 0 else float("inf"))
+
+    return best
+
+
+def print_table(headers: Sequence[str], rows: Sequence[Sequence[object]]):
+    cells = [[str(cell) for cell in row] for row in [headers, *rows]]
+    widths = [max(len(row[i]) for row in cells) for i in range(len(headers))]
+
+    for n, row in enumerate(cells):
+        print("  ".join(cell.rjust(width) for cell, width in zip(row, widths)))
+        if n == 0:
+            print("  ".join("-" * width for width in widths))
+
+
+def format_ops(ops_per_sec: float) -> str:
+    return f"{ops_per_sec:,.0f}"
@@ -0,0 +1,166 @@
+"""
+Measures filtering and scoring nodes with a compiled node affinity, against
+interpreting the affinity models for every node, and compiling the affinity of
+the replicas of a job.
+
+    python -m tests.kube.bench_node_affinity [NODES ...]
+"""
+
+import random
+import sys
+
+from typing import Dict
+from typing import List
+
+from airport.kube.api import NodeAffinity
+from airport.kube.api import NodeSelectorOperator
+from airport.kube.api import NodeSelectorRequirement
+from airport.kube.api import NodeSelectorTerm
+from airport.kube.node_affinity import compile_node_affinity
+from tests.benchmark import format_ops
+from tests.benchmark import measure
+from tests.benchmark import print_table
+
+
+DefaultSizes = [5_000]
+
+Zones = [f"zone-{i}" for i in range(10)]
+
+
+def make_labels(rand: random.Random) -> Dict[str, str]:
+    labels = {
+        "zone": rand.choice(Zones),
+        "cores": str(rand.choice([8, 16, 32, 64])),
+        "pool": rand.choice(["default", "batch", "infra"]),
+    }
+    if rand.random() < 0.2:
+        labels["gpu"] = "true"
+    if rand.random() < 0.5:
+        labels["ssd"] = "true"
+    return labels
+
+
+def make_affinity() -> NodeAffinity:
+    def expression(key: str, operator: str, *values: str) -> dict:
+        return {"key": key, "operator": operator, "values": list(values)}
+
+    return NodeAffinity.parse_obj(
+        {
+            "requiredDuringSchedulingIgnoredDuringExecution": {
+                "nodeSelectorTerms": [
+                    {
+                        "matchExpressions": [
+                            expression("zone", "In", *Zones[:6]),
+                            expression("cores", "Gt", "8"),
+                            expression("pool", "NotIN", "infra"),
+                        ]
+                    },
+                    {"matchExpressions": [expression("gpu", "Exists")]},
+                ]
+            },
+            "preferredDuringSchedulingIgnoredDuringExecution": [
+                {
+                    "weight": 10,
+                    "preference": {"matchExpressions": [expression("ssd", "Exists")]},
+                },
+                {
+                    "weight": 5,
+                    "preference": {
+                        "matchExpressions": [expression("zone", "In", *Zones[:2])]
+                    },
+                },
+            ],
+        }
+    )
+
+
+def interpret_requirement(
+    requirement: NodeSelectorRequirement, labels: Dict[str, str]
+) -> bool:
+    operator, value = requirement.operator, labels.get(requirement.key)
+    if operator == NodeSelectorOperator.In:
+        return value in requirement.values
+    if operator == NodeSelectorOperator.NotIn:
+        return value not in requirement.values
+    if operator == NodeSelectorOperator.Exists:
+        return requirement.key in labels
+    if operator == NodeSelectorOperator.DoesNotExist:
+        return requirement.key not in labels
+    if value is None:
+        return False
+    if operator == NodeSelectorOperator.Gt:
+        return int(value) > int(requirement.values[0])
+    return int(value) < int(requirement.values[0])
+
+
+def interpret_term(term: NodeSelectorTerm, labels: Dict[str, str]) -> bool:
+    return bool(term.matchExpressions) and all(
+        interpret_requirement(requirement, labels)
+        for requirement in term.matchExpressions
+    )
+
+
+def interpret(affinity: NodeAffinity, labels: Dict[str, str]) -> int:
+    """
+    :return: the score of the node, -1 if it does not fit.
+    """
+
+    required = affinity.requiredDuringSchedulingIgnoredDuringExecution
+    if required is not None and not any(
+        interpret_term(term, labels) for term in required.nodeSelectorTerms
+    ):
+        return -1
+
+    return sum(
+        preferred.weight
+        for preferred in affinity.preferredDuringSchedulingIgnoredDuringExecution
+        if interpret_term(preferred.preference, labels)
+    )
+
+
+def bench(size: int) -> List[str]:
+    rand = random.Random(size)
+    nodes = [(f"node-{i}", make_labels(rand)) for i in range(size)]
+    affinity = make_affinity()
+    replicas = [make_affinity() for _ in range(100)]
+
+    compiled = compile_node_affinity(affinity)
+    assert [interpret(affinity, labels) for _, labels in nodes] == [
+        compiled.score(labels) if compiled.matches(labels, name) else -1
+        for name, labels in nodes
+    ]
+
+    def run_interpreted(_) -> int:
+        for _, labels in nodes:
+            interpret(affinity, labels)
+        return len(nodes)
+
+    def run_compiled(_) -> int:
+        compiled = compile_node_affinity(affinity)
+        for name, labels in nodes:
+            if compiled.matches(labels, name):
+                compiled.score(labels, name)
+        return len(nodes)
+
+    def run_compile(_) -> int:
+        for replica in replicas:
+            compile_node_affinity(replica)
+        return len(replicas)
+
+    return [
+        f"{size:,}",
+        format_ops(measure(run_interpreted, lambda: None, repeat=3)),
+        format_ops(measure(run_compiled, lambda: None, repeat=3)),
+        format_ops(measure(run_compile, lambda: None, repeat=3)),
+    ]
+
+
+def main(sizes: List[int]):
+    rows = [bench(size) for size in sizes]
+    print_table(
+        ["nodes", "interpreted nodes/s", "compiled nodes/s", "replicas/s"], rows
+    )
+
+
+if __name__ == "__main__":
+    main([int(size) for size in sys.argv[1:]] or DefaultSizes)
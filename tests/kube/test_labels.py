@@ -0,0 +1,65 @@
+import pytest
+
+from airport.kube.api import LabelSelector
+from airport.kube.labels import compile_label_selector
+
+
+parametrize = pytest.mark.parametrize
+
+
+def selector(match_labels=None, *expressions) -> LabelSelector:
+    return LabelSelector.parse_obj(
+        {
+            "matchLabels": match_labels or {},
+            "matchExpressions": [
+                {"key": key, "operator": operator, "values": list(values)}
+                for key, operator, *values in expressions
+            ],
+        }
+    )
+
+
+@parametrize(
+    "label_selector, labels, expected",
+    [
+        (selector({"app": "web"}), {"app": "web", "tier": "1"}, True),
+        (selector({"app": "web"}), {"app": "db"}, False),
+        (selector({"app": "web", "tier": "1"}), {"app": "web"}, False),
+        (selector(None, ("app", "In", "web", "db")), {"app": "db"}, True),
+        (selector(None, ("app", "In", "web")), {}, False),
+        (selector(None, ("app", "NotIn", "web")), {}, True),
+        (selector(None, ("app", "NotIn", "web")), {"app": "web"}, False),
+        (selector(None, ("app", "Exists")), {"app": ""}, True),
+        (selector(None, ("app", "DoesNotExist")), {"app": ""}, False),
+        (selector({"app": "web"}, ("tier", "Exists")), {"app": "web"}, False),
+        (selector(), {"app": "web"}, True),
+        (None, {"app": "web"}, False),
+    ],
+)
+def test_label_selector_matches(label_selector, labels, expected):
+    assert compile_label_selector(label_selector).matches(labels) is expected
+
+
+def test_label_selector_bulk():
+    compiled = compile_label_selector(
+        selector({"app": "web"}, ("tier", "NotIn", "2"), ("zone", "Exists"))
+    )
+    labels_list = [
+        {"app": "web", "zone": "a"},
+        {"app": "web", "zone": "a", "tier": "2"},
+        {"app": "db", "zone": "a"},
+        {"app": "web", "tier": "1", "zone": "b"},
+    ]
+
+    assert compiled.match_many(labels_list) == [True, False, False, True]
+    assert compiled.select(labels_list) == [0, 3]
+    assert compiled(labels_list[0])
+
+
+def test_label_selector_shared():
+    first = selector({"a": "1", "b": "2"}, ("c", "In", "x", "y"), ("d", "Exists"))
+    second = selector({"b": "2", "a": "1"}, ("d", "Exists"), ("c", "In", "y", "x"))
+
+    assert compile_label_selector(first) is compile_label_selector(second)
+    assert compile_label_selector(first) != compile_label_selector(None)
+    assert len({compile_label_selector(first), compile_label_selector(second)}) == 1
@@ -0,0 +1,133 @@
+import pytest
+
+from airport.kube.api import NodeAffinity
+from airport.kube.api import Pod
+from airport.kube.node_affinity import compile_node_affinity
+from airport.kube.node_affinity import pod_node_affinity
+
+
+parametrize = pytest.mark.parametrize
+
+
+def expression(key: str, operator: str, *values: str) -> dict:
+    return {"key": key, "operator": operator, "values": list(values)}
+
+
+def required(*terms: dict) -> NodeAffinity:
+    return NodeAffinity.parse_obj(
+        {"requiredDuringSchedulingIgnoredDuringExecution": {"nodeSelectorTerms": terms}}
+    )
+
+
+@parametrize(
+    "expr, labels, expected",
+    [
+        (expression("zone", "In", "a", "b"), {"zone": "b"}, True),
+        (expression("zone", "In", "a", "b"), {"zone": "c"}, False),
+        (expression("zone", "In", "a"), {}, False),
+        (expression("zone", "NotIN", "a"), {"zone": "b"}, True),
+        (expression("zone", "NotIN", "a"), {}, True),
+        (expression("zone", "NotIN", "a"), {"zone": "a"}, False),
+        (expression("gpu", "Exists"), {"gpu": ""}, True),
+        (expression("gpu", "Exists"), {}, False),
+        (expression("gpu", "DoesNotExist"), {}, True),
+        (expression("cores", "Gt", "8"), {"cores": "16"}, True),
+        (expression("cores", "Gt", "8"), {"cores": "8"}, False),
+        (expression("cores", "Gt", "8"), {"cores": "x"}, False),
+        (expression("cores", "Lt", "8"), {"cores": "4"}, True),
+        (expression("cores", "Lt", "8"), {}, False),
+        (expression("cores", "Lt", "x"), {"cores": "4"}, False),
+        (expression("cores", "Lt", "8", "9"), {"cores": "4"}, False),
+    ],
+)
+def test_node_affinity_expressions(expr, labels, expected):
+    affinity = compile_node_affinity(required({"matchExpressions": [expr]}))
+    assert affinity.matches(labels, "node") is expected
+
+
+def test_node_affinity_terms():
+    affinity = compile_node_affinity(
+        required(
+            {
+                "matchExpressions": [
+                    expression("zone", "In", "a"),
+                    expression("gpu", "Exists"),
+                ]
+            },
+            {"matchFields": [expression("metadata.name", "In", "n2")]},
+            {"matchFields": [expression("spec.unschedulable", "In", "true")]},
+            {},
+        )
+    )
+
+    assert affinity.matches({"zone": "a", "gpu": "true"}, "n1")
+    assert not affinity.matches({"zone": "a"}, "n1")
+    assert affinity.matches({}, "n2")
+    assert not affinity.matches({}, "n3")
+
+    assert compile_node_affinity(None).matches({}, "n1")
+    assert not compile_node_affinity(required()).matches({"zone": "a"}, "n1")
+
+
+def test_node_affinity_score():
+    affinity = compile_node_affinity(
+        NodeAffinity.parse_obj(
+            {
+                "preferredDuringSchedulingIgnoredDuringExecution": [
+                    {
+                        "weight": 10,
+                        "preference": {
+                            "matchExpressions": [expression("ssd", "Exists")]
+                        },
+                    },
+                    {
+                        "weight": 3,
+                        "preference": {
+                            "matchExpressions": [expression("zone", "In", "a")]
+                        },
+                    },
+                ]
+            }
+        )
+    )
+
+    assert affinity.matches({}, "n1")
+    assert affinity.score({"ssd": "", "zone": "a"}) == 13
+    assert affinity.score({"zone": "a"}) == 3
+    assert affinity.score({}) == 0
+
+
+def test_node_affinity_shared():
+    first = required(
+        {
+            "matchExpressions": [
+                expression("zone", "In", "a", "b"),
+                expression("x", "Exists"),
+            ]
+        }
+    )
+    second = required(
+        {
+            "matchExpressions": [
+                expression("x", "Exists"),
+                expression("zone", "In", "b", "a"),
+            ]
+        }
+    )
+
+    assert compile_node_affinity(first) is compile_node_affinity(second)
+    assert compile_node_affinity(first) != compile_node_affinity(None)
+
+    # the terms are sorted too
+    zone = {"matchExpressions": [expression("zone", "In", "a")]}
+    gpu = {"matchExpressions": [expression("gpu", "Exists")]}
+    assert compile_node_affinity(required(zone, gpu)) is compile_node_affinity(
+        required(gpu, zone)
+    )
+
+    pods = [
+        Pod.parse_obj({"spec": {"affinity": {"nodeAffinity": first.dict()}}})
+        for _ in range(2)
+    ]
+    assert pod_node_affinity(pods[0]) is pod_node_affinity(pods[1])
+    assert pod_node_affinity(Pod()) is compile_node_affinity(None)
@@ -0,0 +1,82 @@
+import pytest
+
+from airport.kube.api import ContainerPort
+from airport.kube.api import Pod
+from airport.kube.api import PodPhase
+from airport.scheduler.api import HostPortInfo
+from airport.scheduler.api import NodeInfo
+from airport.scheduler.api import TaskInfo
+from airport.scheduler.api.host_port_info import pod_host_ports
+
+from .helper import build_node
+from .helper import build_pod
+
+
+parametrize = pytest.mark.parametrize
+
+
+def with_ports(pod: Pod, *ports: dict, host_network: bool = False) -> Pod:
+    pod.spec.containers[0].ports = [ContainerPort(**port) for port in ports]
+    pod.spec.hostNetwork = host_network
+    return pod
+
+
+def test_pod_host_ports():
+    pod = build_pod("c1", "p1", "", PodPhase.Pending, {})
+    ports = [
+        {"hostPort": 80, "containerPort": 8080},
+        {"hostPort": 53, "protocol": "UDP", "hostIP": "10.0.0.1"},
+        {"containerPort": 9090},
+    ]
+
+    assert pod_host_ports(with_ports(pod, *ports)) == [
+        ("TCP", "0.0.0.0", 80),
+        ("UDP", "10.0.0.1", 53),
+    ]
+    assert pod_host_ports(with_ports(pod, *ports, host_network=True))[-1] == (
+        "TCP",
+        "0.0.0.0",
+        9090,
+    )
+
+
+@parametrize(
+    "used, port, expected",
+    [
+        (("TCP", "0.0.0.0", 80), ("TCP", "10.0.0.1", 80), True),
+        (("TCP", "10.0.0.1", 80), ("TCP", "0.0.0.0", 80), True),
+        (("TCP", "10.0.0.1", 80), ("TCP", "10.0.0.1", 80), True),
+        (("TCP", "10.0.0.1", 80), ("TCP", "10.0.0.2", 80), False),
+        (("TCP", "0.0.0.0", 80), ("UDP", "0.0.0.0", 80), False),
+        (("TCP", "0.0.0.0", 80), ("TCP", "0.0.0.0", 81), False),
+    ],
+)
+def test_host_port_conflicts(used, port, expected):
+    info = HostPortInfo()
+    info.add("c1/p1", [used])
+    assert info.conflicts(port) is expected
+    assert info.fits([port]) is not expected
+
+
+def test_node_info_host_ports():
+    node_info = NodeInfo.new(build_node("n1", {"cpu": "4", "memory": "8G"}))
+    pod1 = build_pod("c1", "p1", "n1", PodPhase.Running, {"cpu": "1"})
+    pod2 = build_pod("c1", "p2", "n1", PodPhase.Running, {"cpu": "1"})
+    task1 = TaskInfo.new(with_ports(pod1, {"hostPort": 80}))
+    task2 = TaskInfo.new(with_ports(pod2, {"hostPort": 80, "hostIP": "10.0.0.1"}))
+
+    node_info.add_task(task1)
+    node_info.add_task(task2)
+    assert node_info.host_ports.used == {
+        ("TCP", "0.0.0.0", 80),
+        ("TCP", "10.0.0.1", 80),
+    }
+
+    # the ports are released even if the task pod was compacted since
+    task1.compact()
+    node_info.remove_task(task1)
+    assert node_info.host_ports.used == {("TCP", "10.0.0.1", 80)}
+    assert node_info.host_ports.fits([("TCP", "10.0.0.2", 80)])
+
+    node_info.remove_task(task2)
+    assert node_info.host_ports == HostPortInfo()
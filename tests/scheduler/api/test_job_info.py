@@ -272,3 +272,44 @@ class TestJobInfo:
 
         with pytest.raises(job_info.FailedToFindTask):
             job.delete_task_info(task2)
+
+    def test_compact_finished_tasks(self):
+        pod1 = build_pod("ns", "p1", "n1", "Running", {"cpu": "1000m", "memory": "1G"})
+        task1 = TaskInfo.new(pod1)
+
+        pod2 = build_pod("ns", "p2", "n1", "Succeeded", {"cpu": "2000m", "memory": "2G"})
+        task2 = TaskInfo.new(pod2)
+
+        job = JobInfo(uid="job", compact_finished_tasks=True)
+        for task in [task1, task2]:
+            job.add_task_info(task)
+
+        assert not task1.compacted
+        assert task2.compacted
+        assert task2.pod.metadata.name == "p2" and not task2.pod.spec.containers
+        assert job.ready_task_num == 2
+        assert job.total_request == Resource.new({"cpu": "3000m", "memory": "3G"})
+
+        job.update_task_status(task1, TaskStatus.Failed)
+        assert task1.compacted
+        assert len(job.task_status_index[TaskStatus.Failed]) == 1
+
+        assert job.rehydrate_task(task2.uid) == pod2
+        assert not task2.compacted
+
+        job.delete_task_info(task2)
+        assert job.total_request == Resource.new({"cpu": "1000m", "memory": "1G"})
+
+    def test_compact(self):
+        pod1 = build_pod("ns", "p1", "n1", "Running", {"cpu": "1000m", "memory": "1G"})
+        pod2 = build_pod("ns", "p2", "n1", "Failed", {"cpu": "2000m", "memory": "2G"})
+
+        job = JobInfo.new("job", TaskInfo.new(pod1), TaskInfo.new(pod2))
+        assert job.compact() == 1
+        assert job.compact() == 0
+        assert job.tasks[pod2.metadata.uid].compacted
+        # the blob is not part of the model
+        task = job.tasks[pod2.metadata.uid]
+        assert "pod_blob" not in task.dict()
+        assert TaskInfo.parse_raw(task.json()).pod == task.pod
+        assert job.rehydrate_task(pod2.metadata.uid) == pod2
@@ -2,6 +2,7 @@ from airport.kube.api import ResourceQuantity
 from airport.kube.api import ResourceQuota
 from airport.scheduler.api.namespace_info import DefaultNamespaceWeight
 from airport.scheduler.api.namespace_info import NamespaceCollection
+from airport.scheduler.api.namespace_info import NamespaceRegistry
 from airport.scheduler.api.namespace_info import NamespaceWeightKey
 
 
@@ -55,3 +56,65 @@ def test_empty_namespace_collection():
     collection.delete(new_quota("ghi", -1))
     info = collection.snapshot()
     assert info.weight == DefaultNamespaceWeight
+
+
+def test_namespace_collection_snapshot_is_read_only():
+    collection = NamespaceCollection("testCollection")
+    collection.update(new_quota("abc", 123))
+    collection.update(new_quota("def", 16))
+    queue = list(collection.quota_weight.data.queue)
+
+    for _ in range(3):
+        assert collection.snapshot().weight == 123
+
+    assert collection.quota_weight.data.queue == queue
+
+
+def new_namespace_quota(namespace: str, name: str, weight: int) -> ResourceQuota:
+    quota = new_quota(name, weight)
+    quota.metadata.namespace = namespace
+    return quota
+
+
+def test_namespace_registry():
+    registry = NamespaceRegistry()
+    registry.bulk_update(
+        [
+            new_namespace_quota("ns1", "abc", 10),
+            new_namespace_quota("ns2", "abc", 20),
+            new_namespace_quota("ns1", "def", 30),
+        ]
+    )
+
+    infos = registry.snapshot()
+    assert {name: info.weight for name, info in infos.items()} == {
+        "ns1": 30,
+        "ns2": 20,
+    }
+
+    registry.update(new_namespace_quota("ns2", "def", 5))
+    registry.delete(new_namespace_quota("ns1", "def", 0))
+    registry.delete(new_namespace_quota("unknown", "def", 0))
+    assert registry.dirty == {"ns1", "ns2"}
+
+    infos = registry.snapshot()
+    assert infos["ns1"].weight == 10 and infos["ns2"].weight == 20
+    assert not registry.dirty
+
+    registry.delete_namespace("ns2")
+    assert set(registry.snapshot()) == {"ns1"}
+
+
+def test_namespace_registry_reuses_clean_snapshots():
+    registry = NamespaceRegistry()
+    registry.bulk_update(
+        [new_namespace_quota(f"ns{i}", "abc", i) for i in range(1, 100)]
+    )
+    first = registry.snapshot()
+
+    registry.update(new_namespace_quota("ns1", "abc", 1000))
+    second = registry.snapshot()
+
+    assert second["ns1"].weight == 1000
+    assert first["ns1"].weight == 1
+    assert all(second[name] is first[name] for name in first if name != "ns1")
@@ -0,0 +1,123 @@
+from airport.api.scheduling import Queue
+from airport.kube.api import PodPhase
+from airport.kube.api import ResourceQuantity
+from airport.scheduler.api import JobInfo
+from airport.scheduler.api import PodGroup
+from airport.scheduler.api import QueueInfo
+from airport.scheduler.api import Resource
+from airport.scheduler.api import TaskInfo
+from airport.scheduler.api.enums import TaskStatus
+
+from .helper import build_pod
+
+
+def build_queue(name: str, weight: int, capability=None) -> Queue:
+    return Queue.parse_obj(
+        {
+            "metadata": {"name": name},
+            "spec": {"weight": weight, "capability": capability or {}},
+        }
+    )
+
+
+def test_queue_info_new():
+    queue_info = QueueInfo.new(build_queue("q1", 2, {"cpu": "4", "pods": "10"}))
+
+    assert queue_info.name == "q1" and queue_info.weight == 2
+    assert queue_info.capability == {"cpu": ResourceQuantity(4000)}
+
+
+def test_queue_info_jobs():
+    queue_info = QueueInfo.new(build_queue("q1", 1, {"cpu": "4"}))
+    pod1 = build_pod("c1", "p1", "n1", PodPhase.Running, {"cpu": "1", "memory": "1G"})
+    pod2 = build_pod("c1", "p2", "", PodPhase.Pending, {"cpu": "2", "memory": "2G"})
+    job = JobInfo.new("job1", TaskInfo.new(pod1), TaskInfo.new(pod2))
+
+    queue_info.add_job(job)
+    assert queue_info.allocated == Resource.new({"cpu": "1", "memory": "1G"})
+    assert queue_info.request == Resource.new({"cpu": "3", "memory": "3G"})
+    assert queue_info.remaining_capability() == {"cpu": ResourceQuantity(3000)}
+
+    assert queue_info.fits(Resource.new({"cpu": "3", "memory": "100G"}))
+    assert not queue_info.fits(Resource.new({"cpu": "3.5"}))
+
+    queue_info.delete_job(job)
+    queue_info.delete_job(job)
+    assert queue_info.allocated == Resource()
+    assert queue_info.request == Resource()
+
+
+def test_queue_info_task_transitions():
+    queue_info = QueueInfo.new(build_queue("q1", 1, {"cpu": "3"}))
+    job = JobInfo.new("job1")
+    queue_info.add_job(job)
+
+    pod1 = build_pod("c1", "p1", "", PodPhase.Pending, {"cpu": "1", "memory": "1G"})
+    pod2 = build_pod("c1", "p2", "", PodPhase.Pending, {"cpu": "2", "memory": "2G"})
+    task1, task2 = TaskInfo.new(pod1), TaskInfo.new(pod2)
+    queue_info.add_task(job, task1)
+    queue_info.add_task(job, task2)
+    assert queue_info.allocated == Resource()
+    assert not queue_info.overused()
+
+    queue_info.update_task_status(job, task1, TaskStatus.Allocated)
+    queue_info.update_task_status(job, task2, TaskStatus.Allocated)
+    assert queue_info.allocated == job.allocated
+    assert queue_info.overused()
+    assert queue_info.remaining_capability() == {"cpu": ResourceQuantity(0)}
+
+    queue_info.update_task_status(job, task1, TaskStatus.Running)
+    assert queue_info.allocated == job.allocated
+
+    queue_info.update_task_status(job, task2, TaskStatus.Releasing)
+    assert queue_info.allocated == Resource.new({"cpu": "1", "memory": "1G"})
+    assert not queue_info.overused()
+    assert queue_info.overused(Resource.new({"cpu": "1", "memory": "1G"}))
+
+    queue_info.delete_task(job, task1)
+    assert queue_info.allocated == Resource()
+    assert queue_info.request == job.total_request
+
+
+def build_pod_group(phase: str) -> PodGroup:
+    return PodGroup.parse_obj(
+        {
+            "metadata": {"name": "pg1"},
+            "spec": {"queue": "q1", "minResources": {"cpu": "2"}},
+            "status": {"phase": phase},
+        }
+    )
+
+
+def test_queue_info_inqueue():
+    queue_info = QueueInfo.new(build_queue("q1", 1))
+    job = JobInfo(uid="job1")
+    job.set_pod_group(build_pod_group("Pending"))
+    queue_info.add_job(job)
+    assert queue_info.inqueue == Resource()
+
+    old_job = job.copy()
+    job.set_pod_group(build_pod_group("Inqueue"))
+    queue_info.update_job_inqueue(job, old_job)
+    assert queue_info.inqueue == Resource.new({"cpu": "2"})
+
+    queue_info.delete_job(job)
+    assert queue_info.inqueue == Resource()
+
+
+def test_queue_info_update_new_task_status():
+    queue_info = QueueInfo.new(build_queue("q1", 1, {"cpu": "3"}))
+    job = JobInfo.new("job1")
+    queue_info.add_job(job)
+
+    # updating a task which is not in the job adds it, like for the job
+    pod = build_pod("c1", "p1", "", PodPhase.Pending, {"cpu": "1", "memory": "1G"})
+    task = TaskInfo.new(pod)
+    task.status = TaskStatus.Allocated
+    queue_info.update_task_status(job, task, TaskStatus.Allocated)
+    assert queue_info.request == job.total_request
+    assert queue_info.allocated == job.allocated
+
+    queue_info.delete_task(job, task)
+    assert queue_info.request == Resource()
+    assert queue_info.allocated == Resource()
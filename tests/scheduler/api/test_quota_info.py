@@ -0,0 +1,146 @@
+import pytest
+
+from airport.kube.api import PodPhase
+from airport.kube.api import ResourceQuantity
+from airport.kube.api import ResourceQuota
+from airport.scheduler.api import QuotaAdmission
+from airport.scheduler.api import TaskInfo
+from airport.scheduler.api.quota_info import InvalidScopeSelector
+from airport.scheduler.api.quota_info import PodScope
+from airport.scheduler.api.quota_info import compile_scope_selector
+from airport.scheduler.api.quota_info import pod_scope
+from airport.scheduler.api.quota_info import task_quota_usage
+
+from .helper import build_pod
+
+
+def build_quota(name: str, hard, scopes=None, scope_selector=None) -> ResourceQuota:
+    spec = {"hard": hard, "scopes": scopes or []}
+    if scope_selector is not None:
+        spec["scopeSelector"] = {"matchExpressions": scope_selector}
+    return ResourceQuota.parse_obj(
+        {"metadata": {"name": name, "namespace": "c1"}, "spec": spec}
+    )
+
+
+def build_task(name: str, req, priority_class: str = "", deadline=None) -> TaskInfo:
+    pod = build_pod("c1", name, "", PodPhase.Pending, req)
+    pod.spec.priorityClassName = priority_class
+    pod.spec.activeDeadlineSeconds = deadline
+    return TaskInfo.new(pod)
+
+
+def test_task_quota_usage():
+    task = build_task("p1", {"cpu": "500m", "memory": "1Gi", "nvidia.com/gpu": "1"})
+    task.pod.spec.containers[0].resources.limits = {"cpu": "1"}
+
+    assert task_quota_usage(task) == {
+        "pods": 1,
+        "requests.cpu": ResourceQuantity("0.5"),
+        "requests.memory": ResourceQuantity("1Gi"),
+        "requests.nvidia.com/gpu": 1,
+        "limits.cpu": 1,
+    }
+
+
+def test_compile_scope_selector():
+    high = pod_scope(build_task("p1", {"cpu": "1"}, priority_class="high").pod)
+    best_effort = pod_scope(build_task("p2", {}, deadline=10).pod)
+
+    def matches(quota: ResourceQuota):
+        predicate = compile_scope_selector(quota.spec)
+        return [predicate(high), predicate(best_effort)]
+
+    assert matches(build_quota("q", {})) == [True, True]
+    assert matches(build_quota("q", {}, scopes=["BestEffort"])) == [False, True]
+    assert matches(
+        build_quota("q", {}, scopes=["NotBestEffort", "NotTerminating"])
+    ) == [True, False]
+    assert matches(
+        build_quota(
+            "q",
+            {},
+            scope_selector=[
+                {"scopeName": "PriorityClass", "operator": "In", "values": ["high"]}
+            ],
+        )
+    ) == [True, False]
+    assert matches(
+        build_quota(
+            "q",
+            {},
+            scopes=["Terminating"],
+            scope_selector=[{"scopeName": "PriorityClass", "operator": "DoesNotExist"}],
+        )
+    ) == [False, True]
+
+    with pytest.raises(InvalidScopeSelector):
+        compile_scope_selector(
+            build_quota(
+                "q",
+                {},
+                scope_selector=[
+                    {"scopeName": "BestEffort", "operator": "In", "values": ["x"]}
+                ],
+            ).spec
+        )
+
+
+def test_quota_admission():
+    admission = QuotaAdmission()
+    admission.set_quota(build_quota("compute", {"cpu": "2", "pods": "3"}))
+    task1 = build_task("p1", {"cpu": "1"})
+    task2 = build_task("p2", {"cpu": "1"})
+    task3 = build_task("p3", {"cpu": "500m"})
+
+    assert admission.fits(task1)
+    admission.allocate(task1)
+    admission.allocate(task1)
+    admission.allocate(task2)
+    assert not admission.fits(task3)
+
+    admission.release(task2)
+    admission.release(task2)
+    assert admission.fits(task3)
+
+    admission.delete_quota(build_quota("compute", {}))
+    assert admission.fits(build_task("p4", {"cpu": "10"}))
+
+
+def test_quota_admission_scoped():
+    admission = QuotaAdmission()
+    admission.allocate(build_task("p1", {"cpu": "1"}, priority_class="high"))
+    admission.allocate(build_task("p2", {"cpu": "1"}))
+
+    # the usage of a new quota is counted from the allocated tasks
+    admission.set_quota(
+        build_quota(
+            "high",
+            {"requests.cpu": "2"},
+            scope_selector=[
+                {"scopeName": "PriorityClass", "operator": "In", "values": ["high"]}
+            ],
+        )
+    )
+    assert admission.namespaces["c1"].trackers["high"].used == {"requests.cpu": 1}
+
+    assert admission.fits(build_task("p3", {"cpu": "1"}, priority_class="high"))
+    assert not admission.fits(build_task("p3", {"cpu": "2"}, priority_class="high"))
+    assert admission.fits(build_task("p3", {"cpu": "2"}))
+
+
+def test_quota_admission_keeps_no_pod():
+    admission = QuotaAdmission()
+    admission.set_quota(build_quota("compute", {"cpu": "2"}, scopes=["Terminating"]))
+    task = build_task("p1", {"cpu": "2"}, deadline=10)
+    admission.allocate(task)
+
+    task_usage = admission.namespaces["c1"].tasks[task.uid]
+    assert task_usage.scope == PodScope(
+        priority_class="", terminating=True, best_effort=False
+    )
+
+    # the scopes are not read from the pod again, which may be compacted
+    task.compact()
+    admission.release(task)
+    assert admission.namespaces["c1"].trackers["compute"].used == {"requests.cpu": 0}
@@ -0,0 +1,220 @@
+import pickle
+import zlib
+
+import pytest
+
+from airport.kube.api import Container
+from airport.kube.api import PodPhase
+from airport.scheduler.api import JobInfo
+from airport.scheduler.api import NodeInfo
+from airport.scheduler.api import PodSpecStore
+from airport.scheduler.api import QueueInfo
+from airport.scheduler.api import TaskInfo
+from airport.scheduler.api.enums import TaskStatus
+from airport.scheduler.cache import SchedulerCache
+
+from .helper import build_node
+from .helper import build_pod
+from .test_queue_info import build_queue
+
+
+def test_intern_shares_template():
+    store = PodSpecStore()
+    pod1 = build_pod("c1", "p1", "n1", PodPhase.Running, {"cpu": "1", "memory": "1G"})
+    pod2 = build_pod("c1", "p2", "n2", PodPhase.Running, {"cpu": "1", "memory": "1G"})
+
+    spec1 = store.intern(pod1.spec, "c1/p1")
+    spec2 = store.intern(pod2.spec, "c1/p2")
+
+    assert len(store) == 1
+    assert spec1 == pod1.spec and spec2 == pod2.spec
+    assert spec1 is not spec2
+    assert spec1.containers is spec2.containers
+    assert spec1.nodeName == "n1" and spec2.nodeName == "n2"
+    assert store.is_shared("c1/p1")
+
+
+def test_intern_different_template():
+    store = PodSpecStore()
+    pod1 = build_pod("c1", "p1", "n1", PodPhase.Running, {"cpu": "1", "memory": "1G"})
+    pod2 = build_pod("c1", "p2", "n1", PodPhase.Running, {"cpu": "2", "memory": "1G"})
+
+    spec1 = store.intern(pod1.spec, "c1/p1")
+    spec2 = store.intern(pod2.spec, "c1/p2")
+
+    assert len(store) == 2
+    assert spec1.containers is not spec2.containers
+
+    # interning the pod again replaces its reference
+    store.intern(pod2.spec, "c1/p1")
+    assert len(store) == 1
+
+
+def test_shared_spec_is_read_only():
+    store = PodSpecStore()
+    pod1 = build_pod("c1", "p1", "n1", PodPhase.Running, {"cpu": "1", "memory": "1G"})
+    pod2 = build_pod("c1", "p2", "n2", PodPhase.Running, {"cpu": "1", "memory": "1G"})
+
+    spec1 = store.intern(pod1.spec, "c1/p1")
+    spec2 = store.intern(pod2.spec, "c1/p2")
+
+    with pytest.raises(TypeError):
+        spec1.containers[0].image = "busybox"
+    with pytest.raises(TypeError):
+        spec1.containers.append(Container())
+    with pytest.raises(TypeError):
+        spec1.containers[0].resources.requests["cpu"] = "2"
+    assert spec2.containers[0].image == ""
+    assert len(spec2.containers) == 1
+
+    # the top-level fields are private to the pod
+    spec1.nodeName = "n3"
+    assert spec2.nodeName == "n2"
+
+
+def test_release():
+    store = PodSpecStore()
+    pod1 = build_pod("c1", "p1", "n1", PodPhase.Running, {"cpu": "1", "memory": "1G"})
+    pod2 = build_pod("c1", "p2", "n2", PodPhase.Running, {"cpu": "1", "memory": "1G"})
+
+    spec1 = store.intern(pod1.spec, "c1/p1")
+    store.intern(pod2.spec, "c1/p2")
+
+    # the digest is the one of the interned spec, whatever happened since
+    spec1.schedulerName = "other"
+    store.release("c1/p1")
+    assert len(store) == 1
+    assert not store.is_shared("c1/p1")
+
+    store.release("c1/p2")
+    assert len(store) == 0
+
+    # releasing an unknown pod is ignored
+    store.release("c1/p2")
+
+
+def test_detach():
+    store = PodSpecStore()
+    pod1 = build_pod("c1", "p1", "n1", PodPhase.Running, {"cpu": "1", "memory": "1G"})
+    pod2 = build_pod("c1", "p2", "n2", PodPhase.Running, {"cpu": "1", "memory": "1G"})
+
+    spec1 = store.intern(pod1.spec, "c1/p1")
+    spec2 = store.intern(pod2.spec, "c1/p2")
+
+    private = store.detach("c1/p1", spec1)
+    assert private == spec1
+    assert private.containers is not spec2.containers
+    assert not store.is_shared("c1/p1")
+
+    private.containers[0].image = "busybox"
+    private.containers.append(Container())
+    assert spec2.containers[0].image == ""
+    assert len(spec2.containers) == 1
+
+
+def test_task_info_with_spec_store():
+    store = PodSpecStore()
+    pod1 = build_pod("c1", "p1", "n1", PodPhase.Running, {"cpu": "1", "memory": "1G"})
+    pod2 = build_pod("c1", "p2", "n1", PodPhase.Running, {"cpu": "1", "memory": "1G"})
+
+    task1 = TaskInfo.new(pod1, spec_store=store)
+    task2 = TaskInfo.new(pod2, spec_store=store)
+
+    assert task1 == TaskInfo.new(pod1)
+    assert task1.pod.spec.containers is task2.pod.spec.containers
+
+    node_info = NodeInfo.new(build_node("n1", {"cpu": "8", "memory": "10G"}))
+    node_info.add_task(task1)
+    node_info.add_task(task2)
+
+    node_task = node_info.tasks["c1/p1"]
+    assert node_task.pod.spec.containers is task1.pod.spec.containers
+    assert node_task.pod.metadata is not task1.pod.metadata
+
+    pod = task1.detach_spec()
+    pod.spec.containers[0].image = "busybox"
+    assert task2.pod.spec.containers[0].image == ""
+    assert node_task.pod.spec.containers[0].image == ""
+    assert len(store) == 1
+
+
+def test_node_info_copies_private_spec():
+    pod = build_pod("c1", "p1", "n1", PodPhase.Running, {"cpu": "1", "memory": "1G"})
+    task = TaskInfo.new(pod)
+
+    node_info = NodeInfo.new(build_node("n1", {"cpu": "8", "memory": "10G"}))
+    node_info.add_task(task)
+
+    task.pod.spec.containers[0].image = "busybox"
+    assert node_info.tasks["c1/p1"].pod.spec.containers[0].image == ""
+
+
+def test_job_info_releases_spec():
+    store = PodSpecStore()
+    pod1 = build_pod("c1", "p1", "n1", PodPhase.Running, {"cpu": "1", "memory": "1G"})
+    pod2 = build_pod("c1", "p2", "n1", PodPhase.Running, {"cpu": "1", "memory": "1G"})
+
+    task1 = TaskInfo.new(pod1, spec_store=store)
+    task2 = TaskInfo.new(pod2, spec_store=store)
+    job = JobInfo.new("job1", task1, task2)
+
+    job.update_task_status(task1, TaskStatus.Releasing)
+    assert store.is_shared("c1/p1")
+
+    job.delete_task_info(task1)
+    assert not store.is_shared("c1/p1")
+    assert len(store) == 1
+
+    job.release_specs()
+    assert len(store) == 0
+
+
+def test_cache_releases_specs_of_deleted_job():
+    store = PodSpecStore()
+    pod = build_pod("c1", "p1", "n1", PodPhase.Failed, {"cpu": "1", "memory": "1G"})
+    job = JobInfo.new("job1", TaskInfo.new(pod, spec_store=store))
+    cache = SchedulerCache()
+    cache.add_job(job)
+
+    # moving the job to another queue keeps its specs
+    q1 = QueueInfo.new(build_queue("q1", 1))
+    q2 = QueueInfo.new(build_queue("q2", 1))
+    q1.add_job(job)
+    q1.delete_job(job)
+    q2.add_job(job)
+    assert len(store) == 1
+
+    assert job.compact() == 1
+    assert job.rehydrate_task(pod.metadata.uid) == pod
+
+    cache.delete_job(job)
+    assert len(store) == 0
+    assert cache.jobs == {}
+
+
+def test_compact_interned_task():
+    store = PodSpecStore()
+    pod1 = build_pod("c1", "p1", "n1", PodPhase.Failed, {"cpu": "1", "memory": "1G"})
+    pod2 = build_pod("c1", "p2", "n1", PodPhase.Running, {"cpu": "1", "memory": "1G"})
+
+    task1 = TaskInfo.new(pod1, spec_store=store)
+    task2 = TaskInfo.new(pod2, spec_store=store)
+    node_info = NodeInfo.new(build_node("n1", {"cpu": "8", "memory": "10G"}))
+    node_info.add_task(task1)
+
+    job = JobInfo.new("job1", task1, task2)
+    assert job.compact() == 1
+    node_info.compact_task(task1)
+
+    # the blob keeps the digest of the spec, not the spec
+    node_task = node_info.tasks["c1/p1"]
+    assert node_task.compacted and node_task.pod_blob is task1.pod_blob
+    assert not node_task.pod.spec.containers
+    digest, data = pickle.loads(zlib.decompress(task1.pod_blob))
+    assert digest == store.lookup("c1/p1")
+    assert data["spec"] == {"nodeName": "n1", "hostname": "", "subdomain": ""}
+
+    assert job.rehydrate_task("c1/p1") == pod1
+    assert task1.pod.spec.containers is task2.pod.spec.containers
+    assert node_task.rehydrate() == pod1
+    assert node_task.pod.spec.containers is task1.pod.spec.containers
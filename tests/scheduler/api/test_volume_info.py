@@ -0,0 +1,181 @@
+from typing import List
+
+from airport.kube.api import Node
+from airport.kube.api import Pod
+from airport.kube.api import PodPhase
+from airport.kube.api import Volume
+from airport.scheduler.api import NodeInfo
+from airport.scheduler.api import TaskInfo
+from airport.scheduler.api import VolumeInfo
+from airport.scheduler.api.volume_info import NotAttachable
+from airport.scheduler.api.volume_info import attached_volumes
+from airport.scheduler.api.volume_info import pod_volumes
+from airport.scheduler.api.volume_info import volume_driver
+from airport.scheduler.api.volume_info import volume_limits
+
+from .helper import build_node
+from .helper import build_pod
+
+
+def with_volumes(pod: Pod, *volumes: dict) -> Pod:
+    pod.spec.volumes = [Volume.parse_obj(volume) for volume in volumes]
+    return pod
+
+
+def claim(name: str) -> dict:
+    return {"name": name, "persistentVolumeClaim": {"claimName": name}}
+
+
+def csi(name: str, driver: str = "ebs") -> dict:
+    return {"name": name, "csi": {"driver": driver}}
+
+
+def build_attached_node(
+    driver: str, limit: int, attached: List[str], in_use: List[str] = None
+) -> Node:
+    prefix = f"kubernetes.io/csi/{driver}^"
+    alloc = {"cpu": "4", "memory": "8G", f"attachable-volumes-csi-{driver}": str(limit)}
+    return Node.parse_obj(
+        {
+            "metadata": {"name": "n1"},
+            "status": {
+                "capacity": alloc,
+                "allocatable": alloc,
+                "volumesAttached": [
+                    {"name": prefix + name, "devicePath": ""} for name in attached
+                ],
+                "volumesInUse": [prefix + name for name in in_use or []],
+            },
+        }
+    )
+
+
+def test_pod_volumes():
+    pod = build_pod("c1", "p1", "", PodPhase.Pending, {})
+    pod = with_volumes(pod, claim("data"), csi("scratch"), {"name": "tmp"})
+
+    volumes = pod_volumes(pod)
+    assert volumes.claims == ["c1/data"]
+    assert volumes.attachable == [("ebs", "c1/p1/scratch")]
+    assert volumes.unresolved == ["c1/data"]
+
+    volumes = pod_volumes(pod, {"c1/data": ("ebs", "vol-1")}.get)
+    assert volumes.claims == ["c1/data"]
+    assert volumes.attachable == [("ebs", "vol-1"), ("ebs", "c1/p1/scratch")]
+    assert volumes.unresolved == []
+
+
+def test_volume_limits():
+    allocatable = {
+        "cpu": "4",
+        "attachable-volumes-aws-ebs": "39",
+        "attachable-volumes-csi-ebs": "25",
+    }
+    assert volume_limits(allocatable) == {"aws-ebs": 39, "ebs": 25}
+
+
+def test_attached_volumes():
+    assert volume_driver("kubernetes.io/csi/ebs.csi.aws.com^vol-1") == "ebs.csi.aws.com"
+    assert volume_driver("kubernetes.io/aws-ebs/aws://us-east-1a/vol-2") == "aws-ebs"
+    assert volume_driver("kubernetes.io/csi/ebs.csi.aws.com") is None
+    assert volume_driver("vol-3") is None
+
+    node = build_attached_node(
+        "ebs.csi.aws.com", 2, ["vol-1", "vol-2"], in_use=["vol-1", "vol-3"]
+    )
+    assert attached_volumes(node.status) == {
+        "ebs.csi.aws.com": {
+            "kubernetes.io/csi/ebs.csi.aws.com^vol-1",
+            "kubernetes.io/csi/ebs.csi.aws.com^vol-2",
+            "kubernetes.io/csi/ebs.csi.aws.com^vol-3",
+        }
+    }
+
+
+def test_node_info_volumes():
+    node = build_node(
+        "n1", {"cpu": "4", "memory": "8G", "attachable-volumes-csi-ebs": "3"}
+    )
+    node_info = NodeInfo.new(node)
+    assert node_info.volumes.limits == {"ebs": 3}
+
+    pod1 = with_volumes(
+        build_pod("c1", "p1", "n1", PodPhase.Running, {"cpu": "1"}),
+        claim("data"),
+        csi("scratch"),
+    )
+    pod2 = with_volumes(
+        build_pod("c1", "p2", "n1", PodPhase.Running, {"cpu": "1"}), claim("data")
+    )
+    task1, task2 = TaskInfo.new(pod1), TaskInfo.new(pod2)
+    node_info.add_task(task1)
+    node_info.add_task(task2)
+
+    assert node_info.volumes.claims == {"c1/data": 2}
+    assert node_info.volumes.uses_claim("c1/data")
+    # the unresolved claim may be of any driver
+    assert node_info.volumes.count("ebs") == 2
+
+    pod3 = build_pod("c1", "p3", "n1", PodPhase.Pending, {})
+    assert node_info.volumes.fits(pod_volumes(with_volumes(pod3, csi("a"))))
+    assert not node_info.volumes.fits(
+        pod_volumes(with_volumes(pod3, csi("a"), csi("b")))
+    )
+    assert node_info.volumes.fits(pod_volumes(with_volumes(pod3, csi("a", "nfs"))))
+
+    node_info.remove_task(task1)
+    assert node_info.volumes.claims == {"c1/data": 1}
+    assert node_info.volumes.count("ebs") == 1
+
+    node_info.remove_task(task2)
+    assert node_info.volumes == VolumeInfo(limits={"ebs": 3})
+
+
+def test_node_info_volumes_at_limit():
+    driver = "ebs.csi.aws.com"
+    node_info = NodeInfo.new(build_attached_node(driver, 2, ["vol-1", "vol-2"]))
+    assert node_info.volumes.count(driver) == 2
+
+    pod = with_volumes(
+        build_pod("c1", "p1", "", PodPhase.Pending, {"cpu": "1"}), claim("data")
+    )
+
+    # the volume of the claim is unknown, it may need one more attachment
+    assert not node_info.volumes.fits(pod_volumes(pod))
+
+    # the claim is bound to a volume the node has already attached
+    attached = {"c1/data": (driver, f"kubernetes.io/csi/{driver}^vol-1")}
+    assert node_info.volumes.fits(pod_volumes(pod, attached.get))
+
+    detached = {"c1/data": (driver, f"kubernetes.io/csi/{driver}^vol-3")}
+    assert not node_info.volumes.fits(pod_volumes(pod, detached.get))
+
+    # a claim already used by a task of the node is free
+    node_info.volumes.limits[driver] = 3
+    node_info.add_task(TaskInfo.new(pod))
+    assert node_info.volumes.count(driver) == 2
+    assert node_info.volumes.fits(pod_volumes(pod))
+
+
+def test_node_info_volumes_running_claim():
+    node_info = NodeInfo.new(build_attached_node("ebs", 2, ["vol-1"]))
+    pod = with_volumes(
+        build_pod("c1", "p1", "n1", PodPhase.Running, {"cpu": "1"}), claim("data")
+    )
+
+    # the volume of the claim of the running pod is the one the node reports
+    node_info.add_task(TaskInfo.new(pod))
+    assert node_info.volumes.count("ebs") == 1
+
+    pod2 = build_pod("c1", "p2", "", PodPhase.Pending, {})
+    assert node_info.volumes.fits(pod_volumes(with_volumes(pod2, csi("a"))))
+    assert not node_info.volumes.fits(
+        pod_volumes(with_volumes(pod2, csi("a"), csi("b")))
+    )
+
+    # a claim bound to a volume which is not attachable is not counted
+    node_info = NodeInfo.new(build_attached_node("ebs", 1, []))
+    node_info.add_task(TaskInfo.new(pod), {"c1/data": NotAttachable}.get)
+    assert node_info.volumes.claims == {"c1/data": 1}
+    assert node_info.volumes.count("ebs") == 0
+    assert node_info.volumes.fits(pod_volumes(with_volumes(pod2, csi("a"))))
@@ -0,0 +1,133 @@
+from airport.kube.api import ContainerPort
+from airport.kube.api import Node
+from airport.kube.api import NodeSelector
+from airport.kube.api import PodPhase
+from airport.kube.api import Toleration
+from airport.kube.api import Volume
+from airport.scheduler.api import TaskInfo
+from airport.scheduler.cache import SchedulerCache
+from tests.scheduler.api.helper import build_pod
+
+
+def build_node(name: str, labels, taints=()) -> Node:
+    alloc = {"cpu": "4", "memory": "8Gi"}
+    return Node.parse_obj(
+        {
+            "metadata": {"name": name, "labels": labels},
+            "spec": {"taint": list(taints)},
+            "status": {"capacity": alloc, "allocatable": alloc},
+        }
+    )
+
+
+def test_scheduler_cache_nodes():
+    cache = SchedulerCache()
+    cache.add_node(build_node("n1", {"zone": "a"}))
+    cache.add_node(build_node("n2", {"zone": "b"}))
+    cache.add_node(build_node("n3", {"zone": "a", "gpu": "true"}))
+
+    names = [node.name for node in cache.select_nodes({"zone": "a"})]
+    assert sorted(names) == ["n1", "n3"]
+
+    required = NodeSelector.parse_obj(
+        {
+            "nodeSelectorTerms": [
+                {"matchExpressions": [{"key": "gpu", "operator": "DoesNotExist"}]}
+            ]
+        }
+    )
+    names = [node.name for node in cache.select_nodes({"zone": "a"}, required)]
+    assert names == ["n1"]
+
+    cache.update_node(build_node("n1", {"zone": "b"}))
+    assert [node.name for node in cache.select_nodes({"zone": "a"})] == ["n3"]
+    assert cache.nodes["n1"].node.metadata.labels == {"zone": "b"}
+
+    cache.delete_node(build_node("n3", {}))
+    assert cache.select_nodes({"zone": "a"}) == []
+    assert len(cache.select_nodes()) == 2
+
+
+def test_scheduler_cache_taints():
+    cache = SchedulerCache()
+    cache.add_node(build_node("n1", {"zone": "a"}))
+    cache.add_node(
+        build_node("n2", {"zone": "a"}, [{"key": "gpu", "effect": "NoSchedule"}])
+    )
+
+    names = [node.name for node in cache.select_nodes({"zone": "a"}, None, [])]
+    assert names == ["n1"]
+
+    toleration = Toleration(key="gpu", operator="Exists", effect="NoSchedule")
+    names = [node.name for node in cache.select_nodes(tolerations=[toleration])]
+    assert names == ["n1", "n2"]
+
+    cache.delete_node(build_node("n1", {}))
+    cache.add_node(build_node("n3", {"zone": "b"}))
+    assert [node.name for node in cache.select_nodes(tolerations=[])] == ["n3"]
+
+
+def test_scheduler_cache_node_labels():
+    cache = SchedulerCache()
+    cache.add_node(build_node("n1", {"zone": "a"}))
+    pod = build_pod("ns", "web", "n1", PodPhase.Running, {"cpu": "1"})
+    cache.add_task(TaskInfo.new(pod))
+
+    # the indices read the labels of the cache, they keep no copy of them
+    assert cache.node_labels == {"n1": {"zone": "a"}}
+    assert cache.pod_affinity.node_labels is cache.node_labels
+    assert cache.topology_spread.node_labels is cache.node_labels
+    assert cache.label_index.node_labels is cache.node_labels
+    assert cache.pod_affinity.domain("n1", "zone") == "a"
+
+    cache.update_node(build_node("n1", {"zone": "b"}))
+    assert [node.name for node in cache.select_nodes({"zone": "b"})] == ["n1"]
+    assert cache.select_nodes({"zone": "a"}) == []
+    assert cache.pod_affinity.domain("n1", "zone") == "b"
+    assert cache.pod_affinity.pods["ns/web"].node == "n1"
+
+    cache.delete_node(build_node("n1", {}))
+    assert cache.node_labels == {}
+    assert cache.pod_affinity.pods == {}
+    assert cache.label_index.values == {}
+    assert cache.node_ids.get("n1") is None
+
+
+def test_scheduler_cache_host_ports():
+    cache = SchedulerCache()
+    for name in ["n1", "n2", "n3"]:
+        cache.add_node(build_node(name, {}))
+
+    pod = build_pod("ns", "web", "n1", PodPhase.Running, {"cpu": "1"})
+    pod.spec.containers[0].ports = [ContainerPort(hostPort=80)]
+    task = TaskInfo.new(pod)
+    cache.add_task(task)
+    other = build_pod("ns", "db", "n2", PodPhase.Running, {"cpu": "1"})
+    other.spec.containers[0].ports = [ContainerPort(hostPort=80, hostIP="10.0.0.1")]
+    cache.add_task(TaskInfo.new(other))
+
+    assert cache.host_ports.using("TCP", 80) == {"n1", "n2"}
+    assert cache.conflicting_nodes([("TCP", "0.0.0.0", 80)]) == {"n1", "n2"}
+    assert cache.conflicting_nodes([("TCP", "10.0.0.2", 80)]) == {"n1"}
+
+    nodes = cache.select_nodes(host_ports=[("TCP", "10.0.0.2", 80)])
+    assert [node.name for node in nodes] == ["n2", "n3"]
+
+    cache.remove_task(task)
+    cache.delete_node(build_node("n2", {}))
+    assert cache.host_ports.nodes == {}
+
+
+def test_scheduler_cache_resolves_claims():
+    volume = ("ebs", "kubernetes.io/csi/ebs^vol-1")
+    cache = SchedulerCache(resolve_claim={"ns/data": volume}.get)
+    cache.add_node(build_node("n1", {}))
+
+    pod = build_pod("ns", "db", "n1", PodPhase.Running, {"cpu": "1"})
+    claim = {"name": "data", "persistentVolumeClaim": {"claimName": "data"}}
+    pod.spec.volumes = [Volume.parse_obj(claim)]
+    cache.add_task(TaskInfo.new(pod))
+
+    volumes = cache.nodes["n1"].volumes
+    assert volumes.unresolved == {}
+    assert volumes.uses(*volume)
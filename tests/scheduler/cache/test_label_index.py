@@ -0,0 +1,73 @@
+import pytest
+
+from airport.kube.api import NodeSelector
+from airport.kube.api import NodeSelectorRequirement
+from airport.kube.api import NodeSelectorTerm
+from airport.scheduler.cache import LabelIndex
+
+
+parametrize = pytest.mark.parametrize
+
+
+@pytest.fixture
+def index() -> LabelIndex:
+    index = LabelIndex()
+    index.set_node("n1", {"zone": "a", "gpu": "true", "cores": "8"})
+    index.set_node("n2", {"zone": "b", "cores": "32"})
+    index.set_node("n3", {"zone": "a", "cores": "x"})
+    index.set_node("n4", {})
+    return index
+
+
+def requirement(key: str, operator: str, *values: str) -> NodeSelectorRequirement:
+    return NodeSelectorRequirement(key=key, operator=operator, values=list(values))
+
+
+@parametrize(
+    "req, expected",
+    [
+        (requirement("zone", "In", "a", "c"), ["n1", "n3"]),
+        (requirement("zone", "NotIN", "a"), ["n2", "n4"]),
+        (requirement("gpu", "Exists"), ["n1"]),
+        (requirement("gpu", "DoesNotExist"), ["n2", "n3", "n4"]),
+        (requirement("cores", "Gt", "8"), ["n2"]),
+        (requirement("cores", "Lt", "10"), ["n1"]),
+        (requirement("cores", "Gt", "8", "9"), []),
+        (requirement("unknown", "In", "a"), []),
+    ],
+)
+def test_label_index_lookup(index: LabelIndex, req, expected):
+    assert sorted(index.nodes(index.lookup(req))) == expected
+
+
+def test_label_index_match(index: LabelIndex):
+    term = NodeSelectorTerm(
+        matchExpressions=[requirement("zone", "In", "a"), requirement("gpu", "Exists")]
+    )
+    assert index.nodes(index.match_term(term)) == ["n1"]
+    assert index.match_term(NodeSelectorTerm()) == 0
+
+    fields = NodeSelectorTerm(matchFields=[requirement("metadata.name", "In", "n4")])
+    selector = NodeSelector(nodeSelectorTerms=[term, fields])
+    assert sorted(index.nodes(index.match_node_selector(selector))) == ["n1", "n4"]
+
+    assert sorted(index.nodes(index.match_labels({"zone": "a"}))) == ["n1", "n3"]
+    assert index.match_labels({"zone": "a", "cores": "32"}) == 0
+    assert len(index.nodes(index.match_labels({}))) == 4
+
+
+def test_label_index_update_and_remove(index: LabelIndex):
+    index.set_node("n1", {"zone": "b"})
+    assert sorted(index.nodes(index.match_labels({"zone": "b"}))) == ["n1", "n2"]
+    assert index.lookup(requirement("gpu", "Exists")) == 0
+    assert "gpu" not in index.values
+
+    index.remove_node("n2")
+    index.remove_node("unknown")
+    assert index.nodes(index.match_labels({"zone": "b"})) == ["n1"]
+    assert len(index.ids) == 3
+
+    # the id of a removed node is reused without stale bits
+    index.set_node("n5", {"zone": "c"})
+    assert index.nodes(index.match_labels({"zone": "b"})) == ["n1"]
+    assert index.nodes(index.match_labels({"zone": "c"})) == ["n5"]
@@ -0,0 +1,136 @@
+from typing import Dict
+
+import pytest
+
+from airport.kube.api import Pod
+from airport.kube.api import PodPhase
+from airport.scheduler.api import TaskInfo
+from airport.scheduler.cache import PodAffinityIndex
+from airport.scheduler.cache import SchedulerCache
+from tests.scheduler.api.helper import build_node
+from tests.scheduler.api.helper import build_pod
+
+
+def term(app: str, topology_key: str = "zone") -> dict:
+    return {
+        "labelSelector": {"matchLabels": {"app": app}},
+        "topologyKey": topology_key,
+    }
+
+
+def make_pod(name: str, labels: Dict[str, str], **affinity) -> Pod:
+    return Pod.parse_obj(
+        {
+            "metadata": {"name": name, "namespace": "ns", "labels": labels},
+            "spec": {"affinity": affinity},
+        }
+    )
+
+
+@pytest.fixture
+def index() -> PodAffinityIndex:
+    index = PodAffinityIndex()
+    index.set_node("n1", {"zone": "a"})
+    index.set_node("n2", {"zone": "a"})
+    index.set_node("n3", {"zone": "b"})
+    index.set_node("n4", {})
+    return index
+
+
+def test_pod_affinity(index: PodAffinityIndex):
+    web = make_pod(
+        "web",
+        {"app": "web"},
+        podAffinity={"requiredDuringSchedulingIgnoredDuringExecution": [term("db")]},
+    )
+
+    # no db pod anywhere and web does not match its own term
+    assert not index.satisfies_affinity(web, "n1")
+
+    index.add_pod(make_pod("db-0", {"app": "db"}), "n1")
+    assert index.satisfies_affinity(web, "n1")
+    assert index.satisfies_affinity(web, "n2")
+    assert not index.satisfies_affinity(web, "n3")
+    assert not index.satisfies_affinity(web, "n4")
+
+    # the db pod moves to zone b with its node
+    index.set_node("n1", {"zone": "b"})
+    assert not index.satisfies_affinity(web, "n2")
+    assert index.satisfies_affinity(web, "n3")
+
+    index.remove_pod(make_pod("db-0", {}))
+    assert not index.satisfies_affinity(web, "n3")
+    assert all(not counts for counts in index.counters.values())
+
+
+def test_pod_affinity_first_of_group(index: PodAffinityIndex):
+    required = {"requiredDuringSchedulingIgnoredDuringExecution": [term("web")]}
+    assert index.satisfies_affinity(
+        make_pod("web-0", {"app": "web"}, podAffinity=required), "n3"
+    )
+
+    index.add_pod(make_pod("web-0", {"app": "web"}, podAffinity=required), "n3")
+    assert not index.satisfies_affinity(
+        make_pod("web-1", {"app": "web"}, podAffinity=required), "n1"
+    )
+
+
+def test_pod_anti_affinity(index: PodAffinityIndex):
+    anti = {"requiredDuringSchedulingIgnoredDuringExecution": [term("web")]}
+    index.add_pod(make_pod("web-0", {"app": "web"}, podAntiAffinity=anti), "n1")
+
+    web = make_pod("web-1", {"app": "web"}, podAntiAffinity=anti)
+    assert not index.satisfies_anti_affinity(web, "n2")
+    assert index.satisfies_anti_affinity(web, "n3")
+
+    # symmetric: the placed pod repels matching pods without anti-affinity
+    assert not index.satisfies_anti_affinity(make_pod("other", {"app": "web"}), "n2")
+    assert index.satisfies_anti_affinity(make_pod("db", {"app": "db"}), "n2")
+
+    index.remove_node("n1")
+    assert index.satisfies_anti_affinity(web, "n2")
+    assert index.anti_affinity == {}
+
+
+def test_pod_affinity_score(index: PodAffinityIndex):
+    for name, node in [("db-0", "n1"), ("db-1", "n2"), ("db-2", "n3")]:
+        index.add_pod(make_pod(name, {"app": "db"}), node)
+
+    pod = make_pod(
+        "web",
+        {"app": "web"},
+        podAffinity={
+            "preferredDuringSchedulingIgnoredDuringExecution": [
+                {"weight": 10, "podAffinityTerm": term("db")}
+            ]
+        },
+        podAntiAffinity={
+            "preferredDuringSchedulingIgnoredDuringExecution": [
+                {"weight": 3, "podAffinityTerm": term("db", "kubernetes.io/hostname")}
+            ]
+        },
+    )
+    assert index.score(pod, "n1") == 20
+    assert index.score(pod, "n3") == 10
+    assert index.score(pod, "n4") == 0
+
+
+def test_scheduler_cache_pod_affinity():
+    cache = SchedulerCache()
+    cache.add_node(build_node("n1", {"cpu": "4", "memory": "8Gi"}))
+    pod = build_pod(
+        "ns", "db", "n1", PodPhase.Running, {"cpu": "1"}, labels={"app": "db"}
+    )
+    task = TaskInfo.new(pod)
+
+    cache.add_task(task)
+    assert set(cache.pod_affinity.pods) == {"ns/db"}
+    assert cache.nodes["n1"].used.milli_cpu == 1000
+
+    cache.remove_task(task)
+    assert cache.pod_affinity.pods == {}
+
+    # a task on a node which is not known yet
+    cache.add_task(TaskInfo.new(build_pod("ns", "db", "n2", PodPhase.Running, {})))
+    assert cache.nodes["n2"].name == "n2"
+    assert cache.pod_affinity.pods["ns/db"].node == "n2"
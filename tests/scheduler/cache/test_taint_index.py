@@ -0,0 +1,69 @@
+import pytest
+
+from airport.kube.api import Taint
+from airport.kube.api import Toleration
+from airport.scheduler.cache import TaintIndex
+
+
+parametrize = pytest.mark.parametrize
+
+
+def taint(key: str, value: str = "", effect: str = "NoSchedule") -> Taint:
+    return Taint(key=key, value=value, effect=effect)
+
+
+def toleration(
+    key: str = "", operator: str = "Equal", value: str = "", effect: str = "NoSchedule"
+) -> Toleration:
+    return Toleration(key=key, operator=operator, value=value, effect=effect)
+
+
+@pytest.fixture
+def index() -> TaintIndex:
+    index = TaintIndex()
+    index.set_node("n1", [])
+    index.set_node("n2", [taint("gpu", "true")])
+    index.set_node("n3", [taint("gpu", "true"), taint("spot", effect="NoExecute")])
+    index.set_node("n4", [taint("slow", effect="PreferNoSchedule")])
+    return index
+
+
+@parametrize(
+    "tolerations, expected",
+    [
+        ([], ["n1", "n4"]),
+        ([toleration("gpu", value="true")], ["n1", "n2", "n4"]),
+        ([toleration("gpu", value="false")], ["n1", "n4"]),
+        ([toleration("gpu", "Exists", effect="NoExecute")], ["n1", "n4"]),
+        (
+            [toleration("gpu", "Exists"), toleration("spot", effect="NoExecute")],
+            ["n1", "n2", "n3", "n4"],
+        ),
+        ([toleration(operator="Exists", effect="NoSchedule")], ["n1", "n2", "n4"]),
+    ],
+)
+def test_taint_index_match(index: TaintIndex, tolerations, expected):
+    assert index.ids.names_of(index.match_tolerations(tolerations)) == expected
+    for name in ["n1", "n2", "n3", "n4"]:
+        assert index.tolerates(name, tolerations) is (name in expected)
+
+
+def test_taint_index_update(index: TaintIndex):
+    tolerations = [toleration("gpu", "Exists")]
+    assert index.ids.names_of(index.match_tolerations(tolerations)) == [
+        "n1",
+        "n2",
+        "n4",
+    ]
+
+    # a taint interned after the tolerations were compiled
+    index.set_node("n1", [taint("gpu", "false")])
+    index.set_node("n2", [taint("maintenance")])
+    assert index.ids.names_of(index.match_tolerations(tolerations)) == ["n1", "n4"]
+    assert len(index.taints) == 4
+
+    index.remove_node("n1")
+    index.remove_node("n4")
+    index.remove_node("unknown")
+    assert index.match_tolerations(tolerations) == 0
+    assert set(index.mask_nodes) == {index.node_mask("n2"), index.node_mask("n3")}
@@ -0,0 +1,105 @@
+import random
+
+from typing import Dict
+
+import pytest
+
+from airport.kube.api import Pod
+from airport.scheduler.cache import TopologySpreadIndex
+from airport.scheduler.cache.topology_spread import SpreadCounter
+
+
+def make_pod(name: str, labels: Dict[str, str], *constraints: dict) -> Pod:
+    return Pod.parse_obj(
+        {
+            "metadata": {"name": name, "namespace": "ns", "labels": labels},
+            "spec": {"topologySpreadConstraints": list(constraints)},
+        }
+    )
+
+
+def constraint(max_skew: int = 1, action: str = "DoNotSchedule") -> dict:
+    return {
+        "maxSkew": max_skew,
+        "topologyKey": "zone",
+        "whenUnsatisfiable": action,
+        "labelSelector": {"matchLabels": {"app": "web"}},
+    }
+
+
+@pytest.fixture
+def index() -> TopologySpreadIndex:
+    index = TopologySpreadIndex()
+    index.set_node("n1", {"zone": "a"})
+    index.set_node("n2", {"zone": "a"})
+    index.set_node("n3", {"zone": "b"})
+    index.set_node("n4", {})
+    return index
+
+
+def test_topology_spread_satisfies(index: TopologySpreadIndex):
+    web = make_pod("web", {"app": "web"}, constraint())
+    assert [index.satisfies(web, node) for node in ["n1", "n3", "n4"]] == [
+        True,
+        True,
+        False,
+    ]
+
+    index.add_pod(make_pod("web-0", {"app": "web"}), "n1")
+    assert not index.satisfies(web, "n2")
+    assert index.satisfies(web, "n3")
+
+    index.add_pod(make_pod("web-1", {"app": "web"}), "n3")
+    index.add_pod(make_pod("db-0", {"app": "db"}), "n3")
+    assert index.satisfies(web, "n2")
+
+    # pods not matching the constraint can always be placed
+    assert index.satisfies(make_pod("db", {"app": "db"}, constraint()), "n3")
+
+    # a new empty domain brings the minimum back to 0
+    index.set_node("n4", {"zone": "c"})
+    assert not index.satisfies(web, "n1")
+    assert index.satisfies(web, "n4")
+
+    index.remove_node("n4")
+    index.remove_pod(make_pod("web-1", {}))
+    assert not index.satisfies(web, "n2")
+    assert index.satisfies(make_pod("web", {"app": "web"}, constraint(2)), "n2")
+
+
+def test_topology_spread_skew(index: TopologySpreadIndex):
+    web = make_pod("web", {"app": "web"}, constraint(action="ScheduleAnyway"))
+    index.add_pod(make_pod("web-0", {"app": "web"}), "n1")
+    index.add_pod(make_pod("web-1", {"app": "web"}), "n2")
+
+    assert index.satisfies(web, "n1")
+    assert index.skew(web, "n1") == 3
+    assert index.skew(web, "n3") == 1
+
+    # the pods move with the labels of their node
+    index.set_node("n2", {"zone": "b"})
+    assert index.skew(web, "n1") == 1
+
+
+def test_spread_counter_min():
+    rand = random.Random(0)
+    counter = SpreadCounter()
+    nodes = []
+    for _ in range(500):
+        action = rand.random()
+        if action < 0.2 or not nodes:
+            domain = f"d{rand.randrange(10)}"
+            counter.add_node(domain)
+            nodes.append(domain)
+        elif action < 0.3:
+            domain = nodes.pop(rand.randrange(len(nodes)))
+            counter.remove_node(domain)
+        elif action < 0.7:
+            counter.add_pod(rand.choice(nodes))
+        else:
+            domains = [domain for domain, count in counter.counts.items() if count]
+            if domains:
+                counter.remove_pod(rand.choice(domains))
+
+        assert counter.min == min(counter.counts.values(), default=0)
+        assert set(counter.counts) == set(nodes)
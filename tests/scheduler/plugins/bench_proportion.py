@@ -0,0 +1,100 @@
+"""
+Measures `QueueProportion` with many queues: building it, changing the request
+of one queue and reading the deserved resources afterwards, against a full
+rebuild per change.
+
+    python -m tests.scheduler.plugins.bench_proportion [QUEUES ...]
+"""
+
+import random
+import sys
+
+from typing import List
+
+from airport.api.scheduling import Queue
+from airport.scheduler.api import Resource
+from airport.scheduler.plugins.proportion import QueueProportion
+from tests.benchmark import format_ops
+from tests.benchmark import measure
+from tests.benchmark import print_table
+
+
+DefaultSizes = [100, 1_000]
+
+Changes = 200
+
+
+def make_queue(name: str, rand: random.Random) -> Queue:
+    capability = {"cpu": str(rand.randrange(10, 100))} if rand.random() < 0.3 else {}
+    return Queue.parse_obj(
+        {
+            "metadata": {"name": name},
+            "spec": {"weight": rand.randrange(1, 10), "capability": capability},
+        }
+    )
+
+
+def make_request(rand: random.Random) -> Resource:
+    return Resource.new(
+        {
+            "cpu": str(rand.randrange(0, 50)),
+            "memory": f"{rand.randrange(0, 100)}Gi",
+            "nvidia.com/gpu": str(rand.randrange(0, 4)),
+        }
+    )
+
+
+def bench(size: int) -> List[str]:
+    rand = random.Random(size)
+    total = Resource.new(
+        {"cpu": str(size * 10), "memory": f"{size * 20}Gi", "nvidia.com/gpu": "64"}
+    )
+    queues = [make_queue(f"queue-{i}", rand) for i in range(size)]
+    requests = [make_request(rand) for _ in queues]
+    changes = [(rand.randrange(size), make_request(rand)) for _ in range(Changes)]
+
+    def build(_) -> int:
+        proportion = QueueProportion(total)
+        for queue, request in zip(queues, requests):
+            proportion.set_queue(queue, request)
+        for queue in queues:
+            proportion.deserved(queue.metadata.name)
+        return 1
+
+    def built() -> QueueProportion:
+        proportion = QueueProportion(total)
+        for queue, request in zip(queues, requests):
+            proportion.set_queue(queue, request)
+        return proportion
+
+    def run_incremental(proportion: QueueProportion) -> int:
+        for index, request in changes:
+            name = queues[index].metadata.name
+            proportion.set_request(name, request)
+            proportion.deserved(name)
+        return len(changes)
+
+    def run_recompute(proportion: QueueProportion) -> int:
+        for index, request in changes[:10]:
+            name = queues[index].metadata.name
+            proportion.set_request(name, request)
+            proportion.set_total(total)
+            for queue in queues:
+                proportion.deserved_vector(queue.metadata.name)
+        return 10
+
+    return [
+        f"{size:,}",
+        format_ops(measure(build, lambda: None)),
+        format_ops(measure(run_incremental, built, repeat=3)),
+        format_ops(measure(run_recompute, built)),
+    ]
+
+
+def main(sizes: List[int]):
+    rows = [bench(size) for size in sizes]
+    print_table(["queues", "builds/s", "incremental/s", "recompute all/s"], rows)
+
+
+if __name__ == "__main__":
+    main([int(size) for size in sys.argv[1:]] or DefaultSizes)
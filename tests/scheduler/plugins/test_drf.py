@@ -0,0 +1,135 @@
+import pytest
+
+from airport.scheduler.api import JobInfo
+from airport.scheduler.api import NamespaceInfo
+from airport.scheduler.api import Resource
+from airport.scheduler.plugins.drf import JobDrf
+from airport.scheduler.plugins.drf import NamespaceFairShare
+from airport.scheduler.plugins.drf import dominant_share
+
+
+def test_dominant_share():
+    total = Resource.new({"cpu": "10", "memory": "100Gi", "nvidia.com/gpu": "4"})
+
+    assert dominant_share(Resource(), total) == (0.0, "")
+    assert dominant_share(Resource.new({"cpu": "5", "memory": "10Gi"}), total) == (
+        0.5,
+        "cpu",
+    )
+    assert dominant_share(Resource.new({"cpu": "1", "nvidia.com/gpu": "3"}), total) == (
+        0.75,
+        "nvidia.com/gpu",
+    )
+
+
+def test_dominant_share_missing_total():
+    total = Resource.new({"cpu": "10"})
+
+    assert dominant_share(Resource.new({"memory": "1Gi"}), total) == (1.0, "memory")
+
+
+@pytest.fixture
+def fair_share() -> NamespaceFairShare:
+    fair_share = NamespaceFairShare(Resource.new({"cpu": "10", "memory": "100Gi"}))
+    fair_share.set_namespaces(
+        [NamespaceInfo(name="ns1", weight=1), NamespaceInfo(name="ns2", weight=2)]
+    )
+    return fair_share
+
+
+def test_namespace_fair_share_allocate(fair_share: NamespaceFairShare):
+    assert fair_share.ordered() == ["ns1", "ns2"]
+
+    fair_share.allocate("ns1", Resource.new({"cpu": "2", "memory": "1Gi"}))
+    assert fair_share.weighted_share("ns1") == pytest.approx(0.2)
+    assert fair_share.first() == "ns2"
+
+    fair_share.allocate("ns2", Resource.new({"cpu": "1", "memory": "40Gi"}))
+    assert fair_share.weighted_share("ns2") == pytest.approx(0.2)
+    assert fair_share.shares["ns2"].dominant_resource == "memory"
+    assert fair_share.ordered() == ["ns1", "ns2"]
+
+    fair_share.allocate("ns2", Resource.new({"memory": "10Gi"}))
+    assert fair_share.first() == "ns1"
+    assert fair_share.less("ns1", "ns2") and not fair_share.less("ns2", "ns1")
+
+    fair_share.release("ns2", Resource.new({"cpu": "1", "memory": "50Gi"}))
+    assert fair_share.weighted_share("ns2") == 0
+    assert fair_share.first() == "ns2"
+
+
+def test_namespace_fair_share_new_namespace(fair_share: NamespaceFairShare):
+    fair_share.allocate("ns1", Resource.new({"cpu": "1"}))
+    fair_share.allocate("ns2", Resource.new({"cpu": "1"}))
+    fair_share.allocate("ns3", Resource.new({"cpu": "1"}))
+
+    assert len(fair_share) == 3
+    assert fair_share.ordered() == ["ns2", "ns1", "ns3"]
+
+    fair_share.set_namespace(NamespaceInfo(name="ns3", weight=4))
+    assert fair_share.first() == "ns3"
+
+    fair_share.delete_namespace("ns3")
+    fair_share.delete_namespace("unknown")
+    assert fair_share.ordered() == ["ns2", "ns1"]
+
+
+def test_namespace_fair_share_set_total(fair_share: NamespaceFairShare):
+    fair_share.allocate("ns1", Resource.new({"cpu": "2"}))
+    fair_share.allocate("ns2", Resource.new({"memory": "60Gi"}))
+    assert fair_share.first() == "ns1"
+
+    fair_share.set_total(Resource.new({"cpu": "4", "memory": "200Gi"}))
+    assert fair_share.weighted_share("ns1") == pytest.approx(0.5)
+    assert fair_share.weighted_share("ns2") == pytest.approx(0.15)
+    assert fair_share.first() == "ns2"
+
+
+@pytest.fixture
+def job_drf() -> JobDrf:
+    return JobDrf(Resource.new({"cpu": "10", "memory": "100Gi"}))
+
+
+def test_job_drf_allocate(job_drf: JobDrf):
+    job_drf.add_job(JobInfo(uid="j1"))
+    job_drf.add_job(
+        JobInfo(uid="j2", allocated=Resource.new({"cpu": "1", "memory": "30Gi"}))
+    )
+    assert job_drf.ordered() == ["j1", "j2"]
+    assert job_drf.share("j2") == pytest.approx(0.3)
+    assert job_drf.shares["j2"].dominant_resource == "memory"
+
+    job_drf.allocate("j1", Resource.new({"cpu": "4"}))
+    assert job_drf.share("j1") == pytest.approx(0.4)
+    assert job_drf.first() == "j2"
+
+    job_drf.allocate("j3", Resource.new({"cpu": "1"}))
+    assert job_drf.ordered() == ["j3", "j2", "j1"]
+
+    job_drf.deallocate("j1", Resource.new({"cpu": "4"}))
+    assert job_drf.share("j1") == 0
+    assert job_drf.first() == "j1"
+    assert job_drf.job_order_fn(JobInfo(uid="j1"), JobInfo(uid="j3"))
+
+    job_drf.delete_job("j1")
+    job_drf.delete_job("unknown")
+    assert len(job_drf) == 2 and job_drf.share("j1") == 0
+
+
+def test_job_drf_set_total(job_drf: JobDrf):
+    jobs = [
+        JobInfo(uid="j1", allocated=Resource.new({"cpu": "2", "memory": "10Gi"})),
+        JobInfo(uid="j2", allocated=Resource.new({"cpu": "1", "memory": "30Gi"})),
+        JobInfo(uid="j3", allocated=Resource.new({"nvidia.com/gpu": "1"})),
+    ]
+    for job in jobs:
+        job_drf.add_job(job)
+    assert job_drf.ordered() == ["j3", "j1", "j2"]
+
+    total = Resource.new({"cpu": "4", "memory": "300Gi", "nvidia.com/gpu": "2"})
+    job_drf.set_total(total)
+    assert job_drf.ordered() == ["j2", "j1", "j3"]
+    for job in jobs:
+        expected, dominant_resource = dominant_share(job.allocated, total)
+        assert job_drf.share(job.uid) == pytest.approx(expected)
+        assert job_drf.shares[job.uid].dominant_resource == dominant_resource
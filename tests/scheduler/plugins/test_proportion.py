@@ -0,0 +1,133 @@
+import random
+
+from typing import Dict
+from typing import List
+
+import pytest
+
+from airport.api.scheduling import Queue
+from airport.scheduler.api import Resource
+from airport.scheduler.plugins.proportion import QueueAttr
+from airport.scheduler.plugins.proportion import QueueProportion
+
+
+def build_queue(name: str, weight: int, capability: Dict[str, str] = None) -> Queue:
+    return Queue.parse_obj(
+        {
+            "metadata": {"name": name},
+            "spec": {"weight": weight, "capability": capability or {}},
+        }
+    )
+
+
+def iterative_deserved(
+    total: Dict[str, float], attrs: List[QueueAttr]
+) -> Dict[str, Dict[str, float]]:
+    """
+    The reference algorithm: hands the remaining resources out by weight
+    round after round until every queue meets its request or nothing is left.
+    """
+
+    deserved = {attr.name: {name: 0.0 for name in total} for attr in attrs}
+    remaining = dict(total)
+    meet = {attr.name for attr in attrs if attr.weight <= 0}
+    for _ in range(1000):
+        total_weight = sum(attr.weight for attr in attrs if attr.name not in meet)
+        if total_weight == 0:
+            break
+
+        given = {name: 0.0 for name in total}
+        for attr in attrs:
+            if attr.name in meet:
+                continue
+
+            queue_deserved = deserved[attr.name]
+            for name in total:
+                old = queue_deserved[name]
+                new = min(
+                    old + remaining[name] * attr.weight / total_weight,
+                    attr.bound(name),
+                )
+                queue_deserved[name] = new
+                given[name] += new - old
+            if all(queue_deserved[name] >= attr.bound(name) for name in total):
+                meet.add(attr.name)
+
+        for name in total:
+            remaining[name] -= given[name]
+        if all(value < 1e-6 for value in remaining.values()):
+            break
+
+    return deserved
+
+
+def test_queue_proportion():
+    proportion = QueueProportion(Resource.new({"cpu": "12", "memory": "12Gi"}))
+    proportion.set_queue(build_queue("q1", 1), Resource.new({"cpu": "10"}))
+    proportion.set_queue(build_queue("q2", 2), Resource.new({"cpu": "10"}))
+
+    assert proportion.deserved_vector("q1")["cpu"] == pytest.approx(4000)
+    assert proportion.deserved_vector("q2")["cpu"] == pytest.approx(8000)
+    assert proportion.deserved_vector("q1")["memory"] == 0
+
+    # q1 is capped by its request, q2 gets the rest
+    proportion.set_request("q1", Resource.new({"cpu": "1"}))
+    assert proportion.deserved_vector("q1")["cpu"] == pytest.approx(1000)
+    assert proportion.deserved_vector("q2")["cpu"] == pytest.approx(10000)
+
+    # q2 is capped by its capability
+    proportion.set_queue(build_queue("q2", 2, {"cpu": "6"}))
+    assert proportion.deserved("q2").milli_cpu == 6000
+    assert proportion.queues["q2"].request["cpu"] == 10000
+
+    proportion.set_queue(build_queue("q3", 0), Resource.new({"cpu": "10"}))
+    assert proportion.deserved_vector("q3") == {"cpu": 0, "memory": 0}
+
+    proportion.delete_queue("q2")
+    proportion.delete_queue("unknown")
+    assert len(proportion) == 2
+    assert proportion.deserved_vector("q1")["cpu"] == pytest.approx(1000)
+
+
+def test_queue_proportion_set_total():
+    proportion = QueueProportion(Resource.new({"cpu": "4"}))
+    proportion.set_queue(build_queue("q1", 1), Resource.new({"cpu": "10"}))
+    proportion.set_queue(build_queue("q2", 1), Resource.new({"cpu": "10"}))
+    assert proportion.deserved("q1").milli_cpu == 2000
+
+    proportion.set_total(Resource.new({"cpu": "30", "nvidia.com/gpu": "2"}))
+    assert proportion.deserved("q1").milli_cpu == 10000
+    assert proportion.deserved("q1").scalar_resources["nvidia.com/gpu"] == 0
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_queue_proportion_matches_iterative(seed: int):
+    rand = random.Random(seed)
+    total = Resource.new({"cpu": "100", "memory": "100Gi", "nvidia.com/gpu": "8"})
+    proportion = QueueProportion(total)
+
+    for i in range(30):
+        capability = {"cpu": str(rand.randrange(5, 50))} if rand.random() < 0.3 else {}
+        request = {
+            "cpu": str(rand.randrange(0, 30)),
+            "memory": f"{rand.randrange(0, 30)}Gi",
+            "nvidia.com/gpu": str(rand.randrange(0, 3)),
+        }
+        proportion.set_queue(
+            build_queue(f"q{i}", rand.randrange(0, 5), capability),
+            Resource.new(request),
+        )
+
+    for i in rand.sample(range(30), 10):
+        proportion.set_request(
+            f"q{i}", Resource.new({"cpu": str(rand.randrange(0, 30))})
+        )
+
+    expected = iterative_deserved(
+        {name: level.total for name, level in proportion.levels.items()},
+        list(proportion.queues.values()),
+    )
+    for name in proportion.queues:
+        deserved = proportion.deserved_vector(name)
+        for resource_name, value in expected[name].items():
+            assert deserved[resource_name] == pytest.approx(value, rel=1e-6, abs=1e-3)
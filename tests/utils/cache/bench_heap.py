@@ -0,0 +1,173 @@
+"""
+Compares add/pop/update/delete throughput of `HeapData` against the
+list-copying storage it replaced.
+
+    python -m tests.utils.cache.bench_heap [SIZE ...]
+"""
+
+import random
+import sys
+
+from dataclasses import dataclass
+from dataclasses import field
+from typing import Any
+from typing import Callable
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+from airport.utils.cache import heap
+from airport.utils.cache.heap import HeapData
+from airport.utils.cache.heap import ItemKeyValue
+from tests.benchmark import format_ops
+from tests.benchmark import measure
+from tests.benchmark import print_table
+
+
+Item = Tuple[str, int]
+
+DefaultSizes = [10_000, 100_000, 1_000_000]
+Ops = 10_000
+
+
+@dataclass
+class LegacyHeapItem:
+    obj: Any
+    index: int
+
+
+@dataclass
+class LegacyHeapData:
+    items: Dict[str, LegacyHeapItem] = field(init=False)
+    queue: List[str] = field(init=False)
+
+    def __init__(self, key_func: Callable, less_func: Callable):
+        self.key_func = key_func
+        self.less_func = less_func
+        self.items = dict()
+        self.queue = list()
+
+    def less(self, i: int, j: int) -> bool:
+        if i > len(self.queue) or j > len(self.queue):
+            return False
+
+        if (item_i := self.items.get(self.queue[i])) is None:
+            return False
+
+        if (item_j := self.items.get(self.queue[j])) is None:
+            return False
+
+        return self.less_func(item_i.obj, item_j.obj)
+
+    def swap(self, i: int, j: int):
+        self.queue[i], self.queue[j] = self.queue[j], self.queue[i]
+        self.items[self.queue[i]].index = i
+        self.items[self.queue[j]].index = j
+
+    def push(self, kv: ItemKeyValue):
+        self.items[kv.key] = LegacyHeapItem(obj=kv.obj, index=len(self.queue))
+        self.queue.append(kv.key)
+
+    def pop(self) -> Optional[Any]:
+        key = self.queue[-1]
+        self.queue = self.queue[:-1]
+
+        try:
+            return self.items.pop(key).obj
+        except KeyError:
+            return None
+
+    def __len__(self):
+        return len(self.queue)
+
+
+def key_func(obj: Item) -> str:
+    return obj[0]
+
+
+def less_func(obj1: Item, obj2: Item) -> bool:
+    return obj1[1] < obj2[1]
+
+
+def legacy_update(data: LegacyHeapData, key: str, obj: Item):
+    item = data.items[key]
+    item.obj = obj
+    heap.fix(data, item.index)
+
+
+def legacy_delete(data: LegacyHeapData, key: str):
+    heap.remove(data, data.items[key].index)
+
+
+def array_update(data: HeapData, key: str, obj: Item):
+    index = data.index[key]
+    data.objs[index] = obj
+    heap.fix(data, index)
+
+
+def array_delete(data: HeapData, key: str):
+    heap.remove(data, data.index[key])
+
+
+Implementations = {
+    "legacy": (LegacyHeapData, legacy_update, legacy_delete),
+    "array": (HeapData, array_update, array_delete),
+}
+
+
+def make_items(size: int) -> List[Item]:
+    rand = random.Random(size)
+    return [(f"item-{i}", rand.randrange(size)) for i in range(size)]
+
+
+def bench(name: str, size: int) -> List[str]:
+    data_cls, update, delete = Implementations[name]
+    items = make_items(size)
+    ops = min(Ops, size)
+    rand = random.Random(0)
+    keys = [key for key, _ in rand.sample(items, ops)]
+
+    def filled():
+        data = data_cls(key_func, less_func)
+        for item in items:
+            heap.push(data, ItemKeyValue(key=item[0], obj=item))
+        return data
+
+    def run_add(data) -> int:
+        for item in items:
+            heap.push(data, ItemKeyValue(key=item[0], obj=item))
+        return size
+
+    def run_pop(data) -> int:
+        for _ in range(ops):
+            heap.pop(data)
+        return ops
+
+    def run_update(data) -> int:
+        for key in keys:
+            update(data, key, (key, rand.randrange(size)))
+        return ops
+
+    def run_delete(data) -> int:
+        for key in keys:
+            delete(data, key)
+        return ops
+
+    return [
+        name,
+        f"{size:,}",
+        format_ops(measure(run_add, lambda: data_cls(key_func, less_func))),
+        format_ops(measure(run_pop, filled)),
+        format_ops(measure(run_update, filled)),
+        format_ops(measure(run_delete, filled)),
+    ]
+
+
+def main(sizes: List[int]):
+    rows = [bench(name, size) for size in sizes for name in Implementations]
+    print_table(["storage", "items", "add/s", "pop/s", "update/s", "delete/s"], rows)
+
+
+if __name__ == "__main__":
+    main([int(size) for size in sys.argv[1:]] or DefaultSizes)
@@ -0,0 +1,98 @@
+"""
+Compares the `HeapBackend`s of `Heap.new` under mixes of operations shaped
+like our queues: the tiny read heavy namespace weight heap and the large
+update heavy job queue, plus plain fill and drain.
+
+    python -m tests.utils.cache.bench_heap_backends [SIZE ...]
+"""
+
+import random
+import sys
+
+from typing import Callable
+from typing import Dict
+from typing import List
+from typing import Tuple
+
+from airport.scheduler.api.namespace_info import QuotaItem
+from airport.scheduler.api.namespace_info import quota_item_key_func
+from airport.scheduler.api.namespace_info import quota_item_less_func
+from airport.utils.cache import Heap
+from airport.utils.cache import HeapBackend
+from tests.benchmark import format_ops
+from tests.benchmark import measure
+from tests.benchmark import print_table
+
+
+DefaultSizes = [16, 1_000, 50_000]
+
+Operations = 20_000
+
+# the share of each operation in a mix, the rest of the operations are peeks
+Mixes: Dict[str, Dict[str, float]] = {
+    "read-heavy": {"update": 0.05, "get": 0.45},
+    "update-heavy": {"update": 0.7, "pop": 0.1, "add": 0.1},
+    "fill-drain": {"add": 0.5, "pop": 0.5},
+}
+
+
+def new_item(name: str, rand: random.Random) -> QuotaItem:
+    return QuotaItem(name=name, weight=rand.randrange(1_000))
+
+
+def plan(mix: str, size: int, rand: random.Random) -> List[Tuple[str, QuotaItem]]:
+    shares = Mixes[mix]
+    ops = []
+    fresh = 0
+    for _ in range(Operations):
+        op = rand.choices(
+            [*shares, "peek"], [*shares.values(), 1 - sum(shares.values())]
+        )[0]
+        if op == "add":
+            name = f"new-{fresh}"
+            fresh += 1
+        else:
+            name = f"quota-{rand.randrange(size)}"
+        ops.append((op, new_item(name, rand)))
+    return ops
+
+
+def bench(backend: HeapBackend, size: int) -> List[str]:
+    rand = random.Random(size)
+    items = [new_item(f"quota-{i}", rand) for i in range(size)]
+
+    def filled() -> Heap:
+        heap = Heap.new(quota_item_key_func, quota_item_less_func, backend=backend)
+        heap.bulk_add(items)
+        return heap
+
+    def runner(ops: List[Tuple[str, QuotaItem]]) -> Callable[[Heap], int]:
+        def run(heap: Heap) -> int:
+            for op, item in ops:
+                if op == "update" or op == "add":
+                    heap.update(item)
+                elif op == "get":
+                    heap.get(item)
+                elif op == "pop":
+                    if len(heap.data):
+                        heap.pop()
+                else:
+                    heap.peek()
+            return len(ops)
+
+        return run
+
+    row = [backend.value, f"{size:,}"]
+    for mix in Mixes:
+        ops = plan(mix, size, random.Random(mix))
+        row.append(format_ops(measure(runner(ops), filled, repeat=3)))
+    return row
+
+
+def main(sizes: List[int]):
+    rows = [bench(backend, size) for size in sizes for backend in HeapBackend]
+    print_table(["backend", "items", *(f"{mix}/s" for mix in Mixes)], rows)
+
+
+if __name__ == "__main__":
+    main([int(size) for size in sys.argv[1:]] or DefaultSizes)
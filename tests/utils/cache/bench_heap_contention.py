@@ -0,0 +1,122 @@
+"""
+Measures Heap throughput with 8 threads calling `get_by_key`/`list_keys`
+while writers update items, with the reader-writer lock and with a plain
+mutex guarding both readers and writers.
+
+    python -m tests.utils.cache.bench_heap_contention [SECONDS]
+"""
+
+import random
+import sys
+import time
+
+from contextlib import contextmanager
+from threading import Barrier
+from threading import Condition
+from threading import Lock
+from threading import Thread
+from typing import Iterator
+from typing import List
+from typing import Tuple
+
+from airport.utils.cache import Heap
+from tests.benchmark import format_ops
+from tests.benchmark import print_table
+
+
+Item = Tuple[str, int]
+
+Threads = 8
+Size = 10_000
+ReadRatios = [1.0, 0.99, 0.9, 0.5]
+
+
+class MutexLock:
+    """
+    Stands in for `RWLock`, with readers taking the same exclusive lock as
+    writers.
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+
+    def acquire(self, blocking: bool = True, timeout: float = -1) -> bool:
+        return self._lock.acquire(blocking, timeout)
+
+    def release(self):
+        self._lock.release()
+
+    def __enter__(self) -> bool:
+        return self.acquire()
+
+    def __exit__(self, *args):
+        self.release()
+
+    @contextmanager
+    def read(self) -> Iterator[None]:
+        with self._lock:
+            yield
+
+
+def key_func(obj: Item) -> str:
+    return obj[0]
+
+
+def less_func(obj1: Item, obj2: Item) -> bool:
+    return obj1[1] < obj2[1]
+
+
+def new_heap(lock_kind: str) -> Heap:
+    heap = Heap.new(key_func, less_func)
+    if lock_kind == "mutex":
+        heap.lock = MutexLock()  # type: ignore
+        heap.cond = Condition(heap.lock)  # type: ignore
+    heap.bulk_add([(f"item-{i}", i) for i in range(Size)])
+    return heap
+
+
+def bench(lock_kind: str, read_ratio: float, seconds: float) -> List[str]:
+    heap = new_heap(lock_kind)
+    barrier = Barrier(Threads + 1)
+    counts = [0] * Threads
+    deadline = 0.0
+
+    def task(n: int):
+        rand = random.Random(n)
+        barrier.wait()
+        ops = 0
+        while time.perf_counter() < deadline:
+            key = f"item-{rand.randrange(Size)}"
+            if rand.random() < read_ratio:
+                if ops % 100 == 0:
+                    heap.list_keys()
+                else:
+                    heap.get_by_key(key)
+            else:
+                heap.update((key, rand.randrange(Size)))
+            ops += 1
+        counts[n] = ops
+
+    threads = [Thread(target=task, args=(n,)) for n in range(Threads)]
+    for thread in threads:
+        thread.start()
+
+    deadline = time.perf_counter() + seconds
+    barrier.wait()
+    for thread in threads:
+        thread.join()
+
+    return [lock_kind, f"{read_ratio:.0%}", format_ops(sum(counts) / seconds)]
+
+
+def main(seconds: float):
+    rows = [
+        bench(lock_kind, read_ratio, seconds)
+        for read_ratio in ReadRatios
+        for lock_kind in ["rwlock", "mutex"]
+    ]
+    print_table(["lock", "reads", f"ops/s ({Threads} threads)"], rows)
+
+
+if __name__ == "__main__":
+    main(float(sys.argv[1]) if len(sys.argv) > 1 else 2.0)
@@ -0,0 +1,139 @@
+"""
+Compares `Heap.new` (less_func callback) with `Heap.new_with_sort_key`
+(native comparisons) for the namespace weight queue and the job queue.
+
+    python -m tests.utils.cache.bench_sort_key_heap [SIZE ...]
+"""
+
+import random
+import sys
+
+from datetime import datetime
+from datetime import timedelta
+from typing import Any
+from typing import Callable
+from typing import List
+from typing import Tuple
+
+from airport.scheduler.api import JobInfo
+from airport.scheduler.api.namespace_info import QuotaItem
+from airport.scheduler.api.namespace_info import quota_item_key_func
+from airport.scheduler.api.namespace_info import quota_item_less_func
+from airport.utils.cache import Heap
+from tests.benchmark import format_ops
+from tests.benchmark import measure
+from tests.benchmark import print_table
+
+
+DefaultSizes = [1_000, 10_000, 100_000]
+
+
+def quota_item_sort_key(item: QuotaItem) -> int:
+    return -item.weight
+
+
+def job_key_func(job: JobInfo) -> str:
+    return job.uid
+
+
+def job_less_func(job1: JobInfo, job2: JobInfo) -> bool:
+    if job1.priority != job2.priority:
+        return job1.priority > job2.priority
+    return job1.create_timestamp < job2.create_timestamp
+
+
+def job_sort_key(job: JobInfo) -> Tuple[int, datetime]:
+    return -job.priority, job.create_timestamp
+
+
+def make_quota_items(size: int, rand: random.Random) -> List[QuotaItem]:
+    return [QuotaItem(name=f"quota-{i}", weight=rand.randrange(100)) for i in range(size)]
+
+
+def make_jobs(size: int, rand: random.Random) -> List[JobInfo]:
+    start = datetime(2020, 1, 1)
+    return [
+        JobInfo(
+            uid=f"job-{i}",
+            priority=rand.randrange(10),
+            create_timestamp=start + timedelta(seconds=rand.randrange(size)),
+        )
+        for i in range(size)
+    ]
+
+
+def reweight(item: QuotaItem, rand: random.Random) -> QuotaItem:
+    return QuotaItem(name=item.name, weight=rand.randrange(100))
+
+
+def reprioritize(job: JobInfo, rand: random.Random) -> JobInfo:
+    return job.copy(update={"priority": rand.randrange(10)})
+
+
+Queues = {
+    "namespace": (
+        make_quota_items,
+        reweight,
+        lambda: Heap.new(quota_item_key_func, quota_item_less_func),
+        lambda: Heap.new_with_sort_key(quota_item_key_func, quota_item_sort_key),
+    ),
+    "job": (
+        make_jobs,
+        reprioritize,
+        lambda: Heap.new(job_key_func, job_less_func),
+        lambda: Heap.new_with_sort_key(job_key_func, job_sort_key),
+    ),
+}
+
+
+def bench(queue: str, size: int) -> List[List[str]]:
+    make_objs, change, *factories = Queues[queue]
+    rand = random.Random(size)
+    objs = make_objs(size, rand)
+    updates = [change(obj, rand) for obj in rand.sample(objs, min(size, 10_000))]
+
+    rows = []
+    for mode, factory in zip(["less_func", "sort_key"], factories):
+        new_heap: Callable[[], Any] = factory
+
+        def filled():
+            heap = new_heap()
+            heap.bulk_add(objs)
+            return heap
+
+        def run_add(heap) -> int:
+            for obj in objs:
+                heap.add(obj)
+            return size
+
+        def run_update(heap) -> int:
+            for obj in updates:
+                heap.update(obj)
+            return len(updates)
+
+        def run_pop(heap) -> int:
+            for _ in range(size):
+                heap.pop()
+            return size
+
+        rows.append(
+            [
+                queue,
+                mode,
+                f"{size:,}",
+                format_ops(measure(run_add, new_heap, repeat=3)),
+                format_ops(measure(run_update, filled, repeat=3)),
+                format_ops(measure(run_pop, filled, repeat=3)),
+            ]
+        )
+
+    return rows
+
+
+def main(sizes: List[int]):
+    rows = [row for queue in Queues for size in sizes for row in bench(queue, size)]
+    print_table(["queue", "mode", "items", "add/s", "update/s", "pop/s"], rows)
+
+
+if __name__ == "__main__":
+    main([int(size) for size in sys.argv[1:]] or DefaultSizes)
@@ -0,0 +1,124 @@
+import asyncio
+
+import pytest
+
+from pydantic import BaseModel
+
+from airport.utils.cache import AsyncHeap
+from airport.utils.cache import HeapClosed
+from airport.utils.cache import HeapObjectNotFound
+
+
+class HeapTestObject(BaseModel):
+    name: str
+    value: int
+
+
+def make_heap_obj(name: str, value: int) -> HeapTestObject:
+    return HeapTestObject(name=name, value=value)
+
+
+def heap_key_func(obj: HeapTestObject):
+    return obj.name
+
+
+def compare_ints(value1: HeapTestObject, value2: HeapTestObject) -> bool:
+    return value1.value < value2.value
+
+
+@pytest.fixture(params=["less_func", "sort_key"])
+def heap(request) -> AsyncHeap[HeapTestObject]:
+    if request.param == "less_func":
+        return AsyncHeap.new(heap_key_func, compare_ints)
+    return AsyncHeap.new_with_sort_key(heap_key_func, lambda obj: obj.value)
+
+
+def test_async_heap_add(heap: AsyncHeap[HeapTestObject]):
+    async def main():
+        heap.add(make_heap_obj("foo", 10))
+        heap.add(make_heap_obj("bar", 1))
+        heap.add(make_heap_obj("baz", 11))
+        heap.add(make_heap_obj("zab", 30))
+        heap.add(make_heap_obj("foo", 13))
+
+        assert (await heap.pop()).value == 1
+        assert (await heap.pop()).value == 11
+
+        with pytest.raises(HeapObjectNotFound):
+            heap.delete(make_heap_obj("baz", 11))
+
+        heap.update(make_heap_obj("foo", 14))
+        heap.add_if_not_present(make_heap_obj("foo", 0))
+        assert heap.peek().value == 14
+        assert [obj.value for obj in await heap.pop_many(10)] == [14, 30]
+
+    asyncio.run(main())
+
+
+def test_async_heap_pop_waits(heap: AsyncHeap[HeapTestObject]):
+    async def produce():
+        for i in reversed(range(5)):
+            await asyncio.sleep(0.01)
+            heap.add(make_heap_obj(f"a{i}", i))
+
+    async def consume():
+        return [(await heap.pop()).name for _ in range(5)]
+
+    async def main():
+        _, names = await asyncio.gather(produce(), consume())
+        assert sorted(names) == [f"a{i}" for i in range(5)]
+
+    asyncio.run(main())
+
+
+def test_async_heap_pop_many(heap: AsyncHeap[HeapTestObject]):
+    async def produce():
+        await asyncio.sleep(0.05)
+        heap.bulk_add([make_heap_obj(f"a{i}", i) for i in reversed(range(10))])
+
+    async def main():
+        assert await heap.pop_many(10, timeout=0.01) == []
+
+        _, objs = await asyncio.gather(produce(), heap.pop_many(4, timeout=5))
+        assert [obj.value for obj in objs] == [0, 1, 2, 3]
+
+        heap.bulk_delete([make_heap_obj("a4", 0), make_heap_obj("a5", 0)])
+        assert [obj.value for obj in await heap.pop_many(10)] == [6, 7, 8, 9]
+        assert heap.waiters == []
+
+    asyncio.run(main())
+
+
+def test_async_heap_close(heap: AsyncHeap[HeapTestObject]):
+    async def close():
+        await asyncio.sleep(0.05)
+        heap.close()
+
+    async def main():
+        with pytest.raises(HeapClosed):
+            await asyncio.gather(close(), heap.pop())
+
+        with pytest.raises(HeapClosed):
+            await heap.pop_many(10)
+
+        with pytest.raises(HeapClosed):
+            heap.add(make_heap_obj("foo", 1))
+
+        with pytest.raises(HeapClosed):
+            heap.bulk_add([make_heap_obj("foo", 1)])
+
+        assert heap.is_closed()
+
+    asyncio.run(main())
+
+
+def test_async_heap_read(heap: AsyncHeap[HeapTestObject]):
+    items = {"foo": 10, "bar": 1, "bal": 31, "baz": 11, "faz": 30}
+    heap.bulk_add([make_heap_obj(k, v) for k, v in items.items()])
+
+    assert heap.get(make_heap_obj("baz", 0)).value == 11
+    assert heap.get_by_key("non-existing") is None
+    assert sorted(heap.list_keys()) == sorted(items)
+    assert len(heap.list()) == len(items)
+    assert [obj.value for obj in heap.top_k(2)] == [1, 10]
+    assert [obj.value for obj in heap.ordered()] == sorted(items.values())
@@ -0,0 +1,136 @@
+import pytest
+
+from pydantic import BaseModel
+
+from airport.utils.cache import BackoffQueue
+from airport.utils.cache import HeapClosed
+from airport.utils.cache import HeapMetrics
+
+
+class BackoffTestObject(BaseModel):
+    name: str
+
+
+class FakeClock:
+    def __init__(self, now: float = 0.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+    def step(self, duration: float):
+        self.now += duration
+
+
+@pytest.fixture
+def clock() -> FakeClock:
+    return FakeClock(100.0)
+
+
+@pytest.fixture
+def queue(clock: FakeClock) -> BackoffQueue[BackoffTestObject]:
+    return BackoffQueue(
+        lambda obj: obj.name, initial_backoff=1, max_backoff=8, clock=clock
+    )
+
+
+def test_backoff_exponential(queue: BackoffQueue[BackoffTestObject]):
+    foo = BackoffTestObject(name="foo")
+    assert [queue.backoff(foo) for _ in range(6)] == [1, 2, 4, 8, 8, 8]
+    assert len(queue) == 1
+    assert queue.next_ready_at() == 108
+
+    bar = BackoffTestObject(name="bar")
+    assert queue.backoff(bar) == 1
+    assert len(queue) == 2
+    assert queue.next_ready_at() == 101
+
+
+def test_pop_ready(queue: BackoffQueue[BackoffTestObject], clock: FakeClock):
+    foo = BackoffTestObject(name="foo")
+    bar = BackoffTestObject(name="bar")
+    baz = BackoffTestObject(name="baz")
+    queue.backoff(foo)
+    queue.backoff(foo)
+    queue.backoff(bar)
+    clock.step(0.5)
+    queue.backoff(baz)
+
+    assert queue.pop_ready() == []
+
+    clock.step(0.5)
+    assert queue.pop_ready() == [bar]
+
+    clock.step(1)
+    assert queue.pop_ready() == [baz, foo]
+    assert len(queue) == 0
+    assert queue.next_ready_at() is None
+
+
+def test_pop_ready_limit(queue: BackoffQueue[BackoffTestObject], clock: FakeClock):
+    objs = [BackoffTestObject(name=str(i)) for i in range(5)]
+    for obj in objs:
+        queue.backoff(obj)
+        clock.step(0.1)
+
+    clock.step(1)
+    assert queue.pop_ready(2) == objs[:2]
+    assert queue.pop_ready(2) == objs[2:4]
+    assert queue.pop_ready() == objs[4:]
+
+
+def test_forget(queue: BackoffQueue[BackoffTestObject], clock: FakeClock):
+    foo = BackoffTestObject(name="foo")
+    queue.backoff(foo)
+    queue.backoff(foo)
+    queue.forget(foo)
+
+    assert len(queue) == 0
+    assert queue.backoff(foo) == 1
+
+    # forgetting an unknown item is ignored
+    queue.forget(BackoffTestObject(name="bar"))
+
+
+def test_reset(queue: BackoffQueue[BackoffTestObject], clock: FakeClock):
+    foo = BackoffTestObject(name="foo")
+    bar = BackoffTestObject(name="bar")
+    for _ in range(3):
+        queue.backoff(foo)
+    queue.backoff(bar)
+
+    clock.step(0.5)
+    queue.reset()
+    assert queue.next_ready_at() == 100.5
+    # the items are all ready at the same time, in no particular order
+    assert sorted(queue.pop_ready(), key=lambda obj: obj.name) == [bar, foo]
+    assert queue.backoff(foo) == 1
+
+
+def test_close(queue: BackoffQueue[BackoffTestObject]):
+    queue.close()
+    with pytest.raises(HeapClosed):
+        queue.backoff(BackoffTestObject(name="foo"))
+
+
+def test_backoff_metrics(clock: FakeClock):
+    metrics = HeapMetrics()
+    queue = BackoffQueue(lambda obj: obj.name, clock=clock, metrics=metrics)
+    foo = BackoffTestObject(name="foo")
+    bar = BackoffTestObject(name="bar")
+
+    queue.backoff(foo)
+    queue.backoff(foo)
+    queue.backoff(bar)
+    queue.forget(bar)
+    queue.forget(bar)
+    queue.reset()
+    assert queue.pop_ready() == [foo]
+
+    snapshot = metrics.snapshot()
+    assert snapshot.adds == 2
+    assert snapshot.updates == 2
+    assert snapshot.deletes == 1
+    assert snapshot.pops == 1
+    assert snapshot.depth == 0 and snapshot.max_depth == 2
+    assert snapshot.enqueued_time.count == 1
@@ -1,3 +1,4 @@
+import random
 import time
 
 from threading import Thread
@@ -6,9 +7,18 @@ import pytest
 
 from pydantic import BaseModel
 
+from airport.utils.cache import heap as heap_module
+from airport.utils.cache.heap import DaryHeapData
 from airport.utils.cache.heap import Heap
+from airport.utils.cache.heap import HeapBackend
 from airport.utils.cache.heap import HeapClosed
+from airport.utils.cache.heap import HeapData
 from airport.utils.cache.heap import HeapObjectNotFound
+from airport.utils.cache.heap import ItemKeyValue
+from airport.utils.cache.heap import PairingHeapData
+
+
+parametrize = pytest.mark.parametrize
 
 
 class HeapTestObject(BaseModel):
@@ -117,8 +127,8 @@ def test_heap_add_if_not_present(heap: Heap[HeapTestObject]):
     heap.add_if_not_present(make_heap_obj("zab", 30))
     heap.add_if_not_present(make_heap_obj("foo", 13))  # update
 
-    assert len(heap.data.items) == 4
-    assert heap.data.items["foo"].obj.value == 10
+    assert len(heap.data.index) == 4
+    assert heap.get_by_key("foo").value == 10
 
     assert heap.pop().value == 1
     assert heap.pop().value == 10
@@ -162,11 +172,11 @@ def test_heap_update(heap: Heap[HeapTestObject]):
 
     heap.update(make_heap_obj("baz", 0))
 
-    assert heap.data.queue[0] == "baz" and heap.data.items["baz"].index == 0
+    assert heap.data.queue[0] == "baz" and heap.data.index["baz"] == 0
     assert heap.pop().value == 0
 
     heap.update(make_heap_obj("bar", 100))
-    assert heap.data.queue[0] == "foo" and heap.data.items["foo"].index == 0
+    assert heap.data.queue[0] == "foo" and heap.data.index["foo"] == 0
 
 
 def test_heap_get(heap: Heap[HeapTestObject]):
@@ -234,6 +244,39 @@ def test_heap_list_keys(heap: Heap[HeapTestObject]):
         assert items.get(key)
 
 
+def assert_heap_data(data: HeapData[HeapTestObject]):
+    assert len(data.queue) == len(data.objs) == len(data.index)
+
+    for i, key in enumerate(data.queue):
+        assert data.index[key] == i
+        assert data.objs[i].name == key
+
+        for child in [2 * i + 1, 2 * i + 2]:
+            if child < len(data):
+                assert not data.less(child, i)
+
+
+def test_heap_data_parallel_arrays(heap: Heap[HeapTestObject]):
+    for i in range(100):
+        heap.add(make_heap_obj(f"a{i}", (i * 37) % 101))
+    assert_heap_data(heap.data)
+
+    for i in range(0, 100, 3):
+        heap.update(make_heap_obj(f"a{i}", (i * 53) % 97))
+    assert_heap_data(heap.data)
+
+    for i in range(0, 100, 5):
+        heap.delete(make_heap_obj(f"a{i}", 0))
+    assert_heap_data(heap.data)
+
+    prev_num = -1
+    while len(heap.data):
+        obj = heap.pop()
+        assert obj.value >= prev_num
+        prev_num = obj.value
+        assert_heap_data(heap.data)
+
+
 def test_heap_after_close(heap: Heap[HeapTestObject]):
     heap.close()
 
@@ -245,3 +288,300 @@ def test_heap_after_close(heap: Heap[HeapTestObject]):
 
     with pytest.raises(HeapClosed):
         heap.bulk_add([make_heap_obj("test", 1)])
+
+
+def test_heap_init():
+    data = HeapData(heap_key_func, compare_ints)
+    for i in [5, 3, 8, 1, 9, 2, 7]:
+        data.push(ItemKeyValue(key=f"a{i}", obj=make_heap_obj(f"a{i}", i)))
+    heap_module.init(data)
+
+    assert_heap_data(data)
+    assert data.objs[0].value == 1
+
+
+@parametrize("amount", [10, 1000])
+def test_heap_bulk_update(heap: Heap[HeapTestObject], amount: int):
+    # small batches are fixed per item, large batches re-heapify once
+    for i in range(1000):
+        heap.add(make_heap_obj(f"a{i}", i))
+
+    heap.bulk_update([make_heap_obj(f"a{i}", 2000 - i) for i in range(amount)])
+    heap.bulk_update([make_heap_obj(f"b{i}", 1500 + i) for i in range(amount)])
+    assert_heap_data(heap.data)
+    assert len(heap.data) == 1000 + amount
+    assert heap.get_by_key("a0").value == 2000
+
+    prev_num = -1
+    while len(heap.data):
+        obj = heap.pop()
+        assert obj.value >= prev_num
+        prev_num = obj.value
+
+
+@parametrize("amount", [10, 900])
+def test_heap_bulk_delete(heap: Heap[HeapTestObject], amount: int):
+    for i in range(1000):
+        heap.add(make_heap_obj(f"a{i}", (i * 37) % 1000))
+
+    with pytest.raises(HeapObjectNotFound):
+        heap.bulk_delete([make_heap_obj("a1", 0), make_heap_obj("non-existent", 0)])
+    assert len(heap.data) == 1000
+
+    heap.bulk_delete([make_heap_obj(f"a{i}", 0) for i in range(amount)])
+    assert_heap_data(heap.data)
+    assert len(heap.data) == 1000 - amount
+    assert heap.get_by_key("a0") is None
+
+
+def test_heap_pop_many(heap: Heap[HeapTestObject]):
+    heap.bulk_add([make_heap_obj(f"a{i}", i) for i in reversed(range(10))])
+
+    assert [obj.value for obj in heap.pop_many(4)] == [0, 1, 2, 3]
+    assert [obj.value for obj in heap.pop_many(10)] == [4, 5, 6, 7, 8, 9]
+    assert heap.pop_many(10, timeout=0.01) == []
+
+
+def test_heap_pop_many_wait(heap: Heap[HeapTestObject]):
+    def task():
+        time.sleep(0.1)
+        heap.bulk_add([make_heap_obj(f"a{i}", i) for i in range(5)])
+
+    Thread(target=task).start()
+
+    assert len(heap.pop_many(10, timeout=5)) == 5
+
+
+def test_heap_pop_many_closed(heap: Heap[HeapTestObject]):
+    def task():
+        time.sleep(0.1)
+        heap.close()
+
+    Thread(target=task).start()
+
+    with pytest.raises(HeapClosed):
+        heap.pop_many(10)
+
+
+def test_heap_peek(heap: Heap[HeapTestObject]):
+    assert heap.peek() is None
+
+    heap.add(make_heap_obj("foo", 10))
+    heap.add(make_heap_obj("bar", 1))
+    heap.add(make_heap_obj("baz", 11))
+    queue = list(heap.data.queue)
+
+    assert heap.peek().value == 1
+    assert heap.peek().value == 1
+    assert heap.data.queue == queue
+
+    heap.update(make_heap_obj("bar", 20))
+    assert heap.peek().value == 10
+
+
+def test_heap_top_k(heap: Heap[HeapTestObject]):
+    assert heap.top_k(3) == []
+
+    for i in range(100):
+        heap.add(make_heap_obj(f"a{i}", (i * 37) % 100))
+    queue = list(heap.data.queue)
+
+    assert [obj.value for obj in heap.top_k(5)] == [0, 1, 2, 3, 4]
+    assert len(heap.top_k(1000)) == 100
+    assert heap.data.queue == queue
+
+
+def test_heap_ordered(heap: Heap[HeapTestObject]):
+    for i in range(100):
+        heap.add(make_heap_obj(f"a{i}", (i * 37) % 100))
+
+    ordered = heap.ordered()
+    heap.add(make_heap_obj("b", -1))
+
+    assert [obj.value for obj in ordered] == list(range(100))
+    assert len(heap.data) == 101
+    assert heap.pop().value == -1
+
+
+def heap_sort_key_func(obj: HeapTestObject) -> int:
+    return obj.value
+
+
+@pytest.fixture
+def sort_key_heap() -> Heap[HeapTestObject]:
+    return Heap.new_with_sort_key(heap_key_func, heap_sort_key_func)
+
+
+def test_sort_key_heap_add(sort_key_heap: Heap[HeapTestObject]):
+    heap = sort_key_heap
+    heap.add(make_heap_obj("foo", 10))
+    heap.add(make_heap_obj("bar", 1))
+    heap.add(make_heap_obj("baz", 11))
+    heap.add(make_heap_obj("zab", 30))
+    heap.add(make_heap_obj("foo", 13))
+
+    assert len(heap.data) == 4
+    assert heap.pop().value == 1
+    assert heap.pop().value == 11
+
+    with pytest.raises(HeapObjectNotFound):
+        heap.delete(make_heap_obj("baz", 11))
+    heap.add(make_heap_obj("foo", 14))
+
+    assert heap.pop().value == 14
+    assert heap.pop().value == 30
+    assert heap.pop_many(1, timeout=0.01) == []
+
+
+def test_sort_key_heap_update_delete(sort_key_heap: Heap[HeapTestObject]):
+    heap = sort_key_heap
+    for i in range(100):
+        heap.add(make_heap_obj(f"a{i}", i))
+
+    for i in range(0, 100, 2):
+        heap.update(make_heap_obj(f"a{i}", 1000 + i))
+    for i in range(1, 100, 4):
+        heap.delete(make_heap_obj(f"a{i}", 0))
+
+    # stale entries are compacted away
+    assert len(heap.data.heap) <= 2 * len(heap.data) + 1
+
+    assert heap.get_by_key("a0").value == 1000
+    assert heap.get_by_key("a1") is None
+    assert sorted(heap.list_keys()) == sorted(
+        [f"a{i}" for i in range(100) if i % 4 != 1]
+    )
+
+    expected = sorted(obj.value for obj in heap.list())
+    assert [obj.value for obj in heap.top_k(10)] == expected[:10]
+    assert [obj.value for obj in heap.ordered()] == expected
+    assert [obj.value for obj in heap.pop_many(100)] == expected
+
+
+def test_sort_key_heap_ties_pop_in_set_order(sort_key_heap: Heap[HeapTestObject]):
+    heap = sort_key_heap
+    heap.add(make_heap_obj("foo", 1))
+    heap.add(make_heap_obj("bar", 1))
+    heap.add(make_heap_obj("baz", 1))
+    assert heap.peek().name == "foo"
+
+    heap.update(make_heap_obj("foo", 1))
+    assert [obj.name for obj in heap.pop_many(3)] == ["bar", "baz", "foo"]
+
+
+@parametrize("amount", [10, 1000])
+def test_sort_key_heap_bulk(sort_key_heap: Heap[HeapTestObject], amount: int):
+    heap = sort_key_heap
+    heap.bulk_add([make_heap_obj(f"a{i}", i) for i in range(1000)])
+    heap.bulk_update([make_heap_obj(f"a{i}", 2000 - i) for i in range(amount)])
+
+    with pytest.raises(HeapObjectNotFound):
+        heap.bulk_delete([make_heap_obj("non-existent", 0)])
+
+    heap.bulk_delete([make_heap_obj(f"a{i}", 0) for i in range(amount, 1000, 2)])
+
+    expected = sorted(obj.value for obj in heap.list())
+    assert [obj.value for obj in heap.pop_many(1000)] == expected
+
+
+def test_heap_readers_run_concurrently(heap: Heap[HeapTestObject]):
+    heap.add(make_heap_obj("foo", 10))
+    found = []
+
+    def task():
+        for _ in range(100):
+            found.append(heap.get_by_key("foo"))
+
+    with heap.lock.read():
+        threads = [Thread(target=task) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    assert len(found) == 400 and all(obj.value == 10 for obj in found)
+
+
+@pytest.fixture(params=list(HeapBackend))
+def backend_heap(request) -> Heap[HeapTestObject]:
+    return Heap.new(heap_key_func, compare_ints, backend=request.param)
+
+
+def assert_backend_data(data):
+    if isinstance(data, DaryHeapData):
+        for i in range(1, len(data)):
+            assert not data.less(i, (i - 1) // data.arity)
+            assert data.index[data.queue[i]] == i
+    elif isinstance(data, PairingHeapData):
+        nodes = [data.root] if data.root else []
+        seen = 0
+        while nodes:
+            node = nodes.pop()
+            seen += 1
+            assert data.nodes[node.key] is node
+            child = node.child
+            while child is not None:
+                assert not compare_ints(child.obj, node.obj)
+                nodes.append(child)
+                child = child.next
+        assert seen == len(data.nodes)
+    else:
+        assert_heap_data(data)
+
+
+def test_heap_backends_basic(backend_heap: Heap[HeapTestObject]):
+    heap = backend_heap
+    heap.add(make_heap_obj("foo", 10))
+    heap.add(make_heap_obj("bar", 1))
+    heap.add(make_heap_obj("baz", 11))
+    heap.add(make_heap_obj("zab", 30))
+    heap.add(make_heap_obj("foo", 13))
+
+    assert heap.peek().value == 1
+    assert heap.pop().value == 1
+    assert heap.pop().value == 11
+    with pytest.raises(HeapObjectNotFound):
+        heap.delete(make_heap_obj("baz", 11))
+
+    heap.update(make_heap_obj("foo", 40))
+    assert [obj.name for obj in heap.ordered()] == ["zab", "foo"]
+    assert heap.pop().value == 30
+    assert heap.pop().value == 40
+    assert heap.pop_many(1, timeout=0.01) == []
+
+
+@parametrize("amount", [10, 1000])
+def test_heap_backends_random_ops(backend_heap: Heap[HeapTestObject], amount: int):
+    heap = backend_heap
+    rand = random.Random(amount)
+    expected = {}
+
+    heap.bulk_add([make_heap_obj(f"a{i}", rand.randrange(500)) for i in range(1000)])
+    expected.update({obj.name: obj.value for obj in heap.list()})
+
+    for _ in range(amount):
+        key = f"a{rand.randrange(1200)}"
+        if rand.random() < 0.2 and key in expected:
+            heap.delete(make_heap_obj(key, 0))
+            del expected[key]
+        else:
+            value = rand.randrange(500)
+            heap.update(make_heap_obj(key, value))
+            expected[key] = value
+    assert_backend_data(heap.data)
+
+    deleted = rand.sample(sorted(expected), 50)
+    heap.bulk_delete([make_heap_obj(key, 0) for key in deleted])
+    for key in deleted:
+        del expected[key]
+    assert_backend_data(heap.data)
+
+    values = sorted(expected.values())
+    assert sorted(heap.list_keys()) == sorted(expected)
+    assert [obj.value for obj in heap.top_k(20)] == values[:20]
+    assert [obj.value for obj in heap.ordered()] == values
+
+    popped = [obj.value for obj in heap.pop_many(len(values) // 2)]
+    assert_backend_data(heap.data)
+    popped += [obj.value for obj in heap.pop_many(len(values))]
+    assert popped == values
@@ -0,0 +1,138 @@
+import time
+
+from threading import Thread
+
+import pytest
+
+from pydantic import BaseModel
+
+from airport.utils.cache import Heap
+from airport.utils.cache import HeapBackend
+from airport.utils.cache import HeapMetrics
+from airport.utils.cache.metrics import Histogram
+
+
+class HeapTestObject(BaseModel):
+    name: str
+    value: int
+
+
+def heap_key_func(obj: HeapTestObject):
+    return obj.name
+
+
+def compare_ints(value1: HeapTestObject, value2: HeapTestObject) -> bool:
+    return value1.value < value2.value
+
+
+def test_histogram():
+    histogram = Histogram([1, 10])
+    for value in [0.5, 1, 5, 20]:
+        histogram.observe(value)
+
+    snapshot = histogram.snapshot()
+    assert snapshot.count == 4
+    assert snapshot.sum == 26.5
+    assert snapshot.max == 20
+    assert snapshot.buckets == [(1, 2), (10, 3), (float("inf"), 4)]
+
+
+@pytest.mark.parametrize("backend", list(HeapBackend))
+def test_heap_metrics_counters(backend: HeapBackend):
+    metrics = HeapMetrics()
+    heap = Heap.new(heap_key_func, compare_ints, backend=backend, metrics=metrics)
+
+    heap.bulk_add([HeapTestObject(name=f"a{i}", value=100 - i) for i in range(10)])
+    heap.add(HeapTestObject(name="a0", value=0))
+    heap.add_if_not_present(HeapTestObject(name="a1", value=0))
+    heap.delete(HeapTestObject(name="a2", value=0))
+    heap.bulk_delete([HeapTestObject(name="a3", value=0)])
+    heap.pop()
+    heap.pop_many(3)
+    heap.peek()
+
+    snapshot = metrics.snapshot()
+    assert snapshot.adds == 10
+    assert snapshot.updates == 1
+    assert snapshot.deletes == 2
+    assert snapshot.pops == 4
+    assert snapshot.depth == len(heap.data) == 4
+    assert snapshot.max_depth == 10
+    assert snapshot.enqueued_time.count == 4
+    assert snapshot.pop_wait_time.count == 4
+    assert snapshot.lock_wait_time.count == snapshot.lock_hold_time.count == 7
+    assert snapshot.read_lock_hold_time.count == 1
+    swaps = (snapshot.fix_swaps, snapshot.up_swaps, snapshot.down_swaps)
+    if backend == HeapBackend.Pairing:
+        assert swaps == (0, 0, 0)
+    else:
+        assert snapshot.fix_swaps > 0 and snapshot.down_swaps > 0
+
+
+@pytest.mark.parametrize("backend", [HeapBackend.Binary, HeapBackend.Quaternary])
+def test_heap_metrics_swaps(backend: HeapBackend):
+    metrics = HeapMetrics()
+    heap = Heap.new(heap_key_func, compare_ints, backend=backend, metrics=metrics)
+
+    heap.add(HeapTestObject(name="a", value=2))
+    heap.add(HeapTestObject(name="b", value=1))
+    assert (metrics.fix_swaps, metrics.up_swaps, metrics.down_swaps) == (0, 1, 0)
+
+    heap.add(HeapTestObject(name="b", value=3))
+    assert (metrics.fix_swaps, metrics.up_swaps, metrics.down_swaps) == (1, 1, 0)
+
+    heap.add(HeapTestObject(name="c", value=0))
+    heap.add(HeapTestObject(name="d", value=5))
+    heap.pop()
+    assert (metrics.fix_swaps, metrics.up_swaps, metrics.down_swaps) == (1, 2, 1)
+
+
+def test_heap_metrics_sort_key():
+    metrics = HeapMetrics()
+    heap = Heap.new_with_sort_key(heap_key_func, lambda obj: obj.value, metrics)
+    heap.add(HeapTestObject(name="foo", value=1))
+    heap.pop()
+
+    snapshot = metrics.snapshot()
+    assert snapshot.adds == snapshot.pops == 1
+    assert snapshot.fix_swaps == snapshot.up_swaps == snapshot.down_swaps == 0
+
+
+def test_heap_metrics_timings():
+    now = [0.0]
+    metrics = HeapMetrics(clock=lambda: now[0])
+    heap = Heap.new(heap_key_func, compare_ints, metrics=metrics)
+
+    heap.add(HeapTestObject(name="foo", value=1))
+    now[0] = 2.0
+    heap.pop()
+
+    snapshot = metrics.snapshot()
+    assert snapshot.time == 2.0
+    assert snapshot.enqueued_time.sum == 2.0
+    assert snapshot.pop_wait_time.sum == 0.0
+
+
+def test_heap_metrics_pop_wait():
+    metrics = HeapMetrics()
+    heap = Heap.new(heap_key_func, compare_ints, metrics=metrics)
+
+    def task():
+        time.sleep(0.05)
+        heap.add(HeapTestObject(name="foo", value=1))
+
+    thread = Thread(target=task)
+    thread.start()
+    assert heap.pop().name == "foo"
+    thread.join()
+
+    snapshot = metrics.snapshot()
+    assert snapshot.pop_wait_time.max >= 0.04
+    # waiting for an item does not count as holding the lock
+    assert snapshot.lock_hold_time.max < 0.04
+
+
+def test_heap_without_metrics():
+    heap = Heap.new(heap_key_func, compare_ints)
+    assert heap.metrics is None
+    assert "swap" not in vars(heap.data)
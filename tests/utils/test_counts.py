@@ -0,0 +1,18 @@
+from typing import Dict
+
+from airport.utils.counts import decrease
+from airport.utils.counts import decrease_nested
+
+
+def test_decrease():
+    counts = {"a": 2, "b": 1}
+    decrease(counts, "a")
+    decrease(counts, "b")
+    assert counts == {"a": 1}
+
+
+def test_decrease_nested():
+    counts: Dict[str, Dict[str, int]] = {"x": {"a": 1, "b": 2}, "y": {"a": 1}}
+    decrease_nested(counts, "x", "a")
+    decrease_nested(counts, "y", "a")
+    assert counts == {"x": {"b": 2}}
@@ -0,0 +1,118 @@
+import time
+
+from threading import Event
+from threading import Thread
+
+import pytest
+
+from airport.utils.rwlock import RWLock
+
+
+def test_readers_share_lock():
+    lock = RWLock()
+    both_reading = Event()
+    readers = []
+
+    def task():
+        with lock.read():
+            readers.append(1)
+            if len(readers) == 2:
+                both_reading.set()
+            assert both_reading.wait(5)
+
+    threads = [Thread(target=task) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert both_reading.is_set()
+
+
+def test_writer_excludes_readers():
+    lock = RWLock()
+    events = []
+
+    lock.acquire()
+
+    def task():
+        with lock.read():
+            events.append("read")
+
+    thread = Thread(target=task)
+    thread.start()
+    time.sleep(0.1)
+    events.append("write")
+    lock.release()
+    thread.join()
+
+    assert events == ["write", "read"]
+
+
+def test_writer_waits_for_readers():
+    lock = RWLock()
+
+    with lock.read():
+        assert not lock.acquire(blocking=False)
+        assert not lock.acquire(timeout=0.01)
+
+    assert lock.acquire(blocking=False)
+    lock.release()
+
+
+def test_waiting_writer_blocks_new_readers():
+    lock = RWLock()
+    events = []
+
+    lock.acquire_read()
+
+    def writer():
+        with lock:
+            events.append("write")
+
+    def reader():
+        with lock.read():
+            events.append("read")
+
+    writer_thread = Thread(target=writer)
+    writer_thread.start()
+    time.sleep(0.1)
+
+    reader_thread = Thread(target=reader)
+    reader_thread.start()
+    time.sleep(0.1)
+    assert events == []
+
+    lock.release_read()
+    writer_thread.join()
+    reader_thread.join()
+
+    assert events == ["write", "read"]
+
+
+def test_release_unowned():
+    lock = RWLock()
+
+    with pytest.raises(RuntimeError):
+        lock.release()
+
+
+def test_condition():
+    lock = RWLock()
+    cond = lock.condition()
+    items = []
+
+    def task():
+        time.sleep(0.1)
+        with lock:
+            items.append(1)
+            cond.notify_all()
+
+    Thread(target=task).start()
+
+    with lock:
+        assert cond.wait_for(lambda: items, timeout=5)
+
+    # the lock is free again after the waiter leaves
+    assert lock.acquire(blocking=False)
+    lock.release()